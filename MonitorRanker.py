@@ -2,21 +2,49 @@ import sys
 import re
 import copy
 import pandas as pd
+import numpy as np
 import math
+import os
+import time
+import codecs
+import itertools
+import threading
+import json
+import shutil
+import hashlib
+import tempfile
+import io
+import struct
+import zlib
+import warnings
+import functools
+import contextlib
+import types
+import abc
+from collections import OrderedDict, deque
+from collections.abc import Mapping
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QComboBox, QFileDialog, QLabel, QScrollArea, QLineEdit,
-    QCheckBox, QSizePolicy, QFrame, QStatusBar, QToolButton, QMenu
+    QCheckBox, QSizePolicy, QFrame, QStatusBar, QToolButton, QMenu, QProgressDialog, QProgressBar,
+    QDialog, QDialogButtonBox, QFormLayout, QListWidget, QListWidgetItem, QSlider
 )
 from PyQt6.QtGui import (
     QPainter, QColor, QFont, QFontMetrics, QPainterPath,
-    QBrush, QLinearGradient, QPixmap, QAction, QIcon, QActionGroup
+    QBrush, QLinearGradient, QPixmap, QImage, QAction, QIcon, QActionGroup,
+    QImageWriter, QPdfWriter, QPageSize
 )
-from PyQt6.QtCore import Qt, QRectF, QSize, pyqtSignal
+from PyQt6.QtCore import (
+    Qt, QRect, QRectF, QPointF, QSize, QSizeF, QMarginsF, pyqtSignal, QObject, QRunnable, QThreadPool, QFileSystemWatcher, QTimer
+)
+try:
+    from PyQt6.QtSvg import QSvgGenerator # 可选：SVG 导出 (Optional: SVG export)
+except ImportError:
+    QSvgGenerator = None
 
 # --- 全局配置 (Global Configurations) ---
-CHART_CONFIG = { # 各项指标的默认配置 (Default config for each metric)
+DEFAULT_CHART_CONFIG = { # 各项指标的默认配置，只用于初始化 CONFIG_STORE (Default config for each metric; seeds CONFIG_STORE)
     "sRGB色准": {
         "csv_column": "sRGB色准", "unit": " ΔE", "lower_is_better": True,
         "bar_color": QColor(255, 100, 100), "base_title": "sRGB 色准"
@@ -43,6 +71,12 @@ CHART_CONFIG = { # 各项指标的默认配置 (Default config for each metric)
     "MPRT运动图像响应时间": { # 确保您的CSV列名与此处的 "csv_column" 完全一致
         "csv_column": "MPRT运动图像响应时间", "unit": "ms", "lower_is_better": True,
         "bar_color": QColor(0, 200, 255), "base_title": "MPRT 响应时间"
+    },
+    "综合评分": { # 综合评分：components 为 {指标名: 权重}，按各指标自身的排序方向归一化后加权平均
+        "type": "composite", "csv_column": None, "unit": "", "lower_is_better": False,
+        "components": {"sRGB色准": 1.0, "P3色域覆盖率": 1.0, "MPRT运动图像响应时间": 1.0},
+        "normalization": "minmax", "missing": "skip",
+        "bar_color": QColor(255, 200, 80), "base_title": "综合评分"
     }
 }
 DEFAULT_NEW_METRIC_COLOR = QColor(160, 160, 170)
@@ -61,12 +95,10 @@ DEFAULT_PANEL_COLORS = {
     "TN": QColor("#AB47BC"), "VA": QColor("#00ACC1"), "WOLED": QColor("#FF7043"),
     "未知": QColor("#9E9E9E"), "NanoIPS": QColor("#4285F4").lighter(110),
 }
-PANEL_COLORS = copy.deepcopy(DEFAULT_PANEL_COLORS)
-
 COLOR_SCHEMES = {
     "默认": {
-        "bar_colors": {k: v["bar_color"] for k, v in CHART_CONFIG.items() if "bar_color" in v},
-        "panel_colors": copy.deepcopy(DEFAULT_PANEL_COLORS)
+        "bar_colors": {k: v["bar_color"] for k, v in DEFAULT_CHART_CONFIG.items() if "bar_color" in v},
+        "panel_colors": dict(DEFAULT_PANEL_COLORS)
     },
     "Material Blue": {
         "bar_colors": { "sRGB色准": QColor("#1976D2"), "sRGB色域容积": QColor("#42A5F5"), "P3色域覆盖率": QColor("#1E88E5"), "可视角色差": QColor("#0D47A1"), "可视角亮度衰减": QColor("#64B5F6"), "MPRT运动图像响应时间": QColor("#2196F3"), },
@@ -90,6 +122,118 @@ COLOR_SCHEMES = {
     },
 }
 
+# --- 配置存储 (Versioned config store) ---
+CONFIG_DATA_FIELDS = ("csv_column", "type", "lower_is_better", "components", "normalization", "missing") # 影响数值或排序的字段
+
+def freeze_config(config):
+    # 指标配置的只读视图；嵌套的 dict (如 components) 一并冻结。QColor 视为不可变值，只整体替换
+    return types.MappingProxyType({k: types.MappingProxyType(dict(v)) if isinstance(v, dict) else v for k, v in config.items()})
+
+
+class ConfigSnapshot:
+    """某一版本的全部图表配置，不可变 (Immutable chart config at one version).
+
+    metrics 为 {指标名: 只读配置}，panel_colors 为只读的面板配色。快照可直接交给渲染器和工作线程，
+    不需要再深拷贝；version 单调递增，可作为缓存键的一部分。
+    """
+
+    def __init__(self, version, metrics, panel_colors, scheme):
+        self.version = version
+        self.metrics = types.MappingProxyType(metrics)
+        self.panel_colors = types.MappingProxyType(panel_colors)
+        self.scheme = scheme
+        self._resolved = {}
+
+    def metricConfig(self, key):
+        # 交给渲染器的指标配置；综合评分按本快照解析组成指标，每个快照只解析一次
+        config = self.metrics.get(key)
+        if config is None or not is_composite(config): return config
+        if key not in self._resolved:
+            self._resolved[key] = resolve_metric_config(config, self.metrics)
+        return self._resolved[key]
+
+
+class ConfigStore:
+    """带版本号的图表配置存储，写时复制 (Versioned, copy-on-write chart config store).
+
+    snapshot() 直接返回当前快照，开销为常数。所有修改 (updateMetric / addMetrics / applyColorScheme)
+    都生成新快照并递增版本号，只复制被修改的指标；旧快照保持不变，正在进行的渲染和导出不受影响。
+    修改提交后在调用线程中依次调用 subscribe() 注册的 callback(old, new)。
+    """
+
+    def __init__(self, metrics, panel_colors, scheme="默认"):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._snapshot = ConfigSnapshot(1, {k: freeze_config(v) for k, v in metrics.items()}, dict(panel_colors), scheme)
+
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners: self._listeners.remove(callback)
+
+    def _commit(self, change):
+        # change(old) 返回 (metrics, panel_colors, scheme)，不变的部分原样返回；返回 None 表示没有修改
+        with self._lock:
+            old = self._snapshot
+            result = change(old)
+            if result is None: return old
+            metrics, panel_colors, scheme = result
+            new = self._snapshot = ConfigSnapshot(old.version + 1, metrics, panel_colors, scheme)
+        for callback in list(self._listeners): callback(old, new)
+        return new
+
+    def updateMetric(self, key, **changes):
+        def change(old):
+            current = old.metrics[key]
+            if all(k in current and current[k] == v for k, v in changes.items()): return None
+            metrics = dict(old.metrics)
+            metrics[key] = freeze_config({**current, **changes})
+            return metrics, dict(old.panel_colors), old.scheme
+        return self._commit(change)
+
+    def addMetrics(self, configs):
+        # 加入新指标 (如 CSV 中的新列)；已有的指标保持不变
+        def change(old):
+            added = {k: freeze_config(v) for k, v in configs.items() if k not in old.metrics}
+            if not added: return None
+            return {**old.metrics, **added}, dict(old.panel_colors), old.scheme
+        return self._commit(change)
+
+    def applyColorScheme(self, name, force_update_new_metrics=False):
+        # 配色方案写入各指标的 bar_color 和面板配色；未列出的新指标在 force 时改用默认颜色
+        scheme = COLOR_SCHEMES.get(name, COLOR_SCHEMES["默认"])
+        def change(old):
+            metrics = dict(old.metrics)
+            for k, config in old.metrics.items():
+                if k in scheme.get("bar_colors", {}): color = scheme["bar_colors"][k]
+                elif k not in COLOR_SCHEMES["默认"]["bar_colors"] and ("bar_color" not in config or force_update_new_metrics):
+                    color = DEFAULT_NEW_METRIC_COLOR
+                else: continue
+                if config.get("bar_color") != color: metrics[k] = freeze_config({**config, "bar_color": color})
+            panel_colors = {**DEFAULT_PANEL_COLORS, **scheme.get("panel_colors", {})}
+            if metrics == dict(old.metrics) and panel_colors == dict(old.panel_colors) and name == old.scheme: return None
+            return metrics, panel_colors, name
+        return self._commit(change)
+
+
+class _ConfigView(Mapping):
+    # CHART_CONFIG：当前快照中指标配置的只读视图，供只需读取最新配置的代码使用
+    def __getitem__(self, key): return CONFIG_STORE.snapshot().metrics[key]
+    def __iter__(self): return iter(CONFIG_STORE.snapshot().metrics)
+    def __len__(self): return len(CONFIG_STORE.snapshot().metrics)
+
+
+CONFIG_STORE = ConfigStore(DEFAULT_CHART_CONFIG, DEFAULT_PANEL_COLORS)
+CHART_CONFIG = _ConfigView()
+
 # --- 主题颜色 ---
 THEMES = {
     "dark": {
@@ -123,9 +267,1440 @@ THEMES = {
 }
 
 
-class ChartWidget(QWidget):
+def build_stylesheet(theme):
+    # 由 THEMES 中的一个主题生成主窗口样式表 (Main-window stylesheet for one THEMES entry)
+    common_stylesheet = f"""
+        QMainWindow {{
+            background-color: {theme["background"]};
+        }}
+        QWidget {{
+            color: {theme["text_primary"]};
+            font-family: "Source Han Sans CN", "Microsoft YaHei", sans-serif; 
+            font-size: 13px;
+        }}
+        QLabel {{
+            background-color: transparent; 
+        }}
+        QPushButton, QToolButton {{ 
+            background-color: {theme["accent"]};
+            color: {theme["button_text"]};
+            border: 1px solid {theme["accent"]};
+            padding: 8px 12px;
+            border-radius: 4px;
+            font-weight: bold;
+        }}
+        QPushButton:hover, QToolButton:hover {{
+            background-color: {QColor(theme["accent"]).lighter(115).name()};
+        }}
+        QPushButton:pressed, QToolButton:pressed {{
+            background-color: {QColor(theme["accent"]).darker(115).name()};
+        }}
+        QPushButton:disabled {{
+            background-color: {theme["widget_background"]};
+            color: {theme["disabled_text"]};
+            border-color: {theme["border"]};
+        }}
+        QComboBox {{
+            background-color: {theme["widget_background"]};
+            border: 1px solid {theme["border"]};
+            padding: 5px;
+            border-radius: 4px;
+            min-height: 20px; 
+        }}
+        QComboBox:disabled {{
+            background-color: {QColor(theme["widget_background"]).darker(105).name()};
+            color: {theme["disabled_text"]};
+        }}
+        QComboBox::drop-down {{
+            border: none;
+        }}
+        QComboBox::down-arrow {{
+             image: url(none); 
+        }}
+        QComboBox QAbstractItemView {{ 
+            background-color: {theme["widget_background"]};
+            border: 1px solid {theme["border"]};
+            selection-background-color: {theme["accent"]};
+            selection-color: {theme["button_text"]};
+            color: {theme["text_primary"]}; 
+            outline: none; 
+        }}
+
+        QLineEdit {{
+            background-color: {theme["widget_background"]};
+            border: 1px solid {theme["border"]};
+            padding: 6px;
+            border-radius: 4px;
+        }}
+        QLineEdit:disabled {{
+            background-color: {QColor(theme["widget_background"]).darker(105).name()};
+            color: {theme["disabled_text"]};
+        }}
+        QCheckBox {{
+            spacing: 5px; 
+        }}
+        QCheckBox::indicator {{
+            width: 16px;
+            height: 16px;
+            border: 1px solid {theme["border"]};
+            border-radius: 3px;
+            background-color: {theme["widget_background"]};
+        }}
+        QCheckBox::indicator:checked {{
+            background-color: {theme["accent"]};
+            border-color: {theme["accent"]};
+        }}
+         QCheckBox::indicator:disabled {{
+            background-color: {QColor(theme["widget_background"]).darker(105).name()};
+            border-color: {QColor(theme["border"]).darker(105).name()};
+        }}
+        QScrollArea {{
+            border: none; 
+             background-color: {theme["widget_background"]}; 
+        }}
+        #ChartScrollArea > QWidget {{ 
+             background-color: {theme["widget_background"]};
+        }}
+         #ChartScrollArea > QWidget > QWidget {{ 
+             background-color: {theme["widget_background"]};
+        }}
+        QScrollBar:vertical {{
+            border: none;
+            background: {theme["widget_background"]};
+            width: 10px;
+            margin: 0px 0px 0px 0px;
+        }}
+        QScrollBar::handle:vertical {{
+            background: {QColor(theme["border"]).lighter(120).name()};
+            min-height: 20px;
+            border-radius: 5px;
+        }}
+        QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
+            border: none;
+            background: none;
+            height: 0px;
+            width: 0px;
+        }}
+         QScrollBar:horizontal {{
+            border: none;
+            background: {theme["widget_background"]};
+            height: 10px;
+            margin: 0px 0px 0px 0px;
+        }}
+        QScrollBar::handle:horizontal {{
+            background: {QColor(theme["border"]).lighter(120).name()};
+            min-width: 20px;
+            border-radius: 5px;
+        }}
+        QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {{
+            border: none;
+            background: none;
+            height: 0px;
+            width: 0px;
+        }}
+    """
+
+    specific_stylesheet = f"""
+        #AppBar {{
+            background-color: {theme["header_background"]};
+        }}
+        #AppBarTitle {{
+            font-size: 18px;
+            font-weight: bold;
+            color: {theme["text_primary"]};
+        }}
+        #AppBarButton {{ 
+            padding: 6px 10px; 
+            font-size: 13px;
+        }}
+        #ThemeToggleButton {{ 
+            padding: 6px 8px; 
+            font-size: 14px; 
+        }}
+        #ControlPanel {{
+            background-color: {theme["control_panel_background"]};
+            border-bottom: 1px solid {theme["border"]}; 
+        }}
+        #AppStatusBar {{
+            background-color: {theme["widget_background"]};
+            color: {theme["text_secondary"]};
+        }}
+        #AppStatusBar::item {{
+            border: none; 
+        }}
+    """
+    return common_stylesheet + specific_stylesheet
+
+
+class ThemeAssets:
+    """每个主题只编译一次的界面资源：样式表和图表颜色 (Per-theme assets, compiled once).
+
+    切换主题时直接复用，不再重新拼接样式表或解析颜色字符串。样式表在第一次访问时才生成，
+    只需要图表颜色的无界面导出 (run_headless) 不会生成样式表。
+    """
+    def __init__(self, name):
+        theme = THEMES[name]
+        self.name = name
+        self._stylesheet = None
+        self.text_primary = QColor(theme["text_primary"])
+        self.text_secondary = QColor(theme["text_secondary"])
+        self.chart_empty_text = QColor(theme["chart_empty_text"])
+        self.chart_bar_background = QColor(theme["chart_bar_background"])
+
+    @property
+    def stylesheet(self):
+        if self._stylesheet is None: self._stylesheet = build_stylesheet(THEMES[self.name])
+        return self._stylesheet
+
+    def chartColors(self):
+        # ChartRenderer.setThemeColors / ChartWidget.set_theme_colors 的参数顺序
+        return self.text_primary, self.text_secondary, self.chart_empty_text, self.chart_bar_background
+
+
+_THEME_ASSETS = {}
+
+def theme_assets(name):
+    assets = _THEME_ASSETS.get(name)
+    if assets is None: assets = _THEME_ASSETS[name] = ThemeAssets(name)
+    return assets
+
+
+# --- 性能分析 (Profiling) ---
+PROFILE_ENV = "MONITORRANKER_PROFILE" # 设为 1 开启；设为 .json 路径时退出前同时写出跟踪文件
+
+
+class Profiler:
+    """可选的热点耗时统计 (Opt-in timing instrumentation for the GUI hot paths).
+
+    关闭时 span() 返回共享的空上下文，measure() 包装的函数只多一次属性判断。开启后按名称记录调用次数、
+    最近 RECENT 次耗时 (last/avg/p95) 和计数器，并保留最多 MAX_EVENTS 个事件，dumpTrace() 写出
+    Chrome trace 格式 (chrome://tracing 或 Perfetto 可打开)。可在工作线程中调用。
+    """
+    RECENT = 512
+    MAX_EVENTS = 200000
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._null = contextlib.nullcontext()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._counters = {}
+            self._events = deque(maxlen=self.MAX_EVENTS)
+            self._origin = time.perf_counter()
+
+    def setEnabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def record(self, name, start, end, **args):
+        with self._lock:
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = {"count": 0, "total": 0.0, "recent": deque(maxlen=self.RECENT)}
+            st["count"] += 1; st["total"] += end - start
+            st["recent"].append(end - start)
+            self._events.append((name, start, end, threading.get_ident(), args))
+
+    def count(self, name, n=1):
+        if not self.enabled: return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def _span(self, name, args):
+        t0 = time.perf_counter()
+        try:
+            yield args # 调用方可在块内补充参数 (e.g. rows painted)
+        finally:
+            self.record(name, t0, time.perf_counter(), **args)
+
+    def span(self, name, **args):
+        return self._span(name, args) if self.enabled else self._null
+
+    def measure(self, name):
+        # 装饰器：开启时记录每次调用耗时 (Decorator timing every call while enabled)
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*a, **kw):
+                if not self.enabled: return fn(*a, **kw)
+                t0 = time.perf_counter()
+                try:
+                    return fn(*a, **kw)
+                finally:
+                    self.record(name, t0, time.perf_counter())
+            return wrapper
+        return decorate
+
+    def summary(self):
+        with self._lock:
+            stats = {name: (st["count"], st["total"], list(st["recent"])) for name, st in self._stats.items()}
+            counters = dict(self._counters)
+        out = {}
+        for name, (count, total, recent) in stats.items():
+            recent_ms = np.asarray(recent) * 1000.0
+            out[name] = {"count": count, "total_ms": total * 1000.0, "last_ms": float(recent_ms[-1]),
+                         "avg_ms": float(recent_ms.mean()), "p95_ms": float(np.percentile(recent_ms, 95))}
+        return {"timings": out, "counters": counters}
+
+    def summaryText(self, names=("paint", "setData", "load_dataset", "switch_theme", "png_encode")):
+        timings = self.summary()["timings"]
+        parts = [f"{n} {t['last_ms']:.1f}/{t['avg_ms']:.1f}/p95 {t['p95_ms']:.1f} ms"
+                 for n in names if (t := timings.get(n))]
+        return " · ".join(parts) if parts else "暂无性能数据"
+
+    def dumpTrace(self, path):
+        with self._lock:
+            events = list(self._events); origin = self._origin
+        pid = os.getpid()
+        trace = [{"name": name, "ph": "X", "ts": (start - origin) * 1e6, "dur": (end - start) * 1e6,
+                  "pid": pid, "tid": tid, "args": args} for name, start, end, tid, args in events]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "otherData": self.summary()}, f, ensure_ascii=False)
+        return len(trace)
+
+
+_PROFILE_SETTING = os.environ.get(PROFILE_ENV, "")
+PROFILER = Profiler(enabled=_PROFILE_SETTING not in ("", "0"))
+PROFILE_TRACE_PATH = _PROFILE_SETTING if _PROFILE_SETTING.lower().endswith(".json") else None
+
+
+# --- 行模型 (Row model) ---
+def _map_unique(values, func):
+    # 只对去重后的取值调用 func，再按编码回填 (Call func once per distinct value, then scatter back)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    for i, u in enumerate(uniques): mapped[i] = func(u)
+    return mapped[codes]
+
+def _parse_float_or_nan(raw, strip=()):
+    try:
+        txt = str(raw)
+        for s in strip: txt = txt.replace(s, "")
+        return float(txt)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _resolution_display(raw):
+    raw_res_str = str(raw)
+    return RESOLUTION_ALIASES.get(raw_res_str, raw_res_str if raw_res_str else "N/A")
+
+def _column_or_default(df, col, default):
+    if col in df.columns: return df[col]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+MODE_SUFFIX_PATTERN = re.compile(r'[（\(]([^）\)]+)[）\)]$')
+
+def _split_mode_suffix(name):
+    # 把型号末尾括号内的模式标注拆成脚注 (Split a trailing "(mode)" annotation off into a footnote)
+    name = str(name)
+    mode_match = MODE_SUFFIX_PATTERN.search(name)
+    if not mode_match: return (name, "")
+    return (name.replace(mode_match.group(0), "").strip(), mode_match.group(1))
+
+
+class AttributeTable:
+    """与指标无关的显示器属性表，每个数据集在加载时只构建一次 (Metric-independent, immutable per-dataset attributes).
+
+    各列为只读 NumPy 数组，行顺序与构建时的 DataFrame 一致 (按位置对齐)。
+    """
+    FIELDS = ("name", "main_name", "footnote", "panel",
+              "size_numeric", "size_text", "refresh_numeric", "refresh_text",
+              "resolution_text", "resolution_numeric_value")
+    __slots__ = ("_columns", "_len")
+
+    def __init__(self, columns):
+        for arr in columns.values(): arr.setflags(write=False)
+        self._columns = columns
+        self._len = len(columns["name"])
+
+    def __len__(self):
+        return self._len
+
+    def __setattr__(self, key, value):
+        if hasattr(self, "_len"): raise AttributeError("AttributeTable is immutable")
+        object.__setattr__(self, key, value)
+
+    def column(self, name):
+        return self._columns[name]
+
+    def take(self, rows):
+        return {f: self._columns[f][rows] for f in self.FIELDS}
+
+    @classmethod
+    def from_frame(cls, df):
+        size_n = _map_unique(_column_or_default(df, "显示器尺寸", ""), lambda u: _parse_float_or_nan(u, ('"',))).astype(np.float64)
+        ref_n = _map_unique(_column_or_default(df, "刷新率", ""), lambda u: _parse_float_or_nan(u, ("Hz", "hz"))).astype(np.float64)
+        res_text = _map_unique(_column_or_default(df, "分辨率", ""), _resolution_display)
+        res_n = _map_unique(res_text, lambda t: RESOLUTION_NUMERIC_MAP.get(t, math.nan)).astype(np.float64)
+
+        name = _column_or_default(df, "显示器型号", "N/A").to_numpy(dtype=object, copy=True)
+        name_parts = _map_unique(name, _split_mode_suffix)
+        panel = _column_or_default(df, "面板类型", "未知").to_numpy(dtype=object, copy=True)
+        panel[pd.isna(panel)] = "未知"
+        return cls({
+            "name": name,
+            "main_name": np.array([p[0] for p in name_parts], dtype=object),
+            "footnote": np.array([p[1] for p in name_parts], dtype=object),
+            "panel": panel,
+            "size_numeric": size_n,
+            "size_text": _map_unique(size_n, lambda v: f"{v:.1f}\"" if v and not math.isnan(v) else "N/A\""),
+            "refresh_numeric": ref_n,
+            "refresh_text": _map_unique(ref_n, lambda v: f"{v:.0f}Hz" if v and not math.isnan(v) else "N/A Hz"),
+            "resolution_text": res_text,
+            "resolution_numeric_value": res_n,
+        })
+
+
+class RowModel:
+    """按列存储、已排序的天梯图行模型 (Column-oriented, sorted row model of a ladder).
+
+    兼容原先的 list[dict] 用法：支持 len()、迭代、下标取行 (返回 dict) 和切片。
+    名次查询得到的是完整天梯的一段连续名次：first_rank 为第一行的绝对名次，total 为完整天梯的行数，
+    value_max 为完整天梯的最大值 (条形比例与完整天梯一致)。
+    """
+    TEXT_FIELDS = ("name", "main_name", "footnote", "panel", "size_text", "refresh_text", "resolution_text")
+    NUMERIC_FIELDS = ("value", "size_numeric", "refresh_numeric", "resolution_numeric_value")
+
+    def __init__(self, columns, first_rank=1, total=None, value_max=None):
+        self.columns = columns
+        self._len = len(columns["value"])
+        self.first_rank = first_rank
+        self.total = self._len if total is None else total
+        self.value_max = value_max
+
+    def rank(self, i):
+        return self.first_rank + i
+
+    @classmethod
+    def empty(cls):
+        cols = {f: np.empty(0, dtype=object) for f in cls.TEXT_FIELDS}
+        cols.update({f: np.empty(0, dtype=np.float64) for f in cls.NUMERIC_FIELDS})
+        return cls(cols)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    def column(self, name):
+        return self.columns[name]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            first = range(self._len)[i]
+            return RowModel({k: v[i] for k, v in self.columns.items()}, self.first_rank + (first[0] if len(first) else 0), self.total, self.value_max)
+        if i < 0: i += self._len
+        if not 0 <= i < self._len: raise IndexError("RowModel index out of range")
+        row = {f: self.columns[f][i] for f in self.TEXT_FIELDS}
+        row["value"] = float(self.columns["value"][i])
+        for f in ("size_numeric", "refresh_numeric"):
+            v = self.columns[f][i]
+            row[f] = None if math.isnan(v) else float(v)
+        v = self.columns["resolution_numeric_value"][i]
+        row["resolution_numeric_value"] = None if math.isnan(v) else int(v)
+        return row
+
+
+def build_row_model(df, config, attributes=None, mask=None):
+    """把指标列与属性表按位置连接，得到已排序的行模型 (Join a metric column against the attribute table and sort it).
+
+    df 可以是 DataFrame 或 MonitorDataset (后者在这里才解析所需的指标列)。
+    排序规则与原先 sorted(..., reverse=not lower_is_better) 相同，包括并列值保持原始顺序。
+    attributes 缺省时按 df 现场构建 (不推荐在重绘路径上这样做)。
+    mask 为按行位置的布尔数组 (见 FilterIndex)，只保留为 True 的行；排序结果直接过滤，不重新排序。
+    """
+    if df is None or df.empty or not metric_available(config, df.columns):
+        return RowModel.empty()
+    if attributes is None or len(attributes) != len(df):
+        attributes = AttributeTable.from_frame(df)
+
+    asc = config.get("lower_is_better", False)
+    if isinstance(df, MonitorDataset) and not is_composite(config):
+        rows, values = df.sortedRows(config["csv_column"], asc)
+    else:
+        rows, values = _ascending_rows(metric_values(df, config))
+        if not asc: rows, values = _reverse_keeping_ties(rows, values)
+    if mask is not None:
+        keep = mask[rows]
+        rows, values = rows[keep], values[keep]
+    if rows.size == 0:
+        return RowModel.empty()
+
+    columns = attributes.take(rows)
+    columns["value"] = values
+    return RowModel(columns)
+
+def metric_values(df, config):
+    # 该指标每行的数值 (float64，缺失为 NaN)；综合评分现场计算 (Per-row values of a plain or composite metric)
+    if is_composite(config): return composite_scores(df, config)
+    return _metric_values(df[config["csv_column"]])
+
+def _metric_values(raw_values):
+    if pd.api.types.is_numeric_dtype(raw_values.dtype):
+        return raw_values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return _map_unique(raw_values, _parse_float_or_nan).astype(np.float64)
+
+def _ascending_rows(values):
+    # 非 NaN 行按数值稳定升序排列，返回 (行位置, 数值) (Stable ascending order of the non-NaN rows)
+    keep = np.flatnonzero(~np.isnan(values))
+    order = np.argsort(values[keep], kind="stable")
+    return keep[order], values[keep][order]
+
+def _reverse_keeping_ties(rows, values):
+    # 把稳定升序反转为稳定降序：整体反转后再把每段并列值翻回原始顺序，O(N) (Stable descending from stable ascending)
+    rows, values = rows[::-1], values[::-1]
+    n = len(values)
+    if n == 0: return rows.copy(), values.copy()
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    ends = np.r_[starts[1:], n]
+    lengths = ends - starts
+    idx = np.repeat(starts + ends - 1, lengths) - np.arange(n)
+    return rows[idx], values[idx]
+
+def _merge_ascending(rows, values, tail_rows, tail_values):
+    # 把已稳定排序的新增行并入稳定升序：并列时原有行在前，与整体重新稳定排序的结果相同
+    # (Merge a sorted tail into a stable ascending order; same result as re-sorting, since tail rows come later)
+    at = np.searchsorted(values, tail_values, side="right")
+    return np.insert(rows, at, tail_rows), np.insert(values, at, tail_values)
+
+
+# --- 数据加载 (Dataset loading) ---
+KNOWN_COLUMNS = ["显示器型号", "面板类型", "显示器尺寸", "刷新率", "分辨率"] # 非指标列 (Non-metric columns)
+CSV_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'utf-8-sig')
+
+def discover_metric_configs(columns, known_columns=KNOWN_COLUMNS, units=None):
+    # 未知列自动作为新指标，单位取清洗时检测到的后缀 (Unknown columns become metrics; units come from cleaning)
+    units = units or {}
+    return {col: {"csv_column": col, "unit": units.get(col, ""), "lower_is_better": False,
+                  "bar_color": DEFAULT_NEW_METRIC_COLOR, "base_title": col}
+            for col in columns if col not in known_columns and col not in CHART_CONFIG}
+
+
+# --- 综合评分 (Composite scores) ---
+COMPOSITE_NORMALIZATIONS = {"minmax": "最小-最大", "zscore": "Z 分数", "percentile": "百分位"}
+COMPOSITE_MISSING = {"skip": "只按已有指标", "worst": "缺失按最差", "exclude": "缺失不参与排名"}
+
+def is_composite(config):
+    return config.get("type") == "composite"
+
+def resolve_metric_config(config, configs=None):
+    """返回可交给渲染器和工作线程的只读配置 (Read-only config safe to use off the GUI thread).
+
+    配置存储中的指标配置本身不可变，普通指标原样返回，不再复制。综合评分的 components ({指标名: 权重})
+    在这里按 configs (默认为当前快照) 解析为 resolved_components ((csv 列名, 权重, 越低越好), ...)，
+    之后不再读取 CHART_CONFIG。已解析过的配置原样返回。
+    """
+    if not is_composite(config) or "resolved_components" in config: return config
+    configs = CONFIG_STORE.snapshot().metrics if configs is None else configs
+    resolved = tuple((configs[k]["csv_column"], float(w), bool(configs[k].get("lower_is_better", False)))
+                     for k, w in config.get("components", {}).items() if k in configs and not is_composite(configs[k]))
+    return types.MappingProxyType({**config, "resolved_components": resolved})
+
+def _composite_components(config):
+    if "resolved_components" in config: return config["resolved_components"]
+    return resolve_metric_config(config)["resolved_components"]
+
+def metric_available(config, columns):
+    # 数据中是否有该指标 (综合评分只要有一个权重大于 0 的组成指标即可)
+    if is_composite(config): return any(w > 0 and col in columns for col, w, _ in _composite_components(config))
+    return config.get("csv_column") in columns
+
+def normalize_columns(matrix, method):
+    """按列归一化到 "越大越好" 的同一尺度，NaN 保持为 NaN (Column-wise normalization, NaN-preserving).
+
+    minmax 与 percentile 映射到 0-100；zscore 用 T 分 (50 + 10z) 以便条形长度为正。
+    """
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning) # 整列缺失 (All-NaN columns)
+        if method == "minmax":
+            lo = np.nanmin(matrix, axis=0); span = np.nanmax(matrix, axis=0) - lo
+            return (matrix - lo) / np.where(span > 0, span, 1.0) * 100.0
+        if method == "zscore":
+            sd = np.nanstd(matrix, axis=0)
+            return 50.0 + 10.0 * (matrix - np.nanmean(matrix, axis=0)) / np.where(sd > 0, sd, 1.0)
+    if method != "percentile": raise ValueError(f"unknown normalization: {method}")
+    out = np.full(matrix.shape, np.nan)
+    for j in range(matrix.shape[1]): # 每列一次排序 + searchsorted，并列值取平均百分位
+        col = matrix[:, j]; ok = ~np.isnan(col)
+        ordered = np.sort(col[ok])
+        if ordered.size == 0: continue
+        lo = np.searchsorted(ordered, col[ok], side="left"); hi = np.searchsorted(ordered, col[ok], side="right")
+        out[ok, j] = (lo + hi - 1) / 2.0 / max(ordered.size - 1, 1) * 100.0
+    return out
+
+def normalized_matrix(columns, lower_is_better, method):
+    # 组成指标按 "越大越好" 翻转后堆叠为 N×M 矩阵再归一化
+    matrix = np.column_stack(columns).astype(np.float64)
+    flip = np.asarray(lower_is_better, dtype=bool)
+    matrix[:, flip] *= -1.0
+    return normalize_columns(matrix, method)
+
+def weighted_scores(matrix, weights, missing="skip"):
+    """归一化矩阵与权重一次矩阵乘得到综合评分 (One matrix-vector product over the normalized matrix).
+
+    missing: skip 只按该行已有的指标加权平均；worst 把缺失按该指标的最差值计；exclude 任一指标缺失即为 NaN (不参与排名)。
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    present = ~np.isnan(matrix)
+    if missing == "worst":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            worst = np.nan_to_num(np.nanmin(matrix, axis=0))
+        filled = np.where(present, matrix, worst)
+        scores = filled @ weights / weights.sum()
+        scores[~present.any(axis=1)] = np.nan
+        return scores
+    filled = np.where(present, matrix, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = filled @ weights / (present @ weights)
+    if missing == "exclude": scores[~present.all(axis=1)] = np.nan
+    return scores
+
+def composite_scores(df, config):
+    """综合评分向量 (float64，不能计算的行为 NaN)。MonitorDataset 会缓存归一化矩阵，调整权重只需一次矩阵乘。"""
+    comps = [(col, w, lb) for col, w, lb in _composite_components(config) if w > 0 and col in df.columns]
+    if not comps: return np.full(len(df), np.nan)
+    cols = tuple(c for c, _, _ in comps); directions = tuple(lb for _, _, lb in comps)
+    method = config.get("normalization", "minmax")
+    if isinstance(df, MonitorDataset): matrix = df.normalizedMatrix(cols, directions, method)
+    else: matrix = normalized_matrix([_metric_values(df[c]) for c in cols], directions, method)
+    return weighted_scores(matrix, [w for _, w, _ in comps], config.get("missing", "skip"))
+
+# --- 数值清洗 (Numeric cleaning) ---
+NUMERIC_SCHEMA = {"显示器尺寸": np.float32, "刷新率": np.float32} # 其余数值列为 float64
+UNIT_DISPLAY = {"%": "%", "ms": "ms", "δe": " ΔE", "de": " ΔE", "hz": "Hz", '"': '"', "英寸": '"'} # 识别的后缀 -> 显示单位
+_UNIT_SUFFIX = re.compile(r'^\s*[-+]?(?:\d+\.?\d*|\.\d+)\s*(' + '|'.join(map(re.escape, sorted(UNIT_DISPLAY, key=len, reverse=True))) + r')\s*$', re.IGNORECASE)
+_LEGACY_STRIP = re.compile(r'[^\d\.\-]')
+_NON_ASCII_DIGIT = re.compile(r'(?![0-9])\d')
+_KEEP_BYTES = np.zeros(256, dtype=bool) # 旧正则保留的字符 (Bytes the legacy regex keeps), 另加分隔符 \0
+_KEEP_BYTES[np.frombuffer(b"0123456789.-\0", dtype=np.uint8)] = True
+UNIT_SAMPLE_SIZE = 512
+
+def _detect_unit(values):
+    # 在 (去重后的) 样本里找最常见的已知单位后缀；"1,234"、"27-32" 之类不算单位 (Only UNIT_DISPLAY suffixes count)
+    counts = {}
+    for v in itertools.islice(values, UNIT_SAMPLE_SIZE):
+        m = _UNIT_SUFFIX.match(str(v))
+        if m: counts[m.group(1).lower()] = counts.get(m.group(1).lower(), 0) + 1
+    if not counts: return ""
+    return max(counts, key=counts.get)
+
+def sample_unit(series):
+    # 列开头有限样本中最常见的已知单位，返回显示形式 (Display unit guessed from a bounded sample of the column)
+    return UNIT_DISPLAY.get(_detect_unit(series.head(UNIT_SAMPLE_SIZE * 4).dropna().unique()), "")
+
+def _legacy_numeric(texts):
+    # 原 load_csv 的逐单元格清洗：删掉数字、小数点和负号以外的字符后解析 (The original per-cell regex cleaning)
+    return pd.to_numeric(texts.str.replace(_LEGACY_STRIP, '', regex=True).replace('', pd.NA), errors='coerce')
+
+def _strip_non_numeric(texts):
+    # 与 _legacy_numeric 相同的删字符，但整列一次完成：拼成一个字节串，按查找表过滤后再拆分
+    # 返回 None 表示需要走逐单元格正则 (含 \0 或非 ASCII 数字的列)
+    joined = "\0".join(texts)
+    if joined.count("\0") != len(texts) - 1: return None
+    if not joined.isascii() and _NON_ASCII_DIGIT.search(joined): return None # \d 还匹配全角等 Unicode 数字
+    raw = np.frombuffer(joined.encode("utf-8"), dtype=np.uint8)
+    return raw[_KEEP_BYTES[raw]].tobytes().decode("ascii").split("\0")
+
+def clean_numeric_column(series, dtype=np.float64):
+    """把字符串列解析为浮点列，并返回检测到的单位后缀 (Parse a string column to floats; returns (values, unit)).
+
+    数值与旧的逐单元格正则清洗完全一致 (只保留数字、小数点和负号后解析)：每个不同的取值只清洗一次，
+    删字符整批一次完成，再按编码回填。单位只从 UNIT_DISPLAY 中的已知后缀里检测，只用于标签，不影响数值。
+    """
+    codes, uniques = pd.factorize(series.to_numpy(dtype=object)) # 缺失值的编码为 -1
+    texts = np.array([str(u) for u in uniques], dtype=object)
+    stripped = _strip_non_numeric(texts)
+    if stripped is None:
+        parsed = _legacy_numeric(pd.Series(texts, dtype=object)).to_numpy(dtype=np.float64)
+    else:
+        parsed = pd.to_numeric(np.asarray(stripped, dtype=object), errors='coerce').astype(np.float64)
+    values = np.append(parsed, np.nan)[codes]
+    return pd.Series(values, index=series.index, name=series.name).astype(dtype), sample_unit(series)
+
+def clean_numeric_columns(df, columns, schema=NUMERIC_SCHEMA):
+    # 原地清洗 df 中存在的 columns，返回 {列名: 单位} (Clean in place; returns detected units per column)
+    units = {}
+    for col in columns:
+        if col not in df.columns: continue
+        df[col], units[col] = clean_numeric_column(df[col], schema.get(col, np.float64))
+    return units
+
+ENCODING_SAMPLE_BYTES = 256 * 1024 # 编码检测只读取文件开头这么多字节 (Bounded sample for encoding detection)
+MEMORY_MAP_MIN_BYTES = 8 * 1024 * 1024 # 大文件解析时使用内存映射 (Memory-map files at least this large)
+
+def detect_encodings(sample, complete=True):
+    """按 BOM 和解码有效性给出候选编码，最可能的在前 (Candidate encodings for a byte sample, best first).
+
+    complete 为 False 时样本可能在多字节字符中间截断，末尾不完整的序列不算无效。
+    表头含 "显示器型号" 的候选优先；没有任何候选有效时退回 CSV_ENCODINGS 的原始顺序。
+    """
+    if sample.startswith(codecs.BOM_UTF8): return ['utf-8-sig']
+    valid, with_header = [], []
+    for enc in CSV_ENCODINGS:
+        if enc == 'utf-8-sig': continue
+        try:
+            text = codecs.getincrementaldecoder(enc)().decode(sample, final=complete)
+        except UnicodeDecodeError:
+            continue
+        (with_header if '显示器型号' in text.split('\n', 1)[0] else valid).append(enc)
+    return with_header + valid or list(CSV_ENCODINGS)
+
+_DATASET_VERSIONS = itertools.count(1)
+
+
+class MonitorDataset:
+    """已加载的数据集：属性列立即清洗，指标列按需解析并缓存 (Loaded dataset with lazily parsed metric columns).
+
+    frame 中的指标列保持 CSV 原始字符串；ds[列名] 第一次访问某个指标列时才清洗并缓存为浮点列。
+    每个指标的排序结果也按列缓存 (sortedRows)；数据集内容不可变，追加行 (concat) 得到新的 version，
+    已缓存的升序结果只对新增行排序后插入，不重新整体排序。
+    提供 build_row_model 用到的 DataFrame 接口子集 (empty、columns、len()、[列名])。
+    """
+    ATTRIBUTE_NUMERIC_COLUMNS = ("显示器尺寸", "刷新率")
+
+    def __init__(self, frame, metric_columns, lazy=True):
+        self.frame = frame
+        self.metric_columns = [c for c in metric_columns if c in frame.columns]
+        self.units = {}
+        self._numeric = {}
+        self._lock = threading.Lock()
+        self.units.update(clean_numeric_columns(frame, self.ATTRIBUTE_NUMERIC_COLUMNS))
+        self.attributes = AttributeTable.from_frame(frame) if not frame.empty else None
+        self.source = None # 来源文件信息，供增量重载判断是否只是追加 (see file_source)
+        self.version = next(_DATASET_VERSIONS)
+        self._orders = {}
+        self._filter_index = None
+        self._normalized = {}
+        if not lazy: self.materialize(self.metric_columns)
+
+    @classmethod
+    def fromParts(cls, frame, metric_columns, units, attributes, numeric):
+        # 由已清洗好的各部分直接组装，不再解析 (Assemble from already-cleaned parts, e.g. a DatasetCache hit)
+        ds = cls.__new__(cls)
+        ds.frame = frame
+        ds.metric_columns = list(metric_columns)
+        ds.units = dict(units)
+        ds._numeric = dict(numeric)
+        ds._lock = threading.Lock()
+        ds.attributes = attributes
+        ds.source = None
+        ds.version = next(_DATASET_VERSIONS)
+        ds._orders = {}
+        ds._filter_index = None
+        ds._normalized = {}
+        return ds
+
+    def concat(self, tail):
+        # 返回追加了 tail (同结构的 MonitorDataset) 的新数据集；已解析的指标列只解析新增部分
+        if tail.empty: return self
+        if self.empty: return tail
+        frame = pd.concat([self.frame, tail.frame])
+        attributes = AttributeTable({f: np.concatenate([self.attributes.column(f), tail.attributes.column(f)]) for f in AttributeTable.FIELDS})
+        numeric = {col: pd.concat([values, tail[col]]) for col, values in list(self._numeric.items())}
+        ds = MonitorDataset.fromParts(frame, self.metric_columns, {**tail.units, **self.units}, attributes, numeric)
+        ds.source = tail.source
+        for (col, lower_is_better), (rows, values) in list(self._orders.items()):
+            if not lower_is_better: continue # 降序由合并后的升序 O(N) 得到
+            tail_rows, tail_values = _ascending_rows(_metric_values(tail[col]))
+            ds._orders[(col, True)] = _merge_ascending(rows, values, tail_rows + len(self), tail_values)
+            if (col, False) in self._orders: ds._orders[(col, False)] = _reverse_keeping_ties(*ds._orders[(col, True)])
+        return ds
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getitem__(self, col):
+        if col not in self.metric_columns: return self.frame[col]
+        values = self._numeric.get(col)
+        if values is None:
+            with self._lock: # 导出工作线程也可能触发解析 (Export workers may materialize too)
+                values = self._numeric.get(col)
+                if values is None:
+                    values, self.units[col] = clean_numeric_column(self.frame[col], NUMERIC_SCHEMA.get(col, np.float64))
+                    self._numeric[col] = values
+        return values
+
+    def materialize(self, columns):
+        for col in columns:
+            if col in self.metric_columns: self[col]
+
+    def isMaterialized(self, col):
+        return col in self._numeric
+
+    def cachedOrder(self, col, lower_is_better):
+        # 已缓存的排序结果，没有时返回 None 而不触发排序
+        return self._orders.get((col, bool(lower_is_better)))
+
+    def sortedRows(self, col, lower_is_better):
+        """返回该指标非空行的 (行位置, 数值)，按排序方向排列 (Cached per-metric sort order).
+
+        每列只做一次稳定 argsort；另一个方向由 O(N) 反转得到，两者都缓存到数据集失效 (即被替换) 为止。
+        """
+        key = (col, bool(lower_is_better))
+        cached = self._orders.get(key)
+        if cached is not None: return cached
+        asc = self._orders.get((col, True))
+        if asc is None:
+            asc = _ascending_rows(_metric_values(self[col]))
+            self._orders[(col, True)] = asc
+        if lower_is_better: return asc
+        desc = _reverse_keeping_ties(*asc)
+        self._orders[key] = desc
+        return desc
+
+    def normalizedMatrix(self, columns, lower_is_better, method):
+        # 综合评分用的归一化矩阵，按 (列, 方向, 归一化方式) 缓存；拖动权重时不再重复归一化
+        key = (tuple(columns), tuple(lower_is_better), method)
+        matrix = self._normalized.get(key)
+        if matrix is None:
+            matrix = normalized_matrix([_metric_values(self[c]) for c in columns], lower_is_better, method)
+            self._normalized[key] = matrix
+        return matrix
+
+    def filterIndex(self):
+        # 按需建立的筛选索引，随数据集一起失效 (Lazily built FilterIndex, replaced together with the dataset)
+        if self._filter_index is None: self._filter_index = FilterIndex(self)
+        return self._filter_index
+
+    def sampleUnits(self):
+        # 只看每列开头的有限样本，不触发完整解析 (Bounded-sample unit guess that does not parse whole columns)
+        units = {}
+        for col in self.metric_columns:
+            units[col] = self.units[col] if col in self.units else sample_unit(self.frame[col])
+        return units
+
+    def memoryBytes(self):
+        raw = int(self.frame.memory_usage(index=True, deep=True).sum())
+        return raw + sum(int(v.memory_usage(index=False)) for v in self._numeric.values())
+
+
+SOURCE_TAIL_BYTES = 64 * 1024 # 增量重载时比对的已读末尾字节数 (Tail bytes compared to detect a pure append)
+
+def file_source(fn, encoding, size=None):
+    # 记录表头和已读末尾片段，用于判断文件之后是否只是在末尾追加了行
+    size = os.path.getsize(fn) if size is None else size
+    with open(fn, 'rb') as f:
+        header = f.readline()
+        start = max(0, size - SOURCE_TAIL_BYTES)
+        f.seek(start)
+        tail = f.read(size - start)
+    return {"path": fn, "encoding": encoding, "size": size, "header": header, "tail": tail}
+
+def read_appended_rows(source, next_index=0):
+    """若文件自 source 记录以来只是在末尾追加了行，返回 (新增行 DataFrame, 新的 source)；否则返回 None.
+
+    只比对表头和原末尾的 SOURCE_TAIL_BYTES 字节 (而不是整个前缀)，并且只解析新增的字节。
+    末尾未写完的半行留到下次读取。新增行的 index 从 next_index 开始。
+    """
+    fn = source["path"]
+    size = os.path.getsize(fn)
+    if size < source["size"] or not source["tail"].endswith(b"\n"): return None
+    with open(fn, 'rb') as f:
+        if f.readline() != source["header"]: return None
+        f.seek(source["size"] - len(source["tail"]))
+        if f.read(len(source["tail"])) != source["tail"]: return None
+        appended = f.read(size - source["size"])
+    complete = appended[:appended.rfind(b"\n") + 1]
+    new_source = dict(source, size=source["size"] + len(complete),
+                      tail=(source["tail"] + complete)[-SOURCE_TAIL_BYTES:])
+    if not complete.strip():
+        return pd.DataFrame(), new_source
+    df = pd.read_csv(io.BytesIO(source["header"] + complete), encoding=source["encoding"], on_bad_lines='skip', dtype=str)
+    df = df.rename(columns=lambda x: x.strip())
+    df = df.dropna(subset=['显示器型号'])
+    df = df[df['显示器型号'].astype(str).str.strip() != ''].copy()
+    df.index = pd.RangeIndex(next_index, next_index + len(df))
+    return df, new_source
+
+LOAD_CHUNK_ROWS = 20000 # 分块读取 CSV 的行数 (Rows per read_csv chunk)
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+@PROFILER.measure("load_dataset")
+def load_dataset(fn, known_columns=KNOWN_COLUMNS, lazy=True, on_chunk=None, cancel=None, chunksize=LOAD_CHUNK_ROWS, cache=None):
+    """读取显示器 CSV 并构建 MonitorDataset (Read a monitor CSV into a MonitorDataset).
+
+    编码由文件开头的有限样本一次确定，通常只解析一次文件。文件按 chunksize 行分块读取；
+    每读完一块调用 on_chunk(已读块列表, 已读行数, 估计总行数)。cancel (threading.Event) 被置位时抛出 LoadCancelled。
+    lazy 为 False 时在加载时清洗全部指标列。
+    返回 (dataset, info, 新发现的指标配置)；info 含 encoding、detect_seconds、parse_attempts、
+    units (各数值列的单位)、clean_seconds、load_seconds、memory_bytes 和 cache_hit。
+    传入 DatasetCache 时先查缓存，命中则不读取 CSV；写入缓存由调用方在合适的时机调用 cache.store()。
+    不修改全局 CHART_CONFIG。所有候选编码都失败时 dataset 为 None。
+    """
+    t0 = time.perf_counter()
+    if cache is not None:
+        try:
+            hit = cache.lookup(fn, known_columns)
+        except OSError as e:
+            print(f"Dataset cache lookup failed: {e}"); hit = None
+        PROFILER.count("dataset_cache_hit" if hit is not None else "dataset_cache_miss")
+        if hit is not None:
+            dataset, manifest = hit
+            info = {"encoding": manifest.get("encoding"), "detect_seconds": 0.0, "parse_attempts": 0, "units": dict(dataset.units),
+                    "clean_seconds": 0.0, "load_seconds": time.perf_counter() - t0, "memory_bytes": dataset.memoryBytes(), "cache_hit": True}
+            dataset.source = file_source(fn, manifest.get("encoding"), manifest["size"])
+            return dataset, info, discover_metric_configs(dataset.columns, known_columns, info["units"])
+    size = os.path.getsize(fn)
+    with open(fn, 'rb') as f:
+        sample = f.read(ENCODING_SAMPLE_BYTES)
+    candidates = detect_encodings(sample, complete=len(sample) >= size)
+    info = {"encoding": None, "detect_seconds": time.perf_counter() - t0, "parse_attempts": 0, "cache_hit": False}
+    estimated_rows = max(1, int(size * max(1, sample.count(b'\n')) / max(1, len(sample))))
+
+    for enc in candidates:
+        info["parse_attempts"] += 1
+        try:
+            frames, rows_read = [], 0
+            with pd.read_csv(fn, encoding=enc, on_bad_lines='skip', dtype=str, chunksize=chunksize,
+                             memory_map=size >= MEMORY_MAP_MIN_BYTES) as reader:
+                for chunk in reader:
+                    if cancel is not None and cancel.is_set(): raise LoadCancelled()
+                    chunk = chunk.rename(columns=lambda x: x.strip())
+                    if '显示器型号' not in chunk.columns:
+                        break
+                    rows_read += len(chunk)
+                    chunk = chunk.dropna(subset=['显示器型号'])
+                    frames.append(chunk[chunk['显示器型号'].astype(str).str.strip() != ''])
+                    if on_chunk is not None: on_chunk(frames, rows_read, max(rows_read, estimated_rows))
+            if not frames:
+                continue
+
+            df = pd.concat(frames) if len(frames) > 1 else frames[0].copy()
+            t_clean = time.perf_counter()
+            dataset = MonitorDataset(df, [c for c in df.columns if c not in known_columns], lazy=lazy)
+            info["clean_seconds"] = time.perf_counter() - t_clean
+            info["units"] = dataset.sampleUnits()
+            new_configs = discover_metric_configs(df.columns, known_columns, info["units"])
+            info["encoding"] = enc
+            info["load_seconds"] = time.perf_counter() - t0
+            info["memory_bytes"] = dataset.memoryBytes()
+            dataset.source = file_source(fn, enc, size)
+            return dataset, info, new_configs
+        except LoadCancelled:
+            raise
+        except Exception as e:
+            print(f"Error loading CSV with encoding {enc}: {e}")
+    return None, info, {}
+
+DATASET_CACHE_DIR = os.environ.get("MONITORRANKER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "MonitorRanker"))
+DATASET_CACHE_BUDGET_BYTES = 512 * 1024 * 1024
+
+
+def _save_strings(stem, values):
+    # 字符串列存为 int32 编码 + 去重取值，两者都可以内存映射 (Strings as int32 codes + uniques)
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    np.save(stem + ".codes.npy", codes.astype(np.int32))
+    np.save(stem + ".uniques.npy", np.asarray(uniques, dtype=str))
+
+def _load_strings(stem, missing=np.nan):
+    codes = np.load(stem + ".codes.npy", mmap_mode="r")
+    uniques = np.append(np.load(stem + ".uniques.npy").astype(object), [missing]) # 编码 -1 对应缺失值
+    return uniques[codes]
+
+
+class DatasetCache:
+    """清洗后数据集的磁盘缓存 (On-disk cache of cleaned datasets as memory-mappable .npy columns).
+
+    每个 CSV 一个条目目录，以 (路径, 大小, mtime) 快速校验；mtime 变化时再比对内容哈希。
+    条目包含框架列、指标列、AttributeTable 和检测到的单位；总大小超过预算时按最近使用时间淘汰。
+    已解析的指标列存为浮点 .npy，命中时直接内存映射 (不复制)；尚未解析的指标列存原始字符串，命中后仍按需解析。
+    """
+    FORMAT_VERSION = 1
+
+    def __init__(self, root=DATASET_CACHE_DIR, budget_bytes=DATASET_CACHE_BUDGET_BYTES):
+        self.root = root
+        self.budget_bytes = budget_bytes
+
+    @staticmethod
+    def contentHash(fn):
+        h = hashlib.blake2b(digest_size=20)
+        with open(fn, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""): h.update(block)
+        return h.hexdigest()
+
+    def _entryDir(self, fn):
+        return os.path.join(self.root, hashlib.sha1(os.path.abspath(fn).encode("utf-8")).hexdigest()[:16])
+
+    def _readManifest(self, entry):
+        try:
+            with open(os.path.join(entry, "manifest.json"), encoding="utf-8") as f: return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, fn, known_columns=KNOWN_COLUMNS):
+        """命中时返回 (dataset, manifest)，否则返回 None。"""
+        entry = self._entryDir(fn)
+        m = self._readManifest(entry)
+        if m is None or m.get("version") != self.FORMAT_VERSION or m.get("known_columns") != list(known_columns): return None
+        st = os.stat(fn)
+        if (m["size"], m["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+            if m["size"] != st.st_size or m["content_hash"] != self.contentHash(fn): return None
+            m["mtime_ns"] = st.st_mtime_ns # 内容未变，只是被 touch 过
+            self._writeManifest(entry, m)
+        try:
+            dataset = self._readDataset(entry, m)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Discarding unreadable dataset cache {entry}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        os.utime(os.path.join(entry, "manifest.json")) # 记录最近使用 (LRU timestamp)
+        return dataset, m
+
+    def _readDataset(self, entry, m):
+        data = {}
+        index = pd.Index(np.load(os.path.join(entry, "index.npy")))
+        for i, (col, kind) in enumerate(m["columns"]):
+            stem = os.path.join(entry, f"c{i}")
+            values = np.load(stem + ".npy", mmap_mode="r") if kind == "float" else _load_strings(stem)
+            data[col] = pd.Series(values, index=index, copy=False) # copy=False: 浮点列保持内存映射
+        # 逐列构造且不合并成块，浮点列不会被复制 (A dict with copy=False keeps one block per column, still mmapped)
+        frame = pd.DataFrame(data, index=index, columns=[c for c, _ in m["columns"]], copy=False)
+        numeric = {col: data[col] for col in m["metric_columns"] if m["column_kinds"][col] == "float"}
+        attributes = None
+        if len(frame):
+            attrs = {}
+            for i, field in enumerate(AttributeTable.FIELDS):
+                stem = os.path.join(entry, f"a{i}")
+                attrs[field] = np.load(stem + ".npy", mmap_mode="r") if field in m["attribute_floats"] else _load_strings(stem, "")
+            attributes = AttributeTable(attrs)
+        return MonitorDataset.fromParts(frame, m["metric_columns"], m["units"], attributes, numeric)
+
+    def _writeManifest(self, entry, m):
+        tmp = os.path.join(entry, "manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(m, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(entry, "manifest.json"))
+
+    def store(self, fn, dataset, info, known_columns=KNOWN_COLUMNS):
+        """把数据集写入缓存 (Writes the entry without parsing any metric column).
+
+        已解析的指标列写成浮点列；其余指标列写原始字符串 (kind "raw")，读回后仍按需解析。
+        """
+        st = os.stat(fn)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_entry = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            columns, kinds = [], {}
+            for i, col in enumerate(dataset.columns):
+                stem = os.path.join(tmp_entry, f"c{i}")
+                if col in dataset.metric_columns and not dataset.isMaterialized(col):
+                    _save_strings(stem, dataset.frame[col]); kinds[col] = "raw"
+                    columns.append((col, kinds[col])); continue
+                values = dataset[col]
+                if pd.api.types.is_float_dtype(values.dtype):
+                    np.save(stem + ".npy", values.to_numpy()); kinds[col] = "float"
+                else:
+                    _save_strings(stem, values); kinds[col] = "str"
+                columns.append((col, kinds[col]))
+            np.save(os.path.join(tmp_entry, "index.npy"), dataset.frame.index.to_numpy())
+            attribute_floats = []
+            if dataset.attributes is not None:
+                for i, field in enumerate(AttributeTable.FIELDS):
+                    arr = dataset.attributes.column(field); stem = os.path.join(tmp_entry, f"a{i}")
+                    if arr.dtype.kind == "f": np.save(stem + ".npy", arr); attribute_floats.append(field)
+                    else: _save_strings(stem, arr)
+            m = {"version": self.FORMAT_VERSION, "path": os.path.abspath(fn), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                 "content_hash": self.contentHash(fn), "known_columns": list(known_columns), "encoding": info.get("encoding"),
+                 "columns": columns, "column_kinds": kinds, "metric_columns": dataset.metric_columns,
+                 "units": dataset.units, "attribute_floats": attribute_floats}
+            self._writeManifest(tmp_entry, m)
+            entry = self._entryDir(fn)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp_entry, entry)
+        except Exception:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            raise
+        self.evict(keep=entry)
+
+    @staticmethod
+    def _dirBytes(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+    def entries(self):
+        # [(最近使用时间, 字节数, 目录)]，最旧的在前
+        if not os.path.isdir(self.root): return []
+        out = []
+        for name in os.listdir(self.root):
+            entry = os.path.join(self.root, name); manifest = os.path.join(entry, "manifest.json")
+            if name.startswith(".tmp-") or not os.path.isfile(manifest): continue
+            out.append((os.path.getmtime(manifest), self._dirBytes(entry), entry))
+        return sorted(out)
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.budget_bytes: break
+            if entry == keep: continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def stats(self):
+        entries = self.entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries), "budget_bytes": self.budget_bytes}
+
+
+def apply_color_scheme(name, force_update_new_metrics=False):
+    # 把配色方案提交到 CONFIG_STORE (Commit a colour scheme to the config store)
+    CONFIG_STORE.applyColorScheme(name, force_update_new_metrics)
+    return COLOR_SCHEMES.get(name, COLOR_SCHEMES["默认"])
+
+
+# --- 数据筛选 (Filtering) ---
+def parse_range(text):
+    """解析 "27-32"、"144-"、"-1.5"、"27" 之类的闭区间，空字符串返回 None；格式错误时抛出 ValueError."""
+    text = (text or "").strip()
+    if not text: return None
+    m = re.fullmatch(r'(\d+(?:\.\d*)?|\.\d+)?\s*(?:[-–~至]\s*(\d+(?:\.\d*)?|\.\d+)?)?', text)
+    if not m or (m.group(1) is None and m.group(2) is None): raise ValueError(f"无效的范围: {text}")
+    lo = float(m.group(1)) if m.group(1) is not None else None
+    hi = float(m.group(2)) if m.group(2) is not None else None
+    if m.group(0).strip() == m.group(1): hi = lo # 单个数值表示等于该值
+    if lo is not None and hi is not None and hi < lo: raise ValueError(f"无效的范围: {text}")
+    return lo, hi
+
+def format_range(bounds):
+    lo, hi = bounds
+    if lo == hi: return f"{lo:g}"
+    return f"{'' if lo is None else f'{lo:g}'}-{'' if hi is None else f'{hi:g}'}"
+
+
+class DatasetFilter:
+    """不可变的筛选条件 (Immutable filter spec over panel type, resolution, size, refresh rate and metric ranges).
+
+    panels / resolutions 为允许的取值 (面板类型原文、分辨率显示文本)，空表示不限；size / refresh 为闭区间 (lo, hi)，
+    任一端为 None 表示不限；metric_ranges 为 {csv 列名: (lo, hi)}，该指标为空值的行会被筛掉。
+    """
+    def __init__(self, panels=(), resolutions=(), size=None, refresh=None, metric_ranges=None):
+        self.panels = frozenset(panels); self.resolutions = frozenset(resolutions)
+        self.size = size; self.refresh = refresh
+        self.metric_ranges = dict(metric_ranges or {})
+
+    def key(self):
+        return (self.panels, self.resolutions, self.size, self.refresh, tuple(sorted(self.metric_ranges.items())))
+
+    def __eq__(self, other):
+        return isinstance(other, DatasetFilter) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def isEmpty(self):
+        return not (self.panels or self.resolutions or self.size or self.refresh or self.metric_ranges)
+
+    def describe(self):
+        parts = []
+        if self.panels: parts.append("/".join(sorted(self.panels)))
+        if self.resolutions: parts.append("/".join(sorted(self.resolutions)))
+        if self.size: parts.append(f'{format_range(self.size)}"')
+        if self.refresh: parts.append(f"{format_range(self.refresh)}Hz")
+        parts.extend(f"{col} {format_range(b)}" for col, b in sorted(self.metric_ranges.items()))
+        return "，".join(parts)
+
+
+class FilterIndex:
+    """数据集上的筛选索引 (Precomputed filter index over one MonitorDataset).
+
+    类别列 (面板类型、分辨率) 做一次 factorize，每个取值的布尔位图在第一次用到时生成并缓存；
+    数值列 (尺寸、刷新率、指标) 使用稳定升序的行序，区间用 searchsorted 取出，不逐行比较。
+    组合后的掩码按筛选条件缓存，切换指标、排序方向或名次范围时不再重算。只在 GUI 线程使用。
+    """
+    CATEGORY_FIELDS = {"panel": "panel", "resolution": "resolution_text"}
+    NUMERIC_FIELDS = {"size": "size_numeric", "refresh": "refresh_numeric"}
+    MASK_CACHE_SIZE = 16
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self._codes = {}
+        self._bitmaps = {}
+        self._orders = {}
+        self._masks = OrderedDict()
+
+    def _factorized(self, field):
+        if field not in self._codes:
+            self._codes[field] = pd.factorize(self.dataset.attributes.column(self.CATEGORY_FIELDS[field]))
+        return self._codes[field]
+
+    def categories(self, field):
+        # 该列出现过的取值及行数，按行数降序 (Values present in a category column with their row counts)
+        codes, uniques = self._factorized(field)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        return sorted(((str(u), int(c)) for u, c in zip(uniques, counts)), key=lambda t: -t[1])
+
+    def _bitmap(self, field, value):
+        key = (field, value)
+        if key not in self._bitmaps:
+            codes, uniques = self._factorized(field)
+            hit = np.flatnonzero(uniques == value)
+            self._bitmaps[key] = codes == hit[0] if hit.size else np.zeros(len(codes), dtype=bool)
+        return self._bitmaps[key]
+
+    def _sorted(self, field):
+        # 非空行的稳定升序 (行位置, 数值)；指标列复用数据集的排序缓存
+        if field in self.NUMERIC_FIELDS:
+            if field not in self._orders:
+                self._orders[field] = _ascending_rows(self.dataset.attributes.column(self.NUMERIC_FIELDS[field]))
+            return self._orders[field]
+        return self.dataset.sortedRows(field, True)
+
+    def _range_mask(self, field, bounds):
+        rows, values = self._sorted(field)
+        lo, hi = bounds
+        start = 0 if lo is None else int(np.searchsorted(values, lo, side="left"))
+        stop = len(values) if hi is None else int(np.searchsorted(values, hi, side="right"))
+        mask = np.zeros(len(self.dataset), dtype=bool)
+        mask[rows[start:stop]] = True
+        return mask
+
+    def mask(self, flt):
+        """返回筛选后的行掩码；条件为空时返回 None (表示不筛选)。"""
+        if flt is None or flt.isEmpty() or self.dataset.empty: return None
+        key = flt.key()
+        cached = self._masks.get(key)
+        if cached is not None:
+            self._masks.move_to_end(key); return cached
+        mask = np.ones(len(self.dataset), dtype=bool)
+        for field, values in (("panel", flt.panels), ("resolution", flt.resolutions)):
+            if values: mask &= np.logical_or.reduce([self._bitmap(field, v) for v in values])
+        for field, bounds in (("size", flt.size), ("refresh", flt.refresh)):
+            if bounds: mask &= self._range_mask(field, bounds)
+        for col, bounds in flt.metric_ranges.items():
+            if col in self.dataset.metric_columns: mask &= self._range_mask(col, bounds)
+            else: mask[:] = False
+        mask.flags.writeable = False # 与渲染器、导出线程共享 (Shared with renderers and export workers)
+        self._masks[key] = mask
+        while len(self._masks) > self.MASK_CACHE_SIZE: self._masks.popitem(last=False)
+        return mask
+
+    def count(self, flt):
+        mask = self.mask(flt)
+        return len(self.dataset) if mask is None else int(np.count_nonzero(mask))
+
+
+class RankQuery:
+    """名次范围查询：前 K、后 K、名次区间 [start, end]、某型号附近 ±radius (Rank-range query over a ladder)."""
+    MODES = ("all", "top", "bottom", "ranks", "around")
+    LABELS = ("全部", "前 K 名", "后 K 名", "名次区间", "型号附近")
+    PLACEHOLDERS = ("", "K，例如 20", "K，例如 20", "例如 40-60", "型号，可加半径，例如 KTC H24F8 ±10")
+    DEFAULT_RADIUS = 10
+
+    def __init__(self, mode="all", k=20, start=1, end=None, model=None, radius=DEFAULT_RADIUS):
+        if mode not in self.MODES: raise ValueError(f"unknown rank query mode: {mode}")
+        self.mode = mode; self.k = k; self.start = start; self.end = end
+        self.model = model; self.radius = radius
+
+    def __eq__(self, other):
+        return isinstance(other, RankQuery) and vars(self) == vars(other)
+
+    def isAll(self):
+        return self.mode == "all"
+
+    @classmethod
+    def parse(cls, mode, text):
+        # 解析控制面板/命令行的输入，无效时抛出 ValueError
+        text = (text or "").strip()
+        if mode == "all": return cls()
+        if mode in ("top", "bottom"):
+            k = int(text)
+            if k <= 0: raise ValueError("K 必须为正整数")
+            return cls(mode, k=k)
+        if mode == "ranks":
+            m = re.fullmatch(r'(\d+)\s*[-–~至]\s*(\d+)', text)
+            if not m: raise ValueError("名次区间格式应为 起-止")
+            start, end = int(m.group(1)), int(m.group(2))
+            if start <= 0 or end < start: raise ValueError("名次区间无效")
+            return cls(mode, start=start, end=end)
+        m = re.fullmatch(r'(.*?)(?:\s*[±,，]\s*(\d+))?', text)
+        if not m or not m.group(1): raise ValueError("请输入型号")
+        return cls(mode, model=m.group(1), radius=int(m.group(2)) if m.group(2) else cls.DEFAULT_RADIUS)
+
+
+def _rank_slice(key, start, stop):
+    # 稳定升序排序后第 [start, stop) 名的位置；用 np.partition 找边界值，只对边界内的候选排序
+    n = len(key)
+    start, stop = max(0, start), min(n, stop)
+    if start >= stop: return np.empty(0, dtype=np.int64)
+    part = np.partition(key, (start, stop - 1))
+    lo, hi = part[start], part[stop - 1]
+    below = int(np.count_nonzero(key < lo))
+    cand = np.flatnonzero((key >= lo) & (key <= hi))
+    cand = cand[np.argsort(key[cand], kind="stable")]
+    return cand[start - below:stop - below]
+
+def _match_model(names, model):
+    # 先精确匹配 (忽略大小写)，再子串匹配；返回匹配行的位置 (Exact, then substring match on model names)
+    names = pd.Series(names, dtype=object).astype(str).str.strip().str.casefold()
+    needle = model.strip().casefold()
+    hits = np.flatnonzero((names == needle).to_numpy())
+    if hits.size == 0: hits = np.flatnonzero(names.str.contains(needle, regex=False).to_numpy())
+    return hits
+
+def _ranking_inputs(df, config, attributes, mask=None):
+    if df is None or df.empty or not metric_available(config, df.columns): return None
+    if attributes is None or len(attributes) != len(df):
+        attributes = AttributeTable.from_frame(df)
+    values = metric_values(df, config)
+    valid = ~np.isnan(values)
+    if mask is not None: valid &= mask
+    keep = np.flatnonzero(valid)
+    return attributes, keep, values[keep]
+
+def find_model_rank(df, config, model, attributes=None, mask=None):
+    """某型号在该指标天梯中的绝对名次 (从 1 开始)，O(N) 不排序；未找到时返回 None。
+
+    有多个匹配时取名次最高的一个。返回 (名次, 天梯总行数, 匹配到的完整型号)。给定 mask 时在筛选后的天梯中计算。
+    """
+    inputs = _ranking_inputs(df, config, attributes, mask)
+    if inputs is None: return None
+    attributes, keep, vals = inputs
+    hits = _match_model(attributes.column("name")[keep], model)
+    if hits.size == 0: return None
+    key = vals if config.get("lower_is_better", False) else -vals
+    best = hits[np.argmin(key[hits])] # 同值时 hits 升序，argmin 取第一个即原始顺序最前者
+    rank = int(np.count_nonzero(key < key[best]) + np.count_nonzero(key[:best] == key[best]))
+    return rank + 1, len(keep), attributes.column("name")[keep[best]]
+
+def run_rank_query(df, config, query=None, attributes=None, mask=None):
+    """按 RankQuery 取天梯的一段连续名次，使用部分选择而非全量排序 (Windowed ladder via partial selection).
+
+    query 为 None 或 "all" 时等同 build_row_model。MonitorDataset 已缓存该方向的排序时直接切片。
+    结果的 first_rank 为绝对名次，value_max 为完整天梯的最大值；给定 mask 时均相对于筛选后的天梯。
+    """
+    if query is None or query.isAll(): return build_row_model(df, config, attributes, mask)
+    inputs = _ranking_inputs(df, config, attributes, mask)
+    if inputs is None: return RowModel.empty()
+    attributes, keep, vals = inputs
+    n = len(keep)
+    if query.mode == "top": start, stop = 0, query.k
+    elif query.mode == "bottom": start, stop = n - query.k, n
+    elif query.mode == "ranks": start, stop = query.start - 1, query.end
+    else:
+        found = find_model_rank(df, config, query.model, attributes, mask)
+        if found is None: return RowModel.empty()
+        start, stop = found[0] - 1 - query.radius, found[0] + query.radius
+    start, stop = max(0, start), min(n, stop)
+    if start >= stop: return RowModel.empty()
+
+    asc = config.get("lower_is_better", False)
+    cached = df.cachedOrder(config["csv_column"], asc) if isinstance(df, MonitorDataset) and not is_composite(config) else None
+    if cached is not None:
+        rows, values = cached
+        if mask is not None:
+            keep = mask[rows]
+            rows, values = rows[keep], values[keep]
+        rows, values = rows[start:stop], values[start:stop]
+    else:
+        sel = _rank_slice(vals if asc else -vals, start, stop)
+        rows, values = keep[sel], vals[sel]
+    columns = attributes.take(rows)
+    columns["value"] = values
+    return RowModel(columns, first_rank=start + 1, total=n, value_max=float(vals.max()))
+
+
+def merge_row_models(model, added, lower_is_better):
+    """把已排序的 added 行插入已排序的 model，不重新排序 (Sorted insertion of an already sorted batch).
+
+    added 中的行视为原始顺序在 model 之后 (追加的行)，因此与数值相同的已有行并列时排在其后，
+    结果与对合并后的数据做稳定排序一致。返回 (合并后的 RowModel, 第一个位置发生变化的行号)。
+    """
+    if not len(added): return model, len(model)
+    if not len(model): return added, 0
+    key_old, key_new = model.column("value"), added.column("value")
+    if not lower_is_better: key_old, key_new = -key_old, -key_new
+    pos = np.searchsorted(key_old, key_new, side="right")
+    return RowModel({f: np.insert(model.columns[f], pos, added.columns[f]) for f in model.columns}), int(pos[0])
+
+
+class ChartLayout:
+    """ChartWidget 的一份排版缓存 (Scaled fonts, font metrics, column geometry and per-row text widths).
+
+    由 ChartWidget.chartLayout() 按 (数据版本, 导出模式, 缩放, 显示尺寸分辨率, 宽度) 构建并缓存。
+    """
+    def __init__(self, key):
+        self.key = key
+
+
+class RowTileCache:
+    """按字节预算做 LRU 淘汰的行图块缓存 (LRU cache of pre-rendered ladder rows, bounded by a byte budget)."""
+    def __init__(self, budget_bytes):
+        self._tiles = OrderedDict()
+        self.budget_bytes = budget_bytes
+        self.bytes_used = 0
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _cost(pix):
+        return pix.width() * pix.height() * max(1, pix.depth() // 8)
+
+    def get(self, key):
+        pix = self._tiles.get(key)
+        if pix is None:
+            self.misses += 1
+            return None
+        self._tiles.move_to_end(key)
+        self.hits += 1
+        return pix
+
+    def put(self, key, pix):
+        cost = self._cost(pix)
+        if cost > self.budget_bytes: return
+        old = self._tiles.pop(key, None)
+        if old is not None: self.bytes_used -= self._cost(old)
+        self._tiles[key] = pix
+        self.bytes_used += cost
+        self._evict()
+
+    def setBudget(self, budget_bytes):
+        self.budget_bytes = max(0, int(budget_bytes))
+        self._evict()
+
+    def _evict(self):
+        while self.bytes_used > self.budget_bytes and self._tiles:
+            _, pix = self._tiles.popitem(last=False)
+            self.bytes_used -= self._cost(pix)
+            self.evictions += 1
+
+    def clear(self):
+        self._tiles.clear()
+        self.bytes_used = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"tiles": len(self._tiles), "bytes": self.bytes_used, "budget_bytes": self.budget_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_DATA_VERSIONS = itertools.count(1)
+
+
+class ChartRenderer:
+    """天梯图的绘制逻辑，与 QWidget 无关 (Widget-independent ladder painter).
+
+    可以绘制到任意 QPaintDevice：ChartWidget 用它绘制屏幕，导出时则在工作线程中绘制到 QImage。
+    QPixmap 行图块只在 GUI 线程中使用 (tiles 参数为 None 时直接绘制)。
+    """
     EXPORT_TARGET_WIDTH = 1920
     EXPORT_FONT_SCALE_FACTOR = 1.4
+    EXPORT_DPR = 1.8
+    EXPORT_BAND_HEIGHT = 1024 # 流式导出每段的设备像素高度 (Device-pixel rows rendered per export band)
     EXPORT_LAYOUT_PARAMS = { 
         "name_text_top_padding_abs": 8, 
         "gap_before_footnote_abs": 2, 
@@ -139,17 +1714,20 @@ class ChartWidget(QWidget):
         "sub_label_line_extra_padding": 3, 
     }
 
-    theme_changed = pyqtSignal() 
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self):
         self.data = []
         self.metric_key = None
         self.config = {}
-        self._is_export_mode = False
-        self._export_content_width = None
+        self.max_value_for_bar = 1
+        self.export_mode = False
         self.show_size_resolution = False
-        self.value_label_inside = False 
+        self.value_label_inside = False
+        self.panel_colors = None # None 表示使用 CONFIG_STORE 当前快照的面板配色
+        self.config_version = 0 # config 与 panel_colors 所属的配置快照版本，参与布局和行图块缓存键
+        self.data_version = 0
+        self.export_dpr = self.EXPORT_DPR
+        self.export_width = self.EXPORT_TARGET_WIDTH # 导出排版的逻辑宽度；从 ChartWidget 导出时为图表区的当前宽度
+        self._layout_cache = {}
 
         ff = "Source Han Sans CN" 
         self.base_title_font = QFont(ff, int(20 * 1.3), QFont.Weight.ExtraBold)
@@ -171,8 +1749,6 @@ class ChartWidget(QWidget):
         self.current_base_row_height_compact = self.EXPORT_LAYOUT_PARAMS["row_height_compact"]
         self.current_base_row_height_full = self.EXPORT_LAYOUT_PARAMS["row_height_full"]
         self.current_base_title_height = self.EXPORT_LAYOUT_PARAMS["base_title_height"]
-        self.current_row_height = self.current_base_row_height_compact
-
 
         self.min_size, self.max_size = 0,1
         self.min_refresh, self.max_refresh = 0,1
@@ -184,84 +1760,65 @@ class ChartWidget(QWidget):
         self.chart_empty_text_color = QColor(THEMES["dark"]["chart_empty_text"])
         self.bar_background_color = QColor(THEMES["dark"]["chart_bar_background"])
 
-        self.theme_changed.connect(self.update) 
-
-    def set_theme_colors(self, primary_text, secondary_text, empty_text, bar_bg):
+    @PROFILER.measure("setData")
+    def setData(self, df, metric_key, attributes=None, config=None, query=None, mask=None):
+        # config 为该指标的只读配置；工作线程中调用时必须传入 (连同 config_version)，不读取 CONFIG_STORE
+        # query (RankQuery) 只取一段名次；条形比例仍按完整天梯的最大值。mask 为 FilterIndex 给出的行掩码
+        if config is None:
+            snapshot = CONFIG_STORE.snapshot()
+            config = snapshot.metricConfig(metric_key)
+            self.panel_colors = snapshot.panel_colors; self.config_version = snapshot.version
+        if df is None or df.empty or config is None:
+            self.data = []; self.metric_key = None; self.config = {}
+        else:
+            self.metric_key = metric_key
+            self.config = resolve_metric_config(config) # 综合评分解析组成指标；普通指标原样使用
+            self.data = run_rank_query(df, self.config, query, attributes, mask)
+            if len(self.data):
+                self.max_value_for_bar = self.data.value_max if self.data.value_max is not None else float(self.data.column("value").max())
+        self.data_version = next(_DATA_VERSIONS)
+        self.invalidateLayout()
+
+    def mergeRows(self, added):
+        # 把追加行插入当前已排序的行模型；返回第一个发生变化的行号 (Sorted insertion; returns the first changed rank)
+        self.data, first = merge_row_models(self.data, added, self.config.get("lower_is_better", False))
+        if len(self.data):
+            self.max_value_for_bar = float(self.data.column("value").max())
+        self.data_version = next(_DATA_VERSIONS)
+        self.invalidateLayout()
+        return first
+
+    def applyConfig(self, snapshot):
+        # 换用新的配置快照 (如改单位、配色)，不重建行模型；版本号变化使布局和行图块按新键重建
+        if self.metric_key is not None:
+            self.config = snapshot.metricConfig(self.metric_key) or self.config
+        self.panel_colors = snapshot.panel_colors
+        self.config_version = snapshot.version
+
+    def panelColors(self):
+        return self.panel_colors if self.panel_colors is not None else CONFIG_STORE.snapshot().panel_colors
+
+    def setThemeColors(self, primary_text, secondary_text, empty_text, bar_bg):
+        # 颜色不影响布局，布局缓存保留 (Colours do not affect layout; the layout cache stays valid)
         self.text_primary_color = QColor(primary_text)
         self.text_secondary_color = QColor(secondary_text)
         self.chart_empty_text_color = QColor(empty_text)
         self.bar_background_color = QColor(bar_bg)
-        self.theme_changed.emit()
 
-    def setValueLabelPosition(self, inside: bool):
-        if self.value_label_inside != inside:
-            self.value_label_inside = inside
-            self.update()
+    def setTheme(self, theme_name):
+        self.setThemeColors(*theme_assets(theme_name).chartColors())
 
-    def setShowSizeResolution(self, show_flag):
-        if self.show_size_resolution != show_flag:
-            self.show_size_resolution = show_flag
-            if self.show_size_resolution:
-                self.current_row_height = self.current_base_row_height_full
-            else:
-                self.current_row_height = self.current_base_row_height_compact
-            self.adjustHeight() 
-            
-
-    def setData(self, df, metric_key):
-        # print(f"ChartWidget.setData called with metric_key: {metric_key}") # DEBUG
-        global CHART_CONFIG
-        if df is None or df.empty:
-            # print("ChartWidget.setData: df is None or empty, clearing data.") # DEBUG
-            self.data = []; self.metric_key = None; self.config = {}
-        elif metric_key not in CHART_CONFIG:
-            # print(f"ChartWidget.setData: metric_key '{metric_key}' not in CHART_CONFIG, clearing data.") # DEBUG
-            self.data = []; self.metric_key = None; self.config = {}
-        else:
-            # print(f"ChartWidget.setData: Processing metric '{metric_key}'") # DEBUG
-            self.metric_key = metric_key
-            self.config = copy.deepcopy(CHART_CONFIG[metric_key]) # Use deepcopy
-            col = self.config["csv_column"]
-            # print(f"ChartWidget.setData: Using CSV column '{col}' for metric '{metric_key}'") # DEBUG
-            
-            items = []
-            for idx, r_series in df.iterrows(): 
-                v = pd.NA 
-                try:
-                    val_from_df = r_series.get(col)
-                    if pd.isna(val_from_df): continue
-                    v = float(val_from_df) 
-                    if math.isnan(v): continue
-                except Exception as e:
-                    # print(f"ChartWidget.setData: Error converting value for col '{col}', row {idx}: {e}") # DEBUG
-                    continue
-                
-                size_n = ref_n = res_val_numeric = None; res_text_display = "N/A"
-                try: size_n = float(str(r_series.get("显示器尺寸","")).replace('"',''))
-                except: pass
-                try: 
-                    ref_str_item = str(r_series.get("刷新率",""))
-                    ref_n = float(ref_str_item.replace("Hz","").replace("hz",""))
-                except: pass
-                try:
-                    raw_res_str = str(r_series.get("分辨率",""))
-                    res_text_display = RESOLUTION_ALIASES.get(raw_res_str, raw_res_str if raw_res_str else "N/A")
-                    if res_text_display in RESOLUTION_NUMERIC_MAP: res_val_numeric = RESOLUTION_NUMERIC_MAP[res_text_display]
-                    elif res_text_display == "N/A" and raw_res_str: res_text_display = raw_res_str
-                except: pass
-                items.append({ "name": r_series.get("显示器型号","N/A"), "panel": r_series.get("面板类型","未知"), "value": v, "size_numeric": size_n, "size_text": f"{size_n:.1f}\"" if size_n else "N/A\"", "refresh_numeric": ref_n, "refresh_text": f"{ref_n:.0f}Hz" if ref_n else "N/A Hz", "resolution_text": res_text_display, "resolution_numeric_value": res_val_numeric })
-            
-            # print(f"ChartWidget.setData: Processed {len(items)} items for metric '{metric_key}'") # DEBUG
-            if not items: 
-                self.data = []
-                # print(f"ChartWidget.setData: No items for metric '{metric_key}', data cleared.") # DEBUG
-            else:
-                asc = self.config.get("lower_is_better", False) # Ensure default if key missing
-                self.data = sorted(items, key=lambda x: x["value"], reverse=not asc)
-                vs = [it["value"] for it in self.data]; self.max_value_for_bar = max(vs) if vs else 1
-        
-        self.adjustHeight() 
+    def exportCopy(self):
+        # 导出用的独立副本：共享只读行模型，冻结当前配色 (Detached export-mode copy; safe to paint from a worker thread)
+        r = copy.copy(self)
+        r.panel_colors = self.panelColors() # 配置和配色都是只读快照，直接共享
+        r.export_mode = True
+        r.show_size_resolution = self.EXPORT_LAYOUT_PARAMS["show_size_resolution_export"]
+        r._layout_cache = {}
+        return r
 
+    def invalidateLayout(self):
+        self._layout_cache.clear()
 
     def _sat(self, v, mi, ma, base=0.65, ran=0.35):
         if v is None: return base; 
@@ -272,311 +1829,1302 @@ class ChartWidget(QWidget):
     def getRefreshColor(self, v): sat = self._sat(v, self.min_refresh, self.max_refresh, base=0.4, ran=0.2); return QColor.fromHslF(0.0, sat, 0.50, 1.0)
     def getResolutionColor(self, v_numeric): sat = self._sat(v_numeric, self.min_resolution_val, self.max_resolution_val, 0.65, 0.35); return QColor.fromHslF(0.33, sat, 0.55, 1.0) 
 
-    def adjustHeight(self):
+    def scaler(self):
+        return self.EXPORT_FONT_SCALE_FACTOR if self.export_mode else 1.0
+
+    def effectiveShowSizeResolution(self):
+        return self.show_size_resolution or (self.export_mode and self.EXPORT_LAYOUT_PARAMS["show_size_resolution_export"])
+
+    def baseRowHeight(self):
+        return self.current_base_row_height_full if self.show_size_resolution else self.current_base_row_height_compact
+
+    def contentHeight(self):
         n = len(self.data)
-        scaler = self.EXPORT_FONT_SCALE_FACTOR if self._is_export_mode else 1.0
+        scaler = self.scaler()
         
-        rh = int(self.current_row_height * scaler) 
+        rh = int(self.baseRowHeight() * scaler) 
         th_title = int(self.current_base_title_height * scaler)
         
         pt = pb = int(self.screen_padding * scaler)
         total_h = th_title + n * rh + pt + pb
         if n == 0: total_h += rh 
-        self.setMinimumHeight(int(total_h))
-        self.update() # Ensure a repaint is triggered after height adjustment
+        return int(total_h)
 
-    def paintEvent(self, event):
-        # ... (paintEvent remains largely the same as previous version with label position logic)
-        # Ensure all font creations and metric calculations use the scaled values based on self._is_export_mode
-        super().paintEvent(event)
-        p = QPainter(self);
+    def visibleRowRange(self, y_top, y_bottom, y_rows_top, row_height):
+        # 返回与 [y_top, y_bottom) 相交的行区间 [first, last)，上下各多留一行以容纳溢出的字形
+        n = len(self.data)
+        if row_height <= 0 or n == 0: return 0, 0
+        first = max(0, int((y_top - y_rows_top) // row_height) - 1)
+        last = min(n, int(math.ceil((y_bottom - y_rows_top) / row_height)) + 1)
+        return first, max(first, last)
+
+    def _scaledFont(self, base, scaler):
+        return QFont(base.family(), int(base.pointSize() * scaler), base.weight())
+
+    def layout(self, w):
+        # 排版缓存：仅在 setData、主题切换或尺寸变化时失效，滚动重绘直接复用
+        scaler = self.scaler()
+        show_sr = self.effectiveShowSizeResolution()
+        key = (self.data_version, self.config_version, self.export_mode, scaler, show_sr, w)
+        cached = self._layout_cache.get(key)
+        if cached is not None: return cached
+        if len(self._layout_cache) >= 4: self._layout_cache.clear()
+
+        L = ChartLayout(key)
+        L.scaler = scaler; L.show_size_resolution = show_sr; L.width = w
+        L.row_h = int(self.baseRowHeight() * scaler)
+        L.title_h = int(self.current_base_title_height * scaler)
+        L.pad = int(self.screen_padding * scaler)
+        L.rank_w = int(self.screen_rank_width * scaler)
+
+        L.title_font = self._scaledFont(self.base_title_font, scaler)
+        L.rank_font = self._scaledFont(self.base_rank_font, scaler)
+        L.name_font = self._scaledFont(self.base_name_font, scaler)
+        L.sub_label_font = self._scaledFont(self.base_sub_label_font, scaler)
+        L.label_font = self._scaledFont(self.base_label_font, scaler)
+        foot_font_point_size_int = max(1, int(L.name_font.pointSize() * 0.75))
+        L.foot_font = QFont(L.name_font.family(), foot_font_point_size_int, QFont.Weight.Normal)
+
+        L.fm_rank = QFontMetrics(L.rank_font)
+        L.fm_name = QFontMetrics(L.name_font)
+        L.fm_sub_label = QFontMetrics(L.sub_label_font)
+        L.fm_foot = QFontMetrics(L.foot_font)
+        L.fm_label = QFontMetrics(L.label_font)
+
+        L.name_text_top_padding = int(self.current_name_text_top_padding_abs * scaler)
+        L.gap_before_footnote = int(self.current_gap_before_footnote_abs * scaler)
+        L.gap_after_name_block = int((self.current_gap_after_name_block_abs_full if show_sr else self.current_gap_after_name_block_abs_compact) * scaler)
+        L.gap_between_sub_label_lines = int(self.current_gap_between_sub_label_lines_abs * scaler)
+        L.sub_label_line_height = L.fm_sub_label.height() + int(self.current_sub_label_line_extra_padding * scaler)
+        L.label_item_gap = int(self.label_item_gap * scaler)
+        L.padding_inside_bar = int(5 * scaler)
+        L.padding_outside_bar = int(8 * scaler)
+        L.geometry = key[1:] # 列几何 (含配置版本)，数据变化但几何不变时行图块仍可复用 (Tiles survive data edits that keep it)
+
+        n = len(self.data)
+        if n == 0 or not self.config:
+            self._layout_cache[key] = L
+            return L
+
+        # 每个不同的字符串只测量一次 (Measure each distinct string once, then scatter to rows)
+        measure = lambda fm, values: _map_unique(values, fm.horizontalAdvance).astype(np.int64)
+        L.name_w = measure(L.fm_name, self.data.column("main_name"))
+        L.panel_w = measure(L.fm_sub_label, self.data.column("panel"))
+        L.refresh_w = measure(L.fm_sub_label, self.data.column("refresh_text"))
+        max_nw = int(L.name_w.max())
+        max_label_line1_w = int((L.panel_w + L.refresh_w).max()) + L.label_item_gap
+        max_label_line2_w = 0
+        if show_sr:
+            L.size_w = measure(L.fm_sub_label, self.data.column("size_text"))
+            L.resolution_w = measure(L.fm_sub_label, self.data.column("resolution_text"))
+            max_label_line2_w = int((L.size_w + L.resolution_w).max()) + L.label_item_gap
+
+        needed_text_w = max(max_nw, max_label_line1_w, max_label_line2_w) + int(20 * scaler)
+        max_info_allowable = int((w - L.pad*2) * 0.40)
+        L.info_w = int(min(needed_text_w, float(max_info_allowable)))
+
+        bar_gap = int(10 * scaler)
+        L.x_rank = L.pad
+        L.x_info = L.pad + L.rank_w
+        L.x_bar = L.x_info + L.info_w + bar_gap
+
+        est_lbl_val = f"{self.max_value_for_bar:.2f}{self.config.get('unit','')}"
+        est_lbl = L.fm_label.horizontalAdvance(est_lbl_val) + int(20 * scaler)
+        avail_bar_area = w - L.x_bar - L.pad
+        L.bar_w = max(int(50 * scaler), min(avail_bar_area - est_lbl, (L.rank_w + L.info_w) * 3, L.info_w * 4))
+        L.geometry = (key[1:], L.info_w, L.x_bar, L.bar_w)
+        self._layout_cache[key] = L
+        return L
+
+    def tileStateKey(self, L, dpr):
+        # 除行本身外，所有会影响行图块外观的状态 (Everything besides the row itself that changes how a tile looks)
+        # 单位、条形颜色和面板配色由 L.geometry 中的配置版本代表，不必逐项比较
+        return (L.geometry, dpr, self.metric_key, self.max_value_for_bar, self.value_label_inside,
+                self.text_primary_color.rgba(), self.text_secondary_color.rgba(), self.bar_background_color.rgba())
+
+    def rowTile(self, tiles, state_key, L, i, dpr, y_frac=0.0):
+        # y_frac: 行顶端在设备像素内的小数偏移，随图块一起绘制，贴图时图块对齐整设备像素 (Sub-pixel row offset baked into the tile)
+        key = (state_key, y_frac, self.data.rank(i), self.data.column("name")[i], float(self.data.column("value")[i]))
+        pix = tiles.get(key)
+        if pix is None:
+            pix = QPixmap(QSize(max(1, math.ceil(L.width * dpr)), max(1, math.ceil(L.row_h * dpr + y_frac))))
+            pix.setDevicePixelRatio(dpr)
+            pix.fill(Qt.GlobalColor.transparent)
+            tp = QPainter(pix)
+            tp.setRenderHints(QPainter.RenderHint.Antialiasing | QPainter.RenderHint.TextAntialiasing)
+            tp.translate(0, y_frac / dpr) # 平移而不是改行起点：paintRow 内的取整仍相对于行顶端
+            self.paintRow(tp, L, i, 0)
+            tp.end()
+            tiles.put(key, pix)
+        return pix
+
+    def paint(self, p, w, h, clip_rect=None, tiles=None, dpr=1.0):
+        # 在 (0, 0, w, h) 范围内绘制天梯图；clip_rect 之外的行被裁剪 (Rows outside clip_rect are culled)
         p.setRenderHints(QPainter.RenderHint.Antialiasing | QPainter.RenderHint.TextAntialiasing)
+        L = self.layout(w)
 
-        w = self.width()
-        scaler = self.EXPORT_FONT_SCALE_FACTOR if self._is_export_mode else 1.0
+        if not self.data or not self.config: # Check if self.config is also valid
+            p.setPen(self.chart_empty_text_color); p.setFont(L.title_font)
+            p.drawText(QRectF(0, 0, w, h), Qt.AlignmentFlag.AlignCenter, "请先加载数据并选择指标.")
+            return L
+
+        clip_top = clip_rect.top() if clip_rect is not None else 0
+        clip_bottom = clip_rect.bottom() + 1 if clip_rect is not None else h
+        y_rows_top = L.pad + L.title_h
+        first_row, last_row = self.visibleRowRange(clip_top, clip_bottom, y_rows_top, L.row_h)
+
+        if clip_top <= y_rows_top:
+            p.setPen(self.text_primary_color); p.setFont(L.title_font)
+            title_text = self.config.get("base_title", "图表")
+            sort_suffix = " (越高越好)" if not self.config.get("lower_is_better", False) else " (越低越好)"
+            full_title = title_text + sort_suffix
+            title_rect = QRectF(L.x_info, L.pad, L.width - L.pad*2 - L.x_info + L.pad, L.title_h)
+            p.drawText( title_rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, full_title )
+
+        y_row_start = y_rows_top + first_row * L.row_h
+        PROFILER.count("rows_painted", last_row - first_row)
+        if tiles is not None and tiles.budget_bytes > 0:
+            # 行图块缓存：命中时只需贴图 (Blit cached row tiles; render and cache on miss)
+            # 非整数 DPR 下行顶端落在设备像素中间：图块原点取整到设备像素，小数部分画进图块，避免贴图时重采样
+            state_key = self.tileStateKey(L, dpr)
+            for i in range(first_row, last_row):
+                y_px = y_row_start * dpr
+                y_dev = math.floor(y_px)
+                tile = self.rowTile(tiles, state_key, L, i, dpr, round(y_px - y_dev, 9))
+                p.drawPixmap(QPointF(0, y_dev / dpr), tile)
+                y_row_start += L.row_h
+        else:
+            for i in range(first_row, last_row):
+                self.paintRow(p, L, i, y_row_start)
+                y_row_start += L.row_h
+        return L
+
+    def paintRow(self, p, L, i, y_row_start):
+        it = self.data[i]
+        scaler = L.scaler
+        panel_colors = self.panelColors()
+        y_cursor = y_row_start + L.name_text_top_padding
+
+        p.setFont(L.rank_font)
+        p.setPen(self.text_primary_color)
+        rank_text_rect = QRectF(L.x_rank, y_cursor, L.rank_w - int(10*scaler), L.fm_rank.height())
+        p.drawText(rank_text_rect, Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignRight, str(self.data.rank(i)))
+
+        main_name = it["main_name"]; mode_text_for_footnote = it["footnote"]
+
+        p.setFont(L.name_font)
+        p.setPen(self.text_primary_color)
+        main_name_rect = QRectF(L.x_info, y_cursor, L.info_w - int(10*scaler), L.fm_name.height())
+        p.drawText(main_name_rect, Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft, main_name)
+        y_cursor += L.fm_name.height()
+
+        if mode_text_for_footnote:
+            y_cursor += L.gap_before_footnote
+            p.setFont(L.foot_font)
+            p.setPen(self.text_secondary_color)
+
+            elide_width = max(0, int(L.info_w - int(10*scaler)))
+            elided_mode_text = L.fm_foot.elidedText(mode_text_for_footnote, Qt.TextElideMode.ElideRight, elide_width)
+
+            actual_elided_footnote_width = L.fm_foot.horizontalAdvance(elided_mode_text)
+            footnote_rect = QRectF(L.x_info, y_cursor, actual_elided_footnote_width, L.fm_foot.height())
+            p.drawText(footnote_rect, Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft, elided_mode_text)
+            y_cursor += L.fm_foot.height()
+
+        y_cursor += L.gap_after_name_block
+
+        p.setFont(L.sub_label_font)
+        sub_label_line_height = L.sub_label_line_height
+
+        panel_text_w = int(L.panel_w[i])
+        p.setPen(panel_colors.get(it["panel"], QColor("grey")))
+        label1_rect_panel = QRectF(L.x_info, y_cursor, panel_text_w, sub_label_line_height)
+        p.drawText(label1_rect_panel, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["panel"])
+
+        refresh_text_x = L.x_info + panel_text_w + L.label_item_gap
+        p.setPen(self.getRefreshColor(it["refresh_numeric"]))
+        label1_rect_refresh = QRectF(refresh_text_x, y_cursor, int(L.refresh_w[i]), sub_label_line_height)
+        p.drawText(label1_rect_refresh, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["refresh_text"])
+        y_cursor += sub_label_line_height
+
+        if L.show_size_resolution:
+            y_cursor += L.gap_between_sub_label_lines
+            size_text_w = int(L.size_w[i])
+            p.setPen(self.getSizeColor(it["size_numeric"]))
+            label2_rect_size = QRectF(L.x_info, y_cursor, size_text_w, sub_label_line_height)
+            p.drawText(label2_rect_size, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["size_text"])
+
+            resolution_text_x = L.x_info + size_text_w + L.label_item_gap
+            p.setPen(self.getResolutionColor(it["resolution_numeric_value"]))
+            label2_rect_res = QRectF(resolution_text_x, y_cursor, int(L.resolution_w[i]), sub_label_line_height)
+            p.drawText(label2_rect_res, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["resolution_text"])
+
+        current_rh = L.row_h; x_bar = L.x_bar; bar_w = L.bar_w
+        bh = 0.5 * current_rh; bar_y_pos = y_row_start + (current_rh-bh)/2
+        bg_rect = QRectF(x_bar, bar_y_pos, bar_w, bh)
+        path_bg = QPainterPath(); path_bg.addRoundedRect(bg_rect, bh*0.1, bh*0.1)
+        p.fillPath(path_bg, self.bar_background_color)
+
+        frac = it["value"]/self.max_value_for_bar if self.max_value_for_bar != 0 else 0; fw = frac * bar_w
+        if fw > 0:
+            fr = QRectF(x_bar, bar_y_pos, fw, bh); grad = QLinearGradient(fr.topLeft(), fr.topRight())
+            base_c = self.config.get("bar_color", DEFAULT_NEW_METRIC_COLOR)
+            grad.setColorAt(0, base_c.lighter(115)); grad.setColorAt(1, base_c.darker(115))
+            path_f = QPainterPath(); path_f.addRoundedRect(fr, bh*0.1, bh*0.1); p.fillPath(path_f, QBrush(grad))
+
+        lbl = f"{it['value']:.2f}{self.config.get('unit','')}"
+        fm_lbl_val = L.fm_label
+        lbl_width = fm_lbl_val.horizontalAdvance(lbl)
+        lx = 0
+
+        can_fit_inside = (fw > lbl_width + (2 * L.padding_inside_bar))
+
+        if self.value_label_inside and can_fit_inside:
+            lx = x_bar + fw - lbl_width - L.padding_inside_bar
+            text_color_for_inside_label = Qt.GlobalColor.white
+            bar_end_color = self.config.get("bar_color", DEFAULT_NEW_METRIC_COLOR).darker(115)
+            luminance = 0.299 * bar_end_color.redF() + 0.587 * bar_end_color.greenF() + 0.114 * bar_end_color.blueF()
+            if luminance > 0.5:
+                text_color_for_inside_label = Qt.GlobalColor.black
+            p.setPen(text_color_for_inside_label)
+        else:
+            lx = x_bar + fw + L.padding_outside_bar
+            p.setPen(self.text_primary_color)
 
-        current_rh = int(self.current_row_height * scaler)
-        current_title_h = int(self.current_base_title_height * scaler)
-        current_pad = int(self.screen_padding * scaler)
-        current_rank_w = int(self.screen_rank_width * scaler)
+        ly_val = bar_y_pos + (bh - fm_lbl_val.height()) / 2 + fm_lbl_val.ascent()
+        p.setFont(L.label_font)
+        p.drawText(int(lx), int(ly_val), lbl)
+
+    def exportContentWidth(self, L):
+        # 导出时按最后一行的数值标签位置裁掉右侧空白 (Width the export crop keeps)
+        if not self.data or not self.config: return L.width
+        fm_value_label = L.fm_label
+        last_item_val = self.data[-1]["value"]
+        last_item_fw = (last_item_val / self.max_value_for_bar if self.max_value_for_bar !=0 else 0) * L.bar_w
+        last_item_lbl_width = fm_value_label.horizontalAdvance(f"{last_item_val:.2f}{self.config.get('unit','')}")
+        last_label_was_inside_and_fit = self.value_label_inside and (last_item_fw > last_item_lbl_width + (2 * L.padding_inside_bar))
+
+        if last_label_was_inside_and_fit:
+            _content_w = L.x_bar + L.bar_w + L.pad
+        else:
+            max_value_label_w = fm_value_label.horizontalAdvance(f"{self.max_value_for_bar:.2f}{self.config.get('unit','')}")
+            _content_w = L.x_bar + L.bar_w + L.padding_outside_bar + max_value_label_w + L.pad
+        return min(math.ceil(_content_w), L.width)
+
+    @PROFILER.measure("render_image")
+    def renderImage(self, dpr=None, width=None, tiles=None):
+        # 离屏渲染整张天梯图并按内容宽度裁剪；tiles 为 None 时可在工作线程中调用
+        dpr = self.export_dpr if dpr is None else dpr
+        w = width or self.export_width
+        h = self.contentHeight()
+        L = self.layout(w)
+        crop_w = self.exportContentWidth(L) if self.export_mode else w
+
+        img = QImage(max(1, int(crop_w * dpr)), max(1, int(h * dpr)), QImage.Format.Format_ARGB32_Premultiplied)
+        img.setDevicePixelRatio(dpr)
+        img.fill(Qt.GlobalColor.transparent)
+        p = QPainter(img)
+        self.paint(p, w, h, tiles=tiles, dpr=dpr)
+        p.end()
+        return img
 
-        _title_font = QFont(self.base_title_font.family(), int(self.base_title_font.pointSize() * scaler), self.base_title_font.weight())
-        _rank_font = QFont(self.base_rank_font.family(), int(self.base_rank_font.pointSize() * scaler), self.base_rank_font.weight())
-        _name_font = QFont(self.base_name_font.family(), int(self.base_name_font.pointSize() * scaler), self.base_name_font.weight())
-        _sub_label_font = QFont(self.base_sub_label_font.family(), int(self.base_sub_label_font.pointSize() * scaler), self.base_sub_label_font.weight())
-        _label_font = QFont(self.base_label_font.family(), int(self.base_label_font.pointSize() * scaler), self.base_label_font.weight())
-        
-        foot_font_point_size_float = _name_font.pointSize() * 0.75 
-        foot_font_point_size_int = max(1, int(foot_font_point_size_float))
-        _foot_font = QFont(_name_font.family(), foot_font_point_size_int, QFont.Weight.Normal)
+    def exportSize(self, dpr=None, width=None):
+        # 导出图像的设备像素尺寸 (裁剪后)，不分配图像 (Device-pixel size of the cropped export)
+        dpr = self.export_dpr if dpr is None else dpr
+        w = width or self.export_width
+        crop_w = self.exportContentWidth(self.layout(w)) if self.export_mode else w
+        return max(1, int(crop_w * dpr)), max(1, int(self.contentHeight() * dpr))
 
-        _name_text_top_padding = int(self.current_name_text_top_padding_abs * scaler)
-        _gap_before_footnote = int(self.current_gap_before_footnote_abs * scaler)
-        _gap_after_name_block = int((self.current_gap_after_name_block_abs_full if self.show_size_resolution or (self._is_export_mode and self.EXPORT_LAYOUT_PARAMS["show_size_resolution_export"]) else self.current_gap_after_name_block_abs_compact) * scaler)
-        _gap_between_sub_label_lines = int(self.current_gap_between_sub_label_lines_abs * scaler)
-        _sub_label_line_extra_padding = int(self.current_sub_label_line_extra_padding * scaler)
-        _label_item_gap = int(self.label_item_gap * scaler)
+    def renderBands(self, dpr=None, width=None, tiles=None, band_height=None):
+        """按固定高度的设备像素条带逐段渲染导出图像 (Render the export in fixed-height device-pixel bands).
 
-        if not self.data or not self.config: # Check if self.config is also valid
-            p.setPen(self.chart_empty_text_color); p.setFont(_title_font)
-            p.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "请先加载数据并选择指标.")
-            return
+        每段是裁剪宽度的 QImage，只绘制与该段相交的行；同一时刻只存在一段，峰值内存与总行数无关。
+        逐个产出 (QImage, 该段顶端的设备像素 y)。
+        """
+        dpr = self.export_dpr if dpr is None else dpr
+        w = width or self.export_width
+        h = self.contentHeight()
+        width_px, height_px = self.exportSize(dpr, w)
+        band_px = band_height or self.EXPORT_BAND_HEIGHT
+        for top in range(0, height_px, band_px):
+            rows = min(band_px, height_px - top)
+            band = QImage(width_px, rows, QImage.Format.Format_ARGB32_Premultiplied)
+            band.setDevicePixelRatio(dpr)
+            band.fill(Qt.GlobalColor.transparent)
+            y0 = top / dpr
+            p = QPainter(band)
+            p.translate(0, -y0) # 条带顶端为整数设备像素，相邻条带的像素网格一致 (Bands share one pixel grid)
+            clip = QRect(0, math.floor(y0), w, math.ceil((top + rows) / dpr) - math.floor(y0))
+            self.paint(p, w, h, clip_rect=clip, tiles=tiles, dpr=dpr)
+            p.end()
+            yield band, top
+
+    def exportMetadata(self):
+        # 导出文件中记录的标题与生成软件 (Title/software text written unless metadata is stripped)
+        return {"Title": self.config.get("base_title", self.metric_key or ""), "Software": "显示器天梯图生成器"}
+
+    @PROFILER.measure("export_png")
+    def exportPng(self, filename, dpr=None, width=None, tiles=None, band_height=None, level=None, palette=False, metadata=True):
+        """把导出图像逐段编码写入 PNG 文件，不分配整张图像 (Streaming, band-by-band PNG export).
+
+        level 为 zlib 压缩级别 (0-9，None 为 6)；palette 为 True 时量化为最多 256 色的索引 PNG；
+        metadata 为 False 时不写 pHYs 与文本块。返回 (宽, 高) 设备像素。写入失败时删除不完整的文件并重新抛出异常。
+        """
+        dpr = self.export_dpr if dpr is None else dpr
+        width_px, height_px = self.exportSize(dpr, width)
+        writer_class = IndexedPngStreamWriter if palette else PngStreamWriter
+        try:
+            with open(filename, "wb") as f:
+                writer = writer_class(f, width_px, height_px, level=level, dpi=96 * dpr if metadata else None,
+                                      text=self.exportMetadata() if metadata else None)
+                for band, _ in self.renderBands(dpr, width, tiles, band_height):
+                    with PROFILER.span("png_encode", rows=band.height()):
+                        writer.writeImage(band)
+                with PROFILER.span("png_encode", rows=0):
+                    writer.close()
+        except Exception:
+            with contextlib.suppress(OSError): os.remove(filename)
+            raise
+        return width_px, height_px
 
-        fm_name = QFontMetrics(_name_font)
-        fm_sub_label = QFontMetrics(_sub_label_font)
-        fm_foot = QFontMetrics(_foot_font) 
-        
-        max_nw = 0
-        if self.data: max_nw = max(fm_name.horizontalAdvance(it["name"].split("（")[0].split("(")[0].strip()) for it in self.data)
-        max_label_line1_w = 0; max_label_line2_w = 0
-        if self.data:
-            max_label_line1_w = max(fm_sub_label.horizontalAdvance(it["panel"]) + _label_item_gap + fm_sub_label.horizontalAdvance(it["refresh_text"]) for it in self.data )
-            if self.show_size_resolution or (self._is_export_mode and self.EXPORT_LAYOUT_PARAMS["show_size_resolution_export"]): 
-                max_label_line2_w = max(fm_sub_label.horizontalAdvance(it["size_text"]) + _label_item_gap + fm_sub_label.horizontalAdvance(it["resolution_text"]) for it in self.data )
-        
-        needed_text_w = max(max_nw, max_label_line1_w, max_label_line2_w) + int(20 * scaler) 
-        max_info_allowable = int((w - current_pad*2) * 0.40)
-        info_w = int(min(needed_text_w, float(max_info_allowable))) 
 
-        bar_gap = int(10 * scaler)
-        x_rank = current_pad
-        x_info = current_pad + current_rank_w
-        x_bar  = x_info + info_w + bar_gap
-        
-        est_lbl_val = f"{self.max_value_for_bar:.2f}{self.config.get('unit','')}"
-        est_lbl = QFontMetrics(_label_font).horizontalAdvance(est_lbl_val) + int(20 * scaler)
-        avail_bar_area = w - x_bar - current_pad
-        bar_w = max(int(50 * scaler), min(avail_bar_area - est_lbl, (current_rank_w + info_w) * 3, info_w * 4))
-
-        p.setPen(self.text_primary_color); p.setFont(_title_font)
-        title_text = self.config.get("base_title", "图表")
-        sort_suffix = " (越高越好)" if not self.config.get("lower_is_better", False) else " (越低越好)"
-        full_title = title_text + sort_suffix
-        p.drawText( QRectF(x_info, current_pad, w - current_pad*2 - x_info + current_pad, current_title_h), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, full_title )
-        
-        y_row_start = current_pad + current_title_h 
+class ChartWidget(QWidget):
+    EXPORT_TARGET_WIDTH = ChartRenderer.EXPORT_TARGET_WIDTH
+    EXPORT_FONT_SCALE_FACTOR = ChartRenderer.EXPORT_FONT_SCALE_FACTOR
+    EXPORT_LAYOUT_PARAMS = ChartRenderer.EXPORT_LAYOUT_PARAMS
+    TILE_CACHE_BUDGET_BYTES = 64 * 1024 * 1024 # 屏幕行图块缓存上限 (Screen row-tile budget)
+    EXPORT_TILE_CACHE_BUDGET_BYTES = 128 * 1024 * 1024 # 导出 (高 DPR) 行图块缓存上限
 
-        for i, it in enumerate(self.data):
-            y_cursor = y_row_start + _name_text_top_padding 
+    theme_changed = pyqtSignal() 
 
-            p.setFont(_rank_font)
-            p.setPen(self.text_primary_color)
-            rank_text_height = QFontMetrics(_rank_font).height()
-            
-            rank_text_rect = QRectF(x_rank, y_cursor, current_rank_w - int(10*scaler), rank_text_height)
-            p.drawText(rank_text_rect, Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignRight, str(i + 1))
-
-            name_text_raw = it["name"]; mode_pattern = r'[（\(]([^）\)]+)[）\)]$'
-            mode_match = re.search(mode_pattern, name_text_raw)
-            main_name = name_text_raw; mode_text_for_footnote = ""
-            if mode_match:
-                full_parenthesized_mode = mode_match.group(0); mode_content = mode_match.group(1)
-                mode_text_for_footnote = mode_content
-                main_name = name_text_raw.replace(full_parenthesized_mode, "").strip()
-
-            p.setFont(_name_font)
-            p.setPen(self.text_primary_color)
-            main_name_rect = QRectF(x_info, y_cursor, info_w - int(10*scaler), fm_name.height())
-            p.drawText(main_name_rect, Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft, main_name)
-            y_cursor += fm_name.height() 
-
-            if mode_text_for_footnote:
-                y_cursor += _gap_before_footnote
-                p.setFont(_foot_font)
-                p.setPen(self.text_secondary_color)
-                
-                available_width_for_footnote = info_w - int(10*scaler) 
-                elide_width = max(0, int(available_width_for_footnote))
-                elided_mode_text = fm_foot.elidedText(mode_text_for_footnote, Qt.TextElideMode.ElideRight, elide_width)
-
-                actual_elided_footnote_width = fm_foot.horizontalAdvance(elided_mode_text)
-                footnote_rect = QRectF(x_info, y_cursor, actual_elided_footnote_width, fm_foot.height())
-                p.drawText(footnote_rect, Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft, elided_mode_text)
-                y_cursor += fm_foot.height()
-
-            y_cursor += _gap_after_name_block 
-
-            p.setFont(_sub_label_font) 
-            sub_label_line_height = fm_sub_label.height() + _sub_label_line_extra_padding
-
-            panel_text_w = fm_sub_label.horizontalAdvance(it["panel"])
-            p.setPen(PANEL_COLORS.get(it["panel"], QColor("grey")))
-            label1_rect_panel = QRectF(x_info, y_cursor, panel_text_w, sub_label_line_height)
-            p.drawText(label1_rect_panel, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["panel"])
-
-            refresh_text_x = x_info + panel_text_w + _label_item_gap
-            refresh_text_w = fm_sub_label.horizontalAdvance(it["refresh_text"])
-            p.setPen(self.getRefreshColor(it["refresh_numeric"]))
-            label1_rect_refresh = QRectF(refresh_text_x, y_cursor, refresh_text_w, sub_label_line_height)
-            p.drawText(label1_rect_refresh, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["refresh_text"])
-            y_cursor += sub_label_line_height
-
-            if self.show_size_resolution or (self._is_export_mode and self.EXPORT_LAYOUT_PARAMS["show_size_resolution_export"]):
-                y_cursor += _gap_between_sub_label_lines
-                size_text_w = fm_sub_label.horizontalAdvance(it["size_text"])
-                p.setPen(self.getSizeColor(it["size_numeric"]))
-                label2_rect_size = QRectF(x_info, y_cursor, size_text_w, sub_label_line_height)
-                p.drawText(label2_rect_size, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["size_text"])
-
-                resolution_text_x = x_info + size_text_w + _label_item_gap
-                resolution_text_w = fm_sub_label.horizontalAdvance(it["resolution_text"])
-                p.setPen(self.getResolutionColor(it["resolution_numeric_value"]))
-                label2_rect_res = QRectF(resolution_text_x, y_cursor, resolution_text_w, sub_label_line_height)
-                p.drawText(label2_rect_res, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, it["resolution_text"])
-                
-            bh = 0.5 * current_rh; bar_y_pos = y_row_start + (current_rh-bh)/2 
-            bg_rect = QRectF(x_bar, bar_y_pos, bar_w, bh)
-            path_bg = QPainterPath(); path_bg.addRoundedRect(bg_rect, bh*0.1, bh*0.1)
-            p.fillPath(path_bg, self.bar_background_color) 
-
-            frac = it["value"]/self.max_value_for_bar if self.max_value_for_bar != 0 else 0; fw = frac * bar_w
-            if fw > 0: 
-                fr = QRectF(x_bar, bar_y_pos, fw, bh); grad = QLinearGradient(fr.topLeft(), fr.topRight())
-                base_c = self.config.get("bar_color", DEFAULT_NEW_METRIC_COLOR) 
-                grad.setColorAt(0, base_c.lighter(115)); grad.setColorAt(1, base_c.darker(115))
-                path_f = QPainterPath(); path_f.addRoundedRect(fr, bh*0.1, bh*0.1); p.fillPath(path_f, QBrush(grad))
-            
-            lbl = f"{it['value']:.2f}{self.config.get('unit','')}"
-            fm_lbl_val = QFontMetrics(_label_font)
-            lbl_width = fm_lbl_val.horizontalAdvance(lbl)
-            padding_inside_bar = int(5 * scaler)
-            padding_outside_bar = int(8 * scaler)
-            lx = 0 
-
-            can_fit_inside = (fw > lbl_width + (2 * padding_inside_bar))
-
-            if self.value_label_inside and can_fit_inside:
-                lx = x_bar + fw - lbl_width - padding_inside_bar 
-                text_color_for_inside_label = Qt.GlobalColor.white 
-                bar_end_color = self.config.get("bar_color", DEFAULT_NEW_METRIC_COLOR).darker(115)
-                luminance = 0.299 * bar_end_color.redF() + 0.587 * bar_end_color.greenF() + 0.114 * bar_end_color.blueF()
-                if luminance > 0.5: 
-                    text_color_for_inside_label = Qt.GlobalColor.black
-                p.setPen(text_color_for_inside_label)
-            else: 
-                lx = x_bar + fw + padding_outside_bar
-                p.setPen(self.text_primary_color)
-            
-            ly_val = bar_y_pos + (bh - fm_lbl_val.height()) / 2 + fm_lbl_val.ascent()
-            p.setFont(_label_font) 
-            p.drawText(int(lx), int(ly_val), lbl)
-            
-            y_row_start += current_rh 
-
-        if self._is_export_mode: 
-            fm_value_label = QFontMetrics(_label_font)
-            max_value_label_w = 0
-            last_item_fw = 0
-            last_item_lbl_width = 0
-            if self.data:
-                last_item_val = self.data[-1]["value"]
-                last_item_fw = (last_item_val / self.max_value_for_bar if self.max_value_for_bar !=0 else 0) * bar_w
-                last_item_lbl_text = f"{last_item_val:.2f}{self.config.get('unit','')}"
-                last_item_lbl_width = fm_value_label.horizontalAdvance(last_item_lbl_text)
-            
-            last_label_was_inside_and_fit = self.value_label_inside and (last_item_fw > last_item_lbl_width + (2 * padding_inside_bar))
-
-            if last_label_was_inside_and_fit : 
-                 _content_w = x_bar + bar_w + current_pad 
-            else: 
-                 max_value_label_w = fm_value_label.horizontalAdvance(f"{self.max_value_for_bar:.2f}{self.config.get('unit','')}") 
-                 _content_w = x_bar + bar_w + padding_outside_bar + max_value_label_w + current_pad
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.renderer = ChartRenderer()
+        self._tile_cache = RowTileCache(self.TILE_CACHE_BUDGET_BYTES)
+        self._export_tile_cache = RowTileCache(self.EXPORT_TILE_CACHE_BUDGET_BYTES)
+        self.theme_changed.connect(self.update) 
 
-            self._export_content_width = min(math.ceil(_content_w), w) 
-        p.end()
+    # 绘制状态保存在 renderer 中，这里保留原有的属性名 (Drawing state lives on the renderer)
+    data = property(lambda self: self.renderer.data)
+    metric_key = property(lambda self: self.renderer.metric_key)
+    max_value_for_bar = property(lambda self: self.renderer.max_value_for_bar)
+    show_size_resolution = property(lambda self: self.renderer.show_size_resolution)
+    value_label_inside = property(lambda self: self.renderer.value_label_inside)
 
-    def getChartPixmap(self, target_width=None):
-        # ... (getChartPixmap remains the same)
-        original_show_size_res = self.show_size_resolution
-        original_label_pos = self.value_label_inside 
-        original_style_sheet = self.styleSheet()
-        original_auto_fill = self.autoFillBackground()
-        
-        self._is_export_mode = True 
-        self.setAutoFillBackground(False) 
-        self.setStyleSheet("background:transparent;") 
+    @property
+    def config(self):
+        return self.renderer.config
 
-        self.show_size_resolution = self.EXPORT_LAYOUT_PARAMS["show_size_resolution_export"]
-        
-        if self.EXPORT_LAYOUT_PARAMS["show_size_resolution_export"]:
-            self.current_row_height = self.EXPORT_LAYOUT_PARAMS["row_height_full"]
-        else:
-            self.current_row_height = self.EXPORT_LAYOUT_PARAMS["row_height_compact"]
-        self.current_base_title_height = self.EXPORT_LAYOUT_PARAMS["base_title_height"]
+    def set_theme_colors(self, primary_text, secondary_text, empty_text, bar_bg):
+        # 行图块以主题颜色为键，不必清空：切回原主题时旧图块仍可命中
+        self.renderer.setThemeColors(primary_text, secondary_text, empty_text, bar_bg)
+        self.theme_changed.emit()
+
+    def applyConfig(self, snapshot):
+        # 只换配置快照 (单位、颜色等)，不重建数据和排序；布局和行图块以配置版本为键，无需手动清空
+        if snapshot.version != self.renderer.config_version:
+            self.renderer.applyConfig(snapshot)
+            self.update()
+
+    def setValueLabelPosition(self, inside: bool):
+        if self.renderer.value_label_inside != inside:
+            self.renderer.value_label_inside = inside
+            self.update()
+
+    def setShowSizeResolution(self, show_flag):
+        if self.renderer.show_size_resolution != show_flag:
+            self.renderer.show_size_resolution = show_flag
+            self.adjustHeight() 
 
+    def setData(self, df, metric_key, attributes=None, query=None, mask=None):
+        self.renderer.setData(df, metric_key, attributes, query=query, mask=mask)
+        self.invalidateTiles()
         self.adjustHeight() 
-        
-        render_export_height_scaled = self.minimumHeight() 
-        render_export_width_unscaled = self.EXPORT_TARGET_WIDTH 
-        
-        dpr_export = 1.8 
 
-        pixmap_width_device_pixels = int(render_export_width_unscaled * dpr_export)
-        pixmap_height_device_pixels = int(render_export_height_scaled * dpr_export)
+    def mergeRows(self, added):
+        # 增量插入：列几何和条形比例不变时只重绘第一个变化行以下的区域，行图块保留
+        # 当前图表为空 (无法插入) 时返回 False，由调用方完整重建 (Returns False when the caller must rebuild)
+        if not self.renderer.config or not len(self.renderer.data): return False
+        if not len(added): return True
+        before = (self.chartLayout().geometry, self.renderer.max_value_for_bar)
+        first = self.renderer.mergeRows(added)
+        self.setMinimumHeight(self.renderer.contentHeight())
+        L = self.chartLayout()
+        if (L.geometry, self.renderer.max_value_for_bar) == before:
+            y = L.pad + L.title_h + first * L.row_h
+            self.update(0, y, self.width(), max(0, self.height() - y))
+        else:
+            self.update()
+        return True
 
-        if pixmap_width_device_pixels <= 0 or pixmap_height_device_pixels <= 0:
-            pixmap_width_device_pixels = max(pixmap_width_device_pixels, int(1920 * dpr_export))
-            pixmap_height_device_pixels = max(pixmap_height_device_pixels, int(1080 * dpr_export))
+    def adjustHeight(self):
+        self.setMinimumHeight(self.renderer.contentHeight())
+        self.update() # Ensure a repaint is triggered after height adjustment
 
-        pix = QPixmap(QSize(pixmap_width_device_pixels, pixmap_height_device_pixels))
-        pix.setDevicePixelRatio(dpr_export)
-        pix.fill(Qt.GlobalColor.transparent) 
-        
-        original_widget_size = self.size()
-        self.resize(render_export_width_unscaled, render_export_height_scaled)
+    def invalidateLayout(self):
+        self.renderer.invalidateLayout()
 
-        painter = QPainter(pix); self.render(painter); painter.end()
-        
-        content_width_scaled = getattr(self, '_export_content_width', render_export_width_unscaled * self.EXPORT_FONT_SCALE_FACTOR) 
-        crop_width_device_pixels = int(content_width_scaled * dpr_export) 
-        crop_width_device_pixels = min(crop_width_device_pixels, pixmap_width_device_pixels)
-        
-        final_pixmap = pix.copy(0, 0, crop_width_device_pixels, pixmap_height_device_pixels)
-        final_pixmap.setDevicePixelRatio(dpr_export)
-        
-        self.show_size_resolution = original_show_size_res
-        self.value_label_inside = original_label_pos 
-        self.setStyleSheet(original_style_sheet)
-        self.setAutoFillBackground(original_auto_fill)
+    def invalidateTiles(self):
+        self._tile_cache.clear()
+        self._export_tile_cache.clear()
+
+    def setTileCacheBudget(self, screen_bytes, export_bytes=None):
+        # 预算为 0 时关闭图块缓存，直接绘制 (A zero budget disables tiling)
+        self._tile_cache.setBudget(screen_bytes)
+        if export_bytes is not None: self._export_tile_cache.setBudget(export_bytes)
 
-        if self.show_size_resolution:
-            self.current_row_height = self.EXPORT_LAYOUT_PARAMS["row_height_full"] 
+    def tileCacheStats(self):
+        return {"screen": self._tile_cache.stats(), "export": self._export_tile_cache.stats()}
+
+    def chartLayout(self):
+        return self.renderer.layout(self.width())
+
+    def resizeEvent(self, event):
+        self.invalidateLayout()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        with PROFILER.span("paint", height=event.rect().height()):
+            p = QPainter(self)
+            # 按重绘区域裁剪行 (Cull rows outside the exposed rect)
+            self.renderer.paint(p, self.width(), self.height(), event.rect(), self._tile_cache, self.devicePixelRatioF())
+            p.end()
+
+    def exportRenderer(self):
+        # 与原先 getChartPixmap 相同：按图表区当前宽度排版，再按内容宽度裁剪 (Export at the on-screen chart width)
+        r = self.renderer.exportCopy()
+        if self.width() > 0: r.export_width = self.width()
+        return r
+
+    def getChartImage(self, dpr=None):
+        return self.exportRenderer().renderImage(dpr, tiles=self._export_tile_cache)
+
+    def getChartPixmap(self, target_width=None):
+        return QPixmap.fromImage(self.getChartImage())
+
+    def exportPng(self, filename, dpr=None):
+        # 流式导出到 PNG 文件，复用 GUI 线程的导出图块缓存 (Streaming export with the export tile cache)
+        return self.exportRenderer().exportPng(filename, dpr, tiles=self._export_tile_cache)
+
+    def exportFile(self, filename, options=None):
+        # 按 ExportOptions 的格式导出当前图表；位图格式复用导出图块缓存，矢量格式直接绘制
+        options = options or ExportOptions()
+        backend = options.backend()
+        return backend.write(self.exportRenderer(), filename, options, tiles=None if backend.vector else self._export_tile_cache)
+
+
+class PngStreamWriter:
+    """逐段写出 8 位 RGBA PNG (Incremental PNG writer: IHDR up front, one IDAT chunk per band).
+
+    各段按顺序交给 writeImage()/writeRows()，由同一个 zlib 压缩流编码，行数凑满后 close() 写出 IEND。
+    level 为 zlib 压缩级别 (0-9)；dpi 写入 pHYs，text ({关键字: 文本}) 写入 iTXt，两者都省略时不写任何元数据。
+    """
+    SIGNATURE = b"\x89PNG\r\n\x1a\n"
+    DEFAULT_LEVEL = 6
+    COLOR_TYPE = 6 # 8 位 RGBA
+
+    def __init__(self, fileobj, width, height, level=None, dpi=None, text=None):
+        level = self.DEFAULT_LEVEL if level is None else level
+        if not 0 <= level <= 9: raise ValueError(f"PNG compression level must be 0-9: {level}")
+        self.f = fileobj; self.width = width; self.height = height
+        self.rows_written = 0
+        self._z = zlib.compressobj(level)
+        self.f.write(self.SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, self.COLOR_TYPE, 0, 0, 0)) # 无隔行
+        if dpi:
+            ppm = int(round(dpi / 0.0254))
+            self._chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+        for keyword, value in (text or {}).items(): # iTXt：未压缩的 UTF-8 文本，无语言标签
+            self._chunk(b"iTXt", keyword.encode("latin-1") + b"\0\0\0\0\0" + value.encode("utf-8"))
+
+    def _chunk(self, tag, data):
+        self.f.write(struct.pack(">I", len(data)))
+        self.f.write(tag); self.f.write(data)
+        self.f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag)) & 0xFFFFFFFF))
+
+    def _checkRows(self, rows):
+        if self.rows_written + rows > self.height: raise ValueError("more rows than the PNG header declares")
+
+    def _writeScanlines(self, pixels):
+        # pixels: (行数, 每行字节数) 的 uint8 数组；每行前加滤波类型 0
+        scanlines = np.empty((pixels.shape[0], pixels.shape[1] + 1), dtype=np.uint8)
+        scanlines[:, 0] = 0
+        scanlines[:, 1:] = pixels
+        data = self._z.compress(scanlines.tobytes())
+        if data: self._chunk(b"IDAT", data)
+
+    def writeRows(self, rgba):
+        # rgba: (行数, 宽 × 4) 的 uint8 数组
+        self._checkRows(rgba.shape[0])
+        self._writeScanlines(rgba)
+        self.rows_written += rgba.shape[0]
+
+    def writeImage(self, image):
+        # 预乘 ARGB 的条带转换为非预乘 RGBA 后写入，转换只涉及这一段
+        img = image.convertToFormat(QImage.Format.Format_RGBA8888)
+        ptr = img.constBits()
+        ptr.setsize(img.sizeInBytes())
+        rgba = np.frombuffer(ptr, dtype=np.uint8).reshape(img.height(), img.bytesPerLine())[:, :img.width() * 4]
+        self.writeRows(rgba)
+
+    def close(self):
+        if self.rows_written != self.height: raise ValueError("PNG closed before all rows were written")
+        self._chunk(b"IDAT", self._z.flush())
+        self._chunk(b"IEND", b"")
+
+
+class IndexedPngStreamWriter(PngStreamWriter):
+    """量化为最多 256 色调色板的 8 位索引 PNG (Indexed PNG with a quantized palette, still streamed band by band).
+
+    调色板必须写在图像数据之前，而颜色要等所有条带到达后才知道：writeRows() 把每个像素归入 RGBA 各取高 4 位的
+    颜色桶并累计像素数，同时记下每个桶第一个出现的颜色；与之不同的像素 (多为抗锯齿边缘，数量少) 另外精确统计
+    每种颜色的像素数，大面积平涂的像素只做一次比较。每段暂存桶编号、"与桶颜色不同"的位图和这些像素的颜色，
+    用快速 zlib 压缩 (平涂的图表压缩率很高)。
+    close() 时全图不超过 MAX_COLORS 种颜色就原样使用；否则调色板的一半取像素最多的颜色 (大面积平涂)，
+    其余按桶的像素数依次取各桶中像素最多的颜色 (覆盖其他色域)，每种颜色映射到最近的调色板颜色，
+    再写出 PLTE、tRNS 与 IDAT。调色板中的颜色保持不变；峰值内存为一段加上暂存的数据。
+    """
+    COLOR_TYPE = 3 # 8 位调色板
+    MAX_COLORS = 256
+    BUCKETS = 1 << 16
+    SPOOL_MEMORY_BYTES = 64 * 1024 * 1024 # 暂存数据超过此大小时写入临时文件
+    _SPOOL_HEADER = struct.Struct("<III") # 每段: 行数、压缩后的桶编号字节数、压缩后的位图字节数
+
+    def __init__(self, fileobj, width, height, level=None, dpi=None, text=None):
+        super().__init__(fileobj, width, height, level, dpi, text)
+        self._counts = np.zeros(self.BUCKETS, dtype=np.int64)
+        self._sample = np.zeros(self.BUCKETS, dtype=np.uint32) # 每个桶中第一个出现的颜色
+        self._exact = [] # 与所在桶 _sample 不同的各颜色的 (颜色, 像素数)，close() 时合并
+        self._spool = tempfile.SpooledTemporaryFile(self.SPOOL_MEMORY_BYTES)
+        self.colors_used = 0
+        self.quantized = False # 有像素被映射到不同颜色时为 True
+
+    @staticmethod
+    def _buckets(packed):
+        # packed 为按内存顺序 (R, G, B, A) 读出的小端 uint32；各通道取高 4 位拼成 16 位桶编号
+        return (((packed >> 4) & 0x000F) | ((packed >> 8) & 0x00F0) | ((packed >> 12) & 0x0F00) | ((packed >> 16) & 0xF000)).astype(np.uint16)
+
+    @staticmethod
+    def _rgba(packed):
+        return packed.astype("<u4").view(np.uint8).reshape(-1, 4)
+
+    def writeRows(self, rgba):
+        rows = rgba.shape[0]
+        self._checkRows(rows)
+        packed = np.ascontiguousarray(rgba).view("<u4").reshape(-1)
+        buckets = self._buckets(packed)
+        counts = np.bincount(buckets, minlength=self.BUCKETS)
+        first = np.zeros(self.BUCKETS, dtype=np.uint32)
+        first[buckets] = packed
+        self._sample = np.where(self._counts > 0, self._sample, first)
+        other = packed != self._sample[buckets]
+        others = packed[other]
+        if len(others): self._exact.append(np.unique(others, return_counts=True))
+        self._counts += counts
+        packed_buckets = zlib.compress(buckets.tobytes(), 1)
+        packed_mask = zlib.compress(np.packbits(other).tobytes(), 1)
+        self._spool.write(self._SPOOL_HEADER.pack(rows, len(packed_buckets), len(packed_mask)))
+        self._spool.write(packed_buckets); self._spool.write(packed_mask); self._spool.write(others.astype("<u4").tobytes())
+        self.rows_written += rows
+
+    def _exactColors(self):
+        # 与 _sample 不同的 (颜色, 像素数)，颜色升序且不重复
+        if not self._exact: return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int64)
+        colors, inverse = np.unique(np.concatenate([c for c, _ in self._exact]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([n for _, n in self._exact])).astype(np.int64)
+        self._exact = [(colors, counts)]
+        return colors, counts
+
+    def _palette(self):
+        # 返回 (调色板 RGBA (k, 4) uint8, 桶编号 -> 其 _sample 的调色板索引, 其他颜色 (升序), 这些颜色 -> 调色板索引)
+        present = np.flatnonzero(self._counts)
+        exact_colors, exact_counts = self._exactColors()
+        sample_counts = self._counts - np.bincount(self._buckets(exact_colors), weights=exact_counts, minlength=self.BUCKETS).astype(np.int64)
+        candidates = np.concatenate([self._sample[present], exact_colors])
+        if len(candidates) <= self.MAX_COLORS:
+            palette, index = candidates, np.arange(len(candidates))
         else:
-            self.current_row_height = self.EXPORT_LAYOUT_PARAMS["row_height_compact"]
-        self.current_base_title_height = self.EXPORT_LAYOUT_PARAMS["base_title_height"]
+            # 一半取像素最多的颜色，其余按桶的像素数取各桶的代表色 (桶中像素最多的颜色)，去重后截取
+            bucket = self._buckets(candidates)
+            counts = np.concatenate([sample_counts[present], exact_counts])
+            by_count = np.argsort(-counts, kind="stable")
+            by_bucket = np.lexsort((-counts, bucket))
+            heads = by_bucket[np.r_[True, bucket[by_bucket][1:] != bucket[by_bucket][:-1]]]
+            heads = heads[np.argsort(-self._counts[bucket[heads]], kind="stable")]
+            ranked = np.concatenate([by_count[:self.MAX_COLORS // 2], heads, by_count[self.MAX_COLORS // 2:]])
+            _, first = np.unique(ranked, return_index=True)
+            palette = candidates[np.sort(ranked[np.sort(first)][:self.MAX_COLORS])]
+            # 在预乘颜色空间中找最近的调色板颜色，透明度不同的同色像素不会被映射成别的颜色；调色板颜色映射到自身
+            premultiplied = lambda c: np.concatenate([c[:, :3] * (c[:, 3:] / 255.0), c[:, 3:]], axis=1)
+            target = premultiplied(self._rgba(palette).astype(np.float32))
+            source = premultiplied(self._rgba(candidates).astype(np.float32))
+            index = np.empty(len(candidates), dtype=np.intp)
+            for start in range(0, len(candidates), 4096):
+                block = source[start:start + 4096]
+                index[start:start + 4096] = ((block[:, None, :] - target[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+            self.quantized = bool((palette[index] != candidates).any())
+        colors = self._rgba(palette)
+        order = np.argsort(colors[:, 3] == 255, kind="stable") # 不透明颜色放在后面，tRNS 可以截短
+        rank = np.empty(len(order), dtype=np.uint8)
+        rank[order] = np.arange(len(order), dtype=np.uint8)
+        index = rank[index]
+        lut = np.zeros(self.BUCKETS, dtype=np.uint8)
+        lut[present] = index[:len(present)]
+        self.colors_used = len(palette)
+        return colors[order], lut, exact_colors, index[len(present):]
+
+    def close(self):
+        if self.rows_written != self.height: raise ValueError("PNG closed before all rows were written")
+        colors, lut, exact_colors, exact_index = self._palette()
+        self._chunk(b"PLTE", colors[:, :3].tobytes())
+        alpha = colors[:, 3]
+        opaque = int((alpha == 255).sum())
+        if opaque < len(alpha): self._chunk(b"tRNS", alpha[:len(alpha) - opaque].tobytes())
+
+        # 逐段读回暂存的桶编号，换成调色板索引后编码；与桶颜色不同的像素按精确颜色查找
+        self._spool.seek(0)
+        while True:
+            header = self._spool.read(self._SPOOL_HEADER.size)
+            if not header: break
+            rows, bucket_bytes, mask_bytes = self._SPOOL_HEADER.unpack(header)
+            pixels = rows * self.width
+            indices = lut[np.frombuffer(zlib.decompress(self._spool.read(bucket_bytes)), dtype=np.uint16)]
+            other = np.unpackbits(np.frombuffer(zlib.decompress(self._spool.read(mask_bytes)), dtype=np.uint8), count=pixels).view(bool)
+            n_other = int(np.count_nonzero(other))
+            if n_other:
+                others = np.frombuffer(self._spool.read(4 * n_other), dtype="<u4")
+                indices[other] = exact_index[np.searchsorted(exact_colors, others)]
+            self._writeScanlines(indices.reshape(rows, self.width))
+        self._spool.close()
+        super().close()
+
+
+def safe_filename(metric_key):
+    return re.sub(r'[^\w\s-]', '', metric_key).strip().replace(' ', '_') or 'chart'
+
+
+# --- 导出格式 (Export backends) ---
+class ExportOptions:
+    """导出格式与参数 (Export format and parameters).
+
+    format 为 EXPORT_BACKENDS 的键。dpr 只影响位图格式，None 时使用渲染器的 export_dpr；
+    quality 为 0-100 的位图编码质量，None 时使用格式的默认值 (WebP 为 100，即无损)。
+    png_level 为 PNG 的 zlib 压缩级别 (0-9，None 为 6)，palette 为 True 时 PNG 量化为最多 256 色的索引图像；
+    strip_metadata 为 True 时不写标题、生成软件和 DPI 等元数据。
+    """
+
+    def __init__(self, format="png", dpr=None, quality=None, png_level=None, palette=False, strip_metadata=False):
+        if format not in EXPORT_BACKENDS: raise ValueError(f"Unknown export format: {format}")
+        if quality is not None and not 0 <= quality <= 100: raise ValueError(f"quality 应在 0-100 之间: {quality}")
+        if png_level is not None and not 0 <= png_level <= 9: raise ValueError(f"PNG 压缩级别应在 0-9 之间: {png_level}")
+        self.format = format; self.dpr = dpr; self.quality = quality
+        self.png_level = png_level; self.palette = palette; self.strip_metadata = strip_metadata
+
+    def _key(self):
+        return (self.format, self.dpr, self.quality, self.png_level, self.palette, self.strip_metadata)
+
+    def __eq__(self, other):
+        return isinstance(other, ExportOptions) and self._key() == other._key()
+
+    def backend(self):
+        return EXPORT_BACKENDS[self.format]
+
+    def describe(self):
+        parts = [self.backend().label]
+        if not self.backend().vector and self.dpr: parts.append(f"{self.dpr:g}x")
+        if self.quality is not None: parts.append(f"质量 {self.quality}")
+        if self.format == "png":
+            if self.png_level is not None: parts.append(f"压缩 {self.png_level}")
+            if self.palette: parts.append("调色板")
+        if self.strip_metadata: parts.append("无元数据")
+        return " ".join(parts)
+
+
+class ExportBackend(abc.ABC):
+    """导出格式后端的抽象基类 (Abstract export backend).
+
+    write(renderer, filename, options, tiles) 把已 setData 的导出渲染器写入文件，返回 (宽, 高)：
+    位图格式为设备像素，矢量格式为点。tiles 为 None 时可在工作线程中调用；矢量格式忽略 tiles，
+    以免把行图块作为位图嵌入。写入失败时删除不完整的文件并抛出 OSError。
+    """
+    key = None
+    label = None
+    extension = None
+    vector = False
+
+    def available(self):
+        return True
+
+    def fileFilter(self):
+        return f"{self.label} Files (*.{self.extension})"
+
+    @abc.abstractmethod
+    def write(self, renderer, filename, options, tiles=None):
+        """写出文件并返回 (宽, 高)，见类说明。"""
+
+    @staticmethod
+    def _discard(filename):
+        with contextlib.suppress(OSError): os.remove(filename)
+
+
+class PngExportBackend(ExportBackend):
+    key, label, extension = "png", "PNG", "png"
+
+    def write(self, renderer, filename, options, tiles=None):
+        # 逐段编码，峰值内存为一段 (调色板模式另加暂存的颜色桶编号)
+        return renderer.exportPng(filename, options.dpr, tiles=tiles, level=options.png_level, palette=options.palette,
+                                  metadata=not options.strip_metadata)
+
+
+class WebpExportBackend(ExportBackend):
+    # Qt 的 WebP 插件在质量为 100 时使用无损编码；整张图像一次编码，单边不能超过 16383 像素
+    key, label, extension = "webp", "WebP", "webp"
+    LOSSLESS_QUALITY = 100
+    MAX_DIMENSION = 16383
+
+    def available(self):
+        return "webp" in (bytes(f).decode() for f in QImageWriter.supportedImageFormats())
+
+    @PROFILER.measure("export_webp")
+    def write(self, renderer, filename, options, tiles=None):
+        width_px, height_px = renderer.exportSize(options.dpr)
+        if max(width_px, height_px) > self.MAX_DIMENSION:
+            raise ValueError(f"WebP 单边最多 {self.MAX_DIMENSION} 像素，图像为 {width_px}×{height_px}；请降低 DPR 或缩小名次范围")
+        image = renderer.renderImage(options.dpr, tiles=tiles)
+        writer = QImageWriter(filename, b"webp")
+        writer.setQuality(self.LOSSLESS_QUALITY if options.quality is None else options.quality)
+        with PROFILER.span("webp_encode", rows=height_px):
+            ok = writer.write(image)
+        if not ok:
+            self._discard(filename)
+            raise OSError(f"无法写入 {filename}: {writer.errorString()}")
+        return width_px, height_px
+
+
+class SvgExportBackend(ExportBackend):
+    key, label, extension = "svg", "SVG", "svg"
+    vector = True
+
+    def available(self):
+        return QSvgGenerator is not None
+
+    @PROFILER.measure("export_svg")
+    def write(self, renderer, filename, options, tiles=None):
+        width, height = renderer.exportSize(1.0)
+        generator = QSvgGenerator()
+        generator.setFileName(filename)
+        generator.setSize(QSize(width, height))
+        generator.setViewBox(QRect(0, 0, width, height))
+        if not options.strip_metadata: generator.setTitle(renderer.exportMetadata()["Title"])
+        p = QPainter(generator)
+        if not p.isActive():
+            self._discard(filename)
+            raise OSError(f"无法写入 {filename}")
+        p.setClipRect(QRect(0, 0, width, height)) # 与位图导出相同的内容宽度裁剪
+        renderer.paint(p, renderer.export_width, renderer.contentHeight())
+        p.end()
+        return width, height
+
+
+class PdfExportBackend(ExportBackend):
+    """每个天梯图占一页 (或几页) 的 PDF，文字与条形均为矢量 (Vector PDF, one ladder per page).
+
+    1 个逻辑像素对应 1 点；高于 MAX_PAGE_HEIGHT 的天梯图在行边界处分页。writeDocument() 把多个
+    渲染器依次写入同一文件，用于导出包含全部指标的 PDF 合集。
+    """
+    key, label, extension = "pdf", "PDF", "pdf"
+    vector = True
+    MAX_PAGE_HEIGHT = 14400 # PDF 阅读器普遍支持的最大页面边长 (200 英寸)
+
+    def pageSlices(self, renderer):
+        # 逐页产出 (顶端 y, 页高)；首页包含标题，其余页按整行切分
+        h = renderer.contentHeight()
+        if h <= self.MAX_PAGE_HEIGHT:
+            yield 0, h; return
+        L = renderer.layout(renderer.export_width)
+        rows_top = L.pad + L.title_h
+        step = max(1, (self.MAX_PAGE_HEIGHT - rows_top) // L.row_h) * L.row_h
+        top, bottom = 0, rows_top + step
+        while top < h:
+            yield top, min(bottom, h) - top
+            top, bottom = bottom, bottom + step
+
+    def write(self, renderer, filename, options, tiles=None):
+        self.writeDocument([renderer], filename, metadata=not options.strip_metadata)
+        return renderer.exportSize(1.0)
+
+    @PROFILER.measure("export_pdf")
+    def writeDocument(self, renderers, filename, metadata=True):
+        # renderers 可以是生成器：逐个 setData 后产出同一个渲染器，整个文档只保留一个行模型。返回页数
+        writer = QPdfWriter(filename)
+        writer.setResolution(72)
+        writer.setCreator("显示器天梯图生成器" if metadata else "")
+        writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+        p = None; pages = 0
+        try:
+            for renderer in renderers:
+                width = renderer.exportSize(1.0)[0]
+                h = renderer.contentHeight()
+                for top, height in self.pageSlices(renderer):
+                    writer.setPageSize(QPageSize(QSizeF(width, height), QPageSize.Unit.Point, "", QPageSize.SizeMatchPolicy.ExactMatch))
+                    if p is None:
+                        if metadata: writer.setTitle(renderer.exportMetadata()["Title"])
+                        p = QPainter(writer)
+                        if not p.isActive(): raise OSError(f"无法写入 {filename}")
+                    else:
+                        writer.newPage()
+                    clip = QRect(0, top, width, height)
+                    p.save(); p.translate(0, -top); p.setClipRect(clip)
+                    renderer.paint(p, renderer.export_width, h, clip_rect=clip)
+                    p.restore()
+                    pages += 1
+        except Exception:
+            if p is not None: p.end()
+            self._discard(filename)
+            raise
+        if p is None:
+            self._discard(filename)
+            raise ValueError("没有可导出的图表")
+        p.end()
+        return pages
 
 
-        self._is_export_mode = False 
-        self.resize(original_widget_size) 
-        self.adjustHeight() 
-        return final_pixmap
+EXPORT_BACKENDS = {b.key: b for b in (PngExportBackend(), SvgExportBackend(), PdfExportBackend(), WebpExportBackend())}
+EXPORT_DOCUMENT = "pdf-document" # 导出格式下拉框中的 “PDF 合集”：全部指标写入一个多页 PDF
+EXPORT_DPR_CHOICES = {"1x": 1.0, "1.5x": 1.5, "1.8x (默认)": ChartRenderer.EXPORT_DPR, "2x": 2.0, "3x": 3.0}
+EXPORT_QUALITY_CHOICES = {"无损 (默认)": None, "90": 90, "75": 75}
+EXPORT_PNG_LEVEL_CHOICES = {"1 (最快)": 1, "6 (默认)": None, "9 (最小)": 9}
+
+def available_export_backends():
+    return [b for b in EXPORT_BACKENDS.values() if b.available()]
+
+
+class _ExportJob(QRunnable):
+    # 在工作线程中完成一个指标的行模型构建、绘制和编码，格式由 options 决定
+    def __init__(self, exporter, renderer, df, metric_key, config, attributes, filename, query=None, mask=None, options=None):
+        super().__init__()
+        self.exporter = exporter; self.renderer = renderer; self.df = df
+        self.metric_key = metric_key; self.config = config; self.attributes = attributes
+        self.filename = filename; self.query = query; self.mask = mask
+        self.options = options or ExportOptions()
+
+    def run(self):
+        if self.exporter.cancelled():
+            self.exporter._job_done.emit(self.metric_key, "cancelled", None); return
+        stats = None
+        try:
+            t0 = time.perf_counter()
+            self.renderer.setData(self.df, self.metric_key, self.attributes, config=self.config, query=self.query, mask=self.mask)
+            if not self.renderer.data or not self.renderer.config:
+                self.exporter._job_done.emit(self.metric_key, "empty", None); return
+            self.options.backend().write(self.renderer, self.filename, self.options)
+            stats = {"seconds": time.perf_counter() - t0, "bytes": os.path.getsize(self.filename)}
+            status = "ok"
+        except Exception as e:
+            print(f"Error exporting '{self.metric_key}': {e}")
+            status = "failed"
+        self.exporter._job_done.emit(self.metric_key, status, stats)
+
+
+class _DocumentJob(QRunnable):
+    # 在一个工作线程中把多个指标依次写入同一个多页 PDF，只保留一个行模型；每处理完一个指标发出 _chart_done
+    def __init__(self, exporter, renderer, df, jobs, attributes, filename, query=None, mask=None, metadata=True):
+        super().__init__()
+        self.exporter = exporter; self.renderer = renderer; self.df = df
+        self.jobs = jobs; self.attributes = attributes
+        self.filename = filename; self.query = query; self.mask = mask; self.metadata = metadata
+
+    def _renderers(self, written):
+        for metric_key, config in self.jobs:
+            if self.exporter.cancelled(): return
+            self.renderer.setData(self.df, metric_key, self.attributes, config=config, query=self.query, mask=self.mask)
+            if self.renderer.data and self.renderer.config:
+                yield self.renderer
+                written.append(metric_key)
+            self.exporter._chart_done.emit(metric_key)
+
+    def run(self):
+        written = []; stats = None
+        try:
+            t0 = time.perf_counter()
+            EXPORT_BACKENDS["pdf"].writeDocument(self._renderers(written), self.filename, self.metadata)
+            if self.exporter.cancelled():
+                ExportBackend._discard(self.filename); status = "cancelled"
+            else:
+                stats = {"seconds": time.perf_counter() - t0, "bytes": os.path.getsize(self.filename), "charts": len(written)}
+                status = "ok"
+        except Exception as e:
+            if self.exporter.cancelled(): status = "cancelled" # 在写出第一页之前取消
+            else:
+                print(f"Error exporting '{self.filename}': {e}")
+                status = "failed"
+        self.exporter._job_done.emit(os.path.basename(self.filename), status, stats)
+
+
+class BatchExporter(QObject):
+    """在线程池中离屏导出多个指标的天梯图 (Off-screen, thread-pooled batch export).
+
+    每个指标使用独立的 ChartRenderer 副本，在工作线程中绘制并按 ExportOptions 的格式编码，不会改动可见的 ChartWidget；
+    startDocument() 则把全部指标写入一个多页 PDF。progress(已完成数, 总数, 指标) 与
+    finished(成功数, 失败列表, 是否取消) 信号在 GUI 线程中发出；report() 给出最近一次导出的文件大小与耗时。
+    """
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(int, list, bool)
+    _job_done = pyqtSignal(str, str, object)
+    _chart_done = pyqtSignal(str)
+
+    def __init__(self, parent=None, max_threads=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        if max_threads: self._pool.setMaxThreadCount(max_threads)
+        self._cancel = threading.Event()
+        self._total = self._done = self._exported = 0
+        self._charts_total = self._charts_done = 0
+        self._failed = []
+        self._document = False
+        self._report = {}
+        self._started = 0.0
+        self._job_done.connect(self._on_job_done)
+        self._chart_done.connect(self._on_chart_done)
+
+    def isRunning(self):
+        return self._done < self._total
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _jobs(self, template, metric_keys):
+        # 所有任务共用同一个配置快照，工作线程不读取 CONFIG_STORE
+        snapshot = CONFIG_STORE.snapshot()
+        def renderer():
+            r = template.exportCopy()
+            r.panel_colors = snapshot.panel_colors; r.config_version = snapshot.version
+            return r
+        return [(k, snapshot.metricConfig(k)) for k in metric_keys if k in snapshot.metrics], renderer
+
+    def _begin(self, total, charts_total, options, document=False):
+        self._cancel.clear()
+        self._total = total; self._done = self._exported = 0; self._failed = []
+        self._charts_total = charts_total; self._charts_done = 0
+        self._document = document
+        self._report = {"format": options.describe(), "files": 0, "bytes": 0, "seconds": 0.0, "job_seconds": 0.0}
+        self._started = time.perf_counter()
+        if not total: self.finished.emit(0, [], False)
+
+    def start(self, template, df, metric_keys, folder, attributes=None, query=None, mask=None, options=None):
+        # template: ChartWidget.exportRenderer() 的结果，携带当前主题、配色和标签位置
+        # query (RankQuery) 与 mask (筛选掩码) 作用于每个指标；options (ExportOptions) 决定格式，缺省为 PNG
+        options = options or ExportOptions()
+        jobs, renderer = self._jobs(template, metric_keys)
+        self._begin(len(jobs), len(jobs), options)
+        for metric_key, config in jobs:
+            filename = f"{folder}/{safe_filename(metric_key)}.{options.backend().extension}"
+            self._pool.start(_ExportJob(self, renderer(), df, metric_key, config, attributes, filename, query, mask, options))
+        return self._total
+
+    def startDocument(self, template, df, metric_keys, filename, attributes=None, query=None, mask=None, strip_metadata=False):
+        # 全部指标依次写入一个多页 PDF；只有一个任务，progress 仍按指标发出
+        jobs, renderer = self._jobs(template, metric_keys)
+        self._begin(1 if jobs else 0, len(jobs), ExportOptions("pdf", strip_metadata=strip_metadata), document=True)
+        if jobs: self._pool.start(_DocumentJob(self, renderer(), df, jobs, attributes, filename, query, mask, not strip_metadata))
+        return len(jobs)
+
+    def report(self):
+        # 最近一次导出：格式、文件数、总字节数、墙钟耗时 seconds 与各任务耗时之和 job_seconds
+        return dict(self._report)
+
+    def _on_chart_done(self, metric_key):
+        self._charts_done += 1
+        self.progress.emit(self._charts_done, self._charts_total, metric_key)
+
+    def _on_job_done(self, metric_key, status, stats):
+        self._done += 1
+        if status == "ok": self._exported += stats.get("charts", 1)
+        elif status == "failed": self._failed.append(metric_key)
+        if stats:
+            self._report["files"] += 1; self._report["bytes"] += stats["bytes"]; self._report["job_seconds"] += stats["seconds"]
+        if not self._document: self._on_chart_done(metric_key)
+        if self._done == self._total:
+            self._report["seconds"] = time.perf_counter() - self._started
+            self.finished.emit(self._exported, self._failed, self.cancelled())
+
+    def waitForDone(self, msecs=-1):
+        return self._pool.waitForDone(msecs)
+
+
+class _LoadJob(QRunnable):
+    # 在工作线程中分块读取 CSV，按时间间隔发出部分数据集 (Chunked CSV load; emits partial datasets periodically)
+    def __init__(self, loader, generation, fn, known_columns, cancel):
+        super().__init__()
+        self.loader = loader; self.generation = generation; self.fn = fn
+        self.known_columns = known_columns; self.cancel = cancel
+        self._last_partial = time.perf_counter()
+        self._partial_dataset = None # 上次发出的部分数据集，之后只清洗并追加新读入的块 (Only new chunks are cleaned)
+        self._partial_chunks = self._partial_rows = 0
+
+    def _on_chunk(self, frames, rows_read, estimated_rows):
+        self.loader._progress.emit(self.generation, rows_read, estimated_rows)
+        now = time.perf_counter()
+        if now - self._last_partial < self.loader.PARTIAL_INTERVAL_SECONDS: return
+        # 行数按比例增长后才重建，GUI 每次都要重建行模型，总工作量因此与行数成线性 (Geometric spacing keeps total work linear)
+        if self._partial_rows and rows_read < self._partial_rows * self.loader.PARTIAL_GROWTH: return
+        self._last_partial = now
+        new = frames[self._partial_chunks:]
+        df = pd.concat(new) if len(new) > 1 else new[0].copy()
+        tail = MonitorDataset(df, [c for c in df.columns if c not in self.known_columns])
+        self._partial_dataset = tail if self._partial_dataset is None else self._partial_dataset.concat(tail)
+        self._partial_chunks, self._partial_rows = len(frames), rows_read
+        self.loader._partial.emit(self.generation, self._partial_dataset)
+
+    def run(self):
+        cache = self.loader.cache
+        try:
+            result = load_dataset(self.fn, self.known_columns, on_chunk=self._on_chunk, cancel=self.cancel, cache=cache)
+        except LoadCancelled:
+            self.loader._done.emit(self.generation, None); return
+        except Exception as e:
+            print(f"Error loading CSV: {e}")
+            result = (None, {"encoding": None}, {})
+        self.loader._done.emit(self.generation, result)
+
+        # 图表先显示，再在本线程中写缓存 (Write the cache after the GUI already has the data)
+        dataset, info, _ = result
+        if cache is not None and dataset is not None and not dataset.empty and not info.get("cache_hit") and not self.cancel.is_set():
+            try:
+                cache.store(self.fn, dataset, info, self.known_columns)
+            except Exception as e:
+                print(f"Failed to write dataset cache for {self.fn}: {e}")
+
+
+class DatasetLoader(QObject):
+    """后台加载 CSV 的线程池任务管理 (Background CSV loader).
+
+    同一时间只有一个加载任务有效：start() 会取消上一个任务，过期任务的信号被丢弃。
+    给定 DatasetCache 时先查缓存；未命中则在加载完成后由同一工作线程写入缓存。
+    progress(已读行数, 估计总行数)、partial(部分 MonitorDataset)、finished(dataset, info, new_configs) 在 GUI 线程中发出；
+    被取消时发出 cancelled()。
+    """
+    PARTIAL_INTERVAL_SECONDS = 0.5
+    PARTIAL_GROWTH = 1.5 # 下一个部分数据集至少比上一个多读这么多倍的行 (Row growth between partial datasets)
+
+    progress = pyqtSignal(int, int)
+    partial = pyqtSignal(object)
+    finished = pyqtSignal(object, dict, dict)
+    cancelled = pyqtSignal()
+    _progress = pyqtSignal(int, int, int)
+    _partial = pyqtSignal(int, object)
+    _done = pyqtSignal(int, object)
+
+    def __init__(self, parent=None, cache=None):
+        super().__init__(parent)
+        self.cache = cache
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(2) # 被取消的任务可能还在收尾 (A cancelled job may still be winding down)
+        self._generation = 0
+        self._cancel = None
+        self._progress.connect(self._on_progress)
+        self._partial.connect(self._on_partial)
+        self._done.connect(self._on_done)
+
+    def isRunning(self):
+        return self._cancel is not None
+
+    def start(self, fn, known_columns=KNOWN_COLUMNS):
+        self.cancel()
+        self._generation += 1
+        self._cancel = threading.Event()
+        self._pool.start(_LoadJob(self, self._generation, fn, list(known_columns), self._cancel))
+
+    def cancel(self):
+        if self._cancel is None: return
+        self._cancel.set(); self._cancel = None
+        self.cancelled.emit()
+
+    def waitForDone(self, msecs=-1):
+        return self._pool.waitForDone(msecs)
+
+    def _on_progress(self, generation, rows_read, estimated_rows):
+        if generation == self._generation and self._cancel is not None: self.progress.emit(rows_read, estimated_rows)
+
+    def _on_partial(self, generation, dataset):
+        if generation == self._generation and self._cancel is not None: self.partial.emit(dataset)
+
+    def _on_done(self, generation, result):
+        if generation != self._generation or self._cancel is None or result is None: return
+        self._cancel = None
+        dataset, info, new_configs = result
+        self.finished.emit(dataset, info, new_configs)
+
+
+class ChartUpdateScheduler(QObject):
+    """把同一事件循环周期内的图表更新请求合并为一次 (Coalesce chart updates into one pass per event-loop tick).
+
+    request() 只记录脏阶段并启动 0 ms 单次定时器；回到事件循环后 flush() 把累计的阶段集合交给
+    apply(stages) 一次。需要立即看到最新图表的操作 (导出、增量追加) 先调用 flush()。
+    """
+    DATA, ORDERING, LABELS, LAYOUT, COLOURS = "data", "ordering", "labels", "layout", "colours"
+    STAGES = (DATA, ORDERING, LABELS, LAYOUT, COLOURS)
+
+    def __init__(self, apply, parent=None):
+        super().__init__(parent)
+        self._apply = apply
+        self._dirty = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    def request(self, *stages):
+        unknown = set(stages) - set(self.STAGES)
+        if unknown: raise ValueError(f"Unknown chart update stage: {', '.join(sorted(unknown))}")
+        if self._dirty: PROFILER.count("chart_updates_coalesced")
+        self._dirty.update(stages)
+        if not self._timer.isActive(): self._timer.start()
+
+    def pending(self):
+        return frozenset(self._dirty)
+
+    def flush(self):
+        self._timer.stop()
+        if not self._dirty: return
+        stages, self._dirty = frozenset(self._dirty), set()
+        with PROFILER.span("chart_update", stages=",".join(s for s in self.STAGES if s in stages)):
+            self._apply(stages)
+
+
+class FilterDialog(QDialog):
+    """编辑 DatasetFilter 的对话框：面板类型和分辨率多选，尺寸、刷新率和各指标填写范围。"""
+    def __init__(self, index, current, metric_columns, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("筛选")
+        self.index = index
+        self._metric_columns = metric_columns # [(指标名, csv 列名)]
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+        self.panel_list = self._category_list("panel", current.panels)
+        self.resolution_list = self._category_list("resolution", current.resolutions)
+        form.addRow("面板类型:", self.panel_list)
+        form.addRow("分辨率:", self.resolution_list)
+        self.size_input = self._range_input(current.size, "例如 27-32")
+        self.refresh_input = self._range_input(current.refresh, "例如 144-")
+        form.addRow("尺寸 (英寸):", self.size_input)
+        form.addRow("刷新率 (Hz):", self.refresh_input)
+        self.metric_inputs = {}
+        for metric_key, col in metric_columns:
+            self.metric_inputs[col] = self._range_input(current.metric_ranges.get(col), "例如 -1.5")
+            form.addRow(f"{metric_key}:", self.metric_inputs[col])
+        form_widget = QWidget(); form_widget.setLayout(form)
+        scroll = QScrollArea(); scroll.setWidgetResizable(True); scroll.setWidget(form_widget)
+        layout.addWidget(scroll, 1)
+
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel | QDialogButtonBox.StandardButton.Reset)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        buttons.button(QDialogButtonBox.StandardButton.Reset).clicked.connect(self.reset)
+        layout.addWidget(buttons)
+        self.panel_list.itemChanged.connect(self.update_count)
+        self.resolution_list.itemChanged.connect(self.update_count)
+        for edit in [self.size_input, self.refresh_input, *self.metric_inputs.values()]:
+            edit.editingFinished.connect(self.update_count)
+        self.resize(420, 560)
+        self.update_count()
+
+    def _category_list(self, field, selected):
+        lst = QListWidget()
+        for value, count in self.index.categories(field):
+            item = QListWidgetItem(f"{value} ({count})")
+            item.setData(Qt.ItemDataRole.UserRole, value)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if value in selected else Qt.CheckState.Unchecked)
+            lst.addItem(item)
+        lst.setMaximumHeight(110)
+        return lst
+
+    def _range_input(self, bounds, placeholder):
+        edit = QLineEdit(format_range(bounds) if bounds else "")
+        edit.setPlaceholderText(placeholder)
+        return edit
+
+    @staticmethod
+    def _checked(lst):
+        return [lst.item(i).data(Qt.ItemDataRole.UserRole) for i in range(lst.count())
+                if lst.item(i).checkState() == Qt.CheckState.Checked]
+
+    def reset(self):
+        for lst in (self.panel_list, self.resolution_list):
+            for i in range(lst.count()): lst.item(i).setCheckState(Qt.CheckState.Unchecked)
+        for edit in [self.size_input, self.refresh_input, *self.metric_inputs.values()]: edit.clear()
+        self.update_count()
+
+    def datasetFilter(self):
+        # 任何范围格式错误时抛出 ValueError
+        return DatasetFilter(
+            panels=self._checked(self.panel_list), resolutions=self._checked(self.resolution_list),
+            size=parse_range(self.size_input.text()), refresh=parse_range(self.refresh_input.text()),
+            metric_ranges={col: b for col, edit in self.metric_inputs.items() if (b := parse_range(edit.text()))})
+
+    def update_count(self):
+        try:
+            flt = self.datasetFilter()
+        except ValueError as e:
+            self.count_label.setText(str(e)); return
+        self.count_label.setText(f"符合条件: {self.index.count(flt)} / {len(self.index.dataset)} 条")
+
+    def accept(self):
+        try:
+            self.datasetFilter()
+        except ValueError as e:
+            self.count_label.setText(str(e)); return
+        super().accept()
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.current_theme_name = "dark" 
-        self.data_frame = None
-        self.known_columns = ["显示器型号", "面板类型", "显示器尺寸", "刷新率", "分辨率"] 
+        self.dataset = None
+        self.rank_query = RankQuery()
+        self.dataset_filter = DatasetFilter()
+        self.known_columns = list(KNOWN_COLUMNS)
+        self.export_progress = None
+        self.exporter = BatchExporter(self)
+        self.exporter.progress.connect(self.on_export_progress)
+        self.exporter.finished.connect(self.on_export_finished)
+        self.loader = DatasetLoader(self, cache=DatasetCache())
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.partial.connect(self.on_load_partial)
+        self.loader.finished.connect(self.on_load_finished)
+        self._load_shown_partial = False
+        self._dataset_before_load = None # 取消加载时恢复 (Restored when a load is cancelled)
+        self.dataset_path = None
+        self._loading_path = None
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.on_watched_file_changed)
+        self._reload_timer = QTimer(self) # 合并短时间内的多次文件变化通知 (Coalesce bursts of change notifications)
+        self._reload_timer.setSingleShot(True)
+        self._reload_timer.setInterval(300)
+        self._reload_timer.timeout.connect(self.reload_watched_file)
+        self.chart_updates = ChartUpdateScheduler(self.apply_chart_updates, self)
 
         self.setWindowTitle("显示器天梯图生成器")
         self.setGeometry(100, 100, 1400, 900) 
 
         self.init_ui() 
+        CONFIG_STORE.subscribe(self.on_config_changed)
+        for name in THEMES: theme_assets(name).stylesheet # 启动时预编译所有主题，切换时不再生成样式表
+        self.last_theme_switch_ms = None
         self.apply_stylesheet(self.current_theme_name) 
-        
-        theme_colors = THEMES[self.current_theme_name]
-        self.chart_widget.set_theme_colors( 
-            theme_colors["text_primary"],
-            theme_colors["text_secondary"],
-            theme_colors["chart_empty_text"],
-            theme_colors["chart_bar_background"]
-        )
+        self.chart_widget.set_theme_colors(*theme_assets(self.current_theme_name).chartColors())
         self.statusBar().showMessage("请加载 CSV 文件。")
         self.populate_metric_combo()
         self.on_scheme_change(self.scheme_combo.currentText()) 
-        self.chart_widget.setShowSizeResolution(self.show_details_checkbox.isChecked())
-        self.chart_widget.setValueLabelPosition(self.label_pos_checkbox.isChecked())
+        self.chart_updates.request(ChartUpdateScheduler.LABELS, ChartUpdateScheduler.LAYOUT)
 
 
     def init_ui(self):
@@ -592,6 +3140,8 @@ class MainWindow(QMainWindow):
 
         control_panel_widget = self.create_control_panel()
         window_layout.addWidget(control_panel_widget)
+        self.composite_panel = self.create_composite_panel()
+        window_layout.addWidget(self.composite_panel)
         
         self.chart_widget = ChartWidget(self) 
         self.scroll_area = QScrollArea()
@@ -602,6 +3152,22 @@ class MainWindow(QMainWindow):
 
         self.setStatusBar(QStatusBar())
         self.statusBar().setObjectName("AppStatusBar")
+        self.load_progress_bar = QProgressBar()
+        self.load_progress_bar.setMaximumWidth(200)
+        self.load_progress_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.load_progress_bar)
+        self.btn_cancel_load = QToolButton()
+        self.btn_cancel_load.setText("取消加载")
+        self.btn_cancel_load.setVisible(False)
+        self.btn_cancel_load.clicked.connect(self.cancel_load)
+        self.statusBar().addPermanentWidget(self.btn_cancel_load)
+        self.profile_label = QLabel()
+        self.profile_label.setVisible(PROFILER.enabled)
+        self.statusBar().addPermanentWidget(self.profile_label)
+        self._profile_timer = QTimer(self) # 开启性能分析时定时刷新状态栏摘要
+        self._profile_timer.setInterval(500)
+        self._profile_timer.timeout.connect(self.update_profile_label)
+        if PROFILER.enabled: self._profile_timer.start()
 
 
     def create_app_bar(self):
@@ -634,6 +3200,34 @@ class MainWindow(QMainWindow):
         self.btn_save_all_png.setObjectName("AppBarButton")
         app_bar_layout.addWidget(self.btn_save_all_png)
 
+        self.export_format_combo = QComboBox()
+        self.export_format_combo.setToolTip("导出格式；“PDF 合集”把全部指标写入一个多页 PDF")
+        for backend in available_export_backends(): self.export_format_combo.addItem(backend.label, backend.key)
+        self.export_format_combo.addItem("PDF 合集", EXPORT_DOCUMENT)
+        app_bar_layout.addWidget(self.export_format_combo)
+
+        self.export_options_button = QToolButton()
+        self.export_options_button.setObjectName("ThemeToggleButton")
+        self.export_options_button.setText("⚙")
+        self.export_options_button.setToolTip("位图导出的 DPR、质量与 PNG 压缩选项")
+        self.export_options_button.setMenu(self.create_export_options_menu())
+        self.export_options_button.setPopupMode(QToolButton.ToolButtonPopupMode.InstantPopup)
+        app_bar_layout.addWidget(self.export_options_button)
+
+        self.profile_button = QToolButton()
+        self.profile_button.setObjectName("ThemeToggleButton")
+        self.profile_button.setText("⏱")
+        self.profile_button.setToolTip(f"性能分析 (也可用环境变量 {PROFILE_ENV}=1 开启)")
+        self.profile_button.setCheckable(True)
+        self.profile_button.setChecked(PROFILER.enabled)
+        self.profile_button.toggled.connect(self.on_profiling_toggled)
+        profile_menu = QMenu(self.profile_button)
+        profile_menu.addAction("导出跟踪文件...", self.dump_profile_trace)
+        profile_menu.addAction("重置统计", PROFILER.reset)
+        self.profile_button.setMenu(profile_menu)
+        self.profile_button.setPopupMode(QToolButton.ToolButtonPopupMode.MenuButtonPopup)
+        app_bar_layout.addWidget(self.profile_button)
+
         self.theme_toggle_button = QToolButton()
         self.theme_toggle_button.setObjectName("ThemeToggleButton") 
         self.update_theme_toggle_button_icon() 
@@ -642,6 +3236,34 @@ class MainWindow(QMainWindow):
 
         return app_bar
 
+    def create_export_options_menu(self):
+        # 位图 (PNG/WebP) 的 DPR、WebP 质量与 PNG 压缩选项；矢量格式与 DPR 无关
+        menu = QMenu(self)
+        self.export_dpr = ChartRenderer.EXPORT_DPR
+        self.export_quality = None
+        self.export_png_level = None
+        self.export_palette = False
+        self.export_strip_metadata = False
+        for title, values, attr in (("位图 DPR", EXPORT_DPR_CHOICES, "export_dpr"), ("WebP 质量", EXPORT_QUALITY_CHOICES, "export_quality"),
+                                    ("PNG 压缩级别", EXPORT_PNG_LEVEL_CHOICES, "export_png_level")):
+            submenu = menu.addMenu(title)
+            group = QActionGroup(submenu)
+            for label, value in values.items():
+                action = submenu.addAction(label)
+                action.setCheckable(True); action.setChecked(value == getattr(self, attr))
+                action.triggered.connect(lambda _checked=False, attr=attr, value=value: setattr(self, attr, value))
+                group.addAction(action)
+        menu.addSeparator()
+        for label, attr in (("PNG 调色板 (最多 256 色，文件更小，导出更慢)", "export_palette"), ("去除元数据", "export_strip_metadata")):
+            action = menu.addAction(label)
+            action.setCheckable(True); action.setChecked(getattr(self, attr))
+            action.toggled.connect(lambda checked, attr=attr: setattr(self, attr, checked))
+        return menu
+
+    def current_export_options(self, format=None):
+        return ExportOptions(format or self.export_format_combo.currentData(), self.export_dpr, self.export_quality,
+                             self.export_png_level, self.export_palette, self.export_strip_metadata)
+
     def update_theme_toggle_button_icon(self):
         if not hasattr(self, 'theme_toggle_button'): return
         if self.current_theme_name == "dark":
@@ -660,6 +3282,57 @@ class MainWindow(QMainWindow):
             self.switch_theme("dark")
         
 
+    def create_composite_panel(self):
+        # 选中综合评分时显示：每个指标一个权重滑块，以及归一化和缺失值处理方式
+        panel = QWidget()
+        panel.setObjectName("ControlPanel")
+        layout = QHBoxLayout(panel)
+        layout.setContentsMargins(15, 0, 15, 10)
+        layout.setSpacing(10)
+        self.composite_sliders_layout = QHBoxLayout()
+        layout.addLayout(self.composite_sliders_layout, 1)
+        layout.addWidget(QLabel("归一化:"))
+        self.normalization_combo = QComboBox()
+        for key, label in COMPOSITE_NORMALIZATIONS.items(): self.normalization_combo.addItem(label, key)
+        self.normalization_combo.currentIndexChanged.connect(self.on_composite_changed)
+        layout.addWidget(self.normalization_combo)
+        layout.addWidget(QLabel("缺失值:"))
+        self.missing_combo = QComboBox()
+        for key, label in COMPOSITE_MISSING.items(): self.missing_combo.addItem(label, key)
+        self.missing_combo.currentIndexChanged.connect(self.on_composite_changed)
+        layout.addWidget(self.missing_combo)
+        self.composite_sliders = {}
+        panel.setVisible(False)
+        return panel
+
+    def populate_composite_panel(self, metric_key):
+        config = CHART_CONFIG[metric_key]
+        while self.composite_sliders_layout.count():
+            item = self.composite_sliders_layout.takeAt(0)
+            if item.widget(): item.widget().deleteLater()
+        self.composite_sliders = {}
+        columns = self.dataset.columns if self.dataset is not None else ()
+        for key, other in CHART_CONFIG.items():
+            if is_composite(other) or other.get("csv_column") not in columns: continue
+            slider = QSlider(Qt.Orientation.Horizontal)
+            slider.setRange(0, 10)
+            slider.setValue(round(config["components"].get(key, 0)))
+            slider.setToolTip(f"{key} 权重")
+            slider.valueChanged.connect(self.on_composite_changed)
+            self.composite_sliders_layout.addWidget(QLabel(f"{other.get('base_title', key)}:"))
+            self.composite_sliders_layout.addWidget(slider, 1)
+            self.composite_sliders[key] = slider
+        for combo, value in ((self.normalization_combo, config.get("normalization", "minmax")), (self.missing_combo, config.get("missing", "skip"))):
+            combo.blockSignals(True); combo.setCurrentIndex(max(combo.findData(value), 0)); combo.blockSignals(False)
+
+    def on_composite_changed(self, *_):
+        # 权重只改变一次矩阵乘的向量，归一化矩阵由数据集缓存，拖动滑块即可实时重排
+        metric_key = self.metric_combo.currentText()
+        if metric_key not in CHART_CONFIG or not is_composite(CHART_CONFIG[metric_key]): return
+        CONFIG_STORE.updateMetric(metric_key, # 图表由 on_config_changed 重建
+                                  components={k: float(s.value()) for k, s in self.composite_sliders.items() if s.value() > 0},
+                                  normalization=self.normalization_combo.currentData(), missing=self.missing_combo.currentData())
+
     def create_control_panel(self):
         control_panel = QWidget()
         control_panel.setObjectName("ControlPanel")
@@ -686,6 +3359,22 @@ class MainWindow(QMainWindow):
         self.unit_input.setEnabled(False)
         self.unit_input.editingFinished.connect(self.on_unit_changed)
         control_layout.addWidget(self.unit_input, 1)
+
+        control_layout.addWidget(QLabel("范围:"))
+        self.range_mode_combo = QComboBox()
+        self.range_mode_combo.addItems(RankQuery.LABELS)
+        self.range_mode_combo.setEnabled(False)
+        self.range_mode_combo.currentIndexChanged.connect(self.on_range_mode_changed)
+        control_layout.addWidget(self.range_mode_combo, 1)
+        self.range_input = QLineEdit()
+        self.range_input.setEnabled(False)
+        self.range_input.editingFinished.connect(self.on_range_changed)
+        control_layout.addWidget(self.range_input, 1)
+
+        self.btn_filter = QPushButton("筛选...")
+        self.btn_filter.setEnabled(False)
+        self.btn_filter.clicked.connect(self.edit_filter)
+        control_layout.addWidget(self.btn_filter)
         
         control_layout.addWidget(QLabel("配色:"))
         self.scheme_combo = QComboBox()
@@ -704,215 +3393,47 @@ class MainWindow(QMainWindow):
         self.label_pos_checkbox.setEnabled(False)
         self.label_pos_checkbox.stateChanged.connect(self.on_label_pos_changed)
         control_layout.addWidget(self.label_pos_checkbox)
+
+        self.watch_checkbox = QCheckBox("监视文件变化")
+        self.watch_checkbox.setChecked(False)
+        self.watch_checkbox.setEnabled(False)
+        self.watch_checkbox.stateChanged.connect(self.on_watch_changed)
+        control_layout.addWidget(self.watch_checkbox)
         
         control_layout.addStretch(1) 
 
         return control_panel
 
     def on_label_pos_changed(self, state):
-        if self.chart_widget:
-            self.chart_widget.setValueLabelPosition(state == Qt.CheckState.Checked.value)
+        self.chart_updates.request(ChartUpdateScheduler.LABELS)
 
 
+    @PROFILER.measure("switch_theme")
     def switch_theme(self, theme_name):
+        # 样式表和图表颜色都是预编译的；暂停更新，使样式与图表颜色一起生效、只重绘一次
         if theme_name != self.current_theme_name:
+            t0 = time.perf_counter()
             self.current_theme_name = theme_name
-            self.apply_stylesheet(theme_name) 
-            
-            theme_colors = THEMES[self.current_theme_name]
-            if hasattr(self, 'chart_widget') and self.chart_widget:
-                self.chart_widget.set_theme_colors(
-                    theme_colors["text_primary"],
-                    theme_colors["text_secondary"],
-                    theme_colors["chart_empty_text"],
-                    theme_colors["chart_bar_background"] 
-                )
-            
-            if hasattr(self, 'theme_toggle_button') and self.theme_toggle_button:
-                self.update_theme_toggle_button_icon()
-
-            if hasattr(self, 'statusBar') and self.statusBar():
-                self.statusBar().setStyleSheet(f"""
-                    QStatusBar {{
-                        background-color: {theme_colors["widget_background"]};
-                        color: {theme_colors["text_secondary"]};
-                    }}
-                    QStatusBar::item {{
-                        border: none; 
-                    }}
-                """)
+            self.setUpdatesEnabled(False)
+            try:
+                self.apply_stylesheet(theme_name) # 状态栏样式 (#AppStatusBar) 已包含在内，不再单独设置
+                if hasattr(self, 'chart_widget') and self.chart_widget:
+                    self.chart_widget.set_theme_colors(*theme_assets(theme_name).chartColors())
+                if hasattr(self, 'theme_toggle_button') and self.theme_toggle_button:
+                    self.update_theme_toggle_button_icon()
+            finally:
+                self.setUpdatesEnabled(True)
+            self.last_theme_switch_ms = (time.perf_counter() - t0) * 1000.0
 
 
+    @PROFILER.measure("apply_stylesheet")
     def apply_stylesheet(self, theme_name):
-        theme = THEMES[theme_name]
-        common_stylesheet = f"""
-            QMainWindow {{
-                background-color: {theme["background"]};
-            }}
-            QWidget {{
-                color: {theme["text_primary"]};
-                font-family: "Source Han Sans CN", "Microsoft YaHei", sans-serif; 
-                font-size: 13px;
-            }}
-            QLabel {{
-                background-color: transparent; 
-            }}
-            QPushButton, QToolButton {{ 
-                background-color: {theme["accent"]};
-                color: {theme["button_text"]};
-                border: 1px solid {theme["accent"]};
-                padding: 8px 12px;
-                border-radius: 4px;
-                font-weight: bold;
-            }}
-            QPushButton:hover, QToolButton:hover {{
-                background-color: {QColor(theme["accent"]).lighter(115).name()};
-            }}
-            QPushButton:pressed, QToolButton:pressed {{
-                background-color: {QColor(theme["accent"]).darker(115).name()};
-            }}
-            QPushButton:disabled {{
-                background-color: {theme["widget_background"]};
-                color: {theme["disabled_text"]};
-                border-color: {theme["border"]};
-            }}
-            QComboBox {{
-                background-color: {theme["widget_background"]};
-                border: 1px solid {theme["border"]};
-                padding: 5px;
-                border-radius: 4px;
-                min-height: 20px; 
-            }}
-            QComboBox:disabled {{
-                background-color: {QColor(theme["widget_background"]).darker(105).name()};
-                color: {theme["disabled_text"]};
-            }}
-            QComboBox::drop-down {{
-                border: none;
-            }}
-            QComboBox::down-arrow {{
-                 image: url(none); 
-            }}
-            QComboBox QAbstractItemView {{ 
-                background-color: {theme["widget_background"]};
-                border: 1px solid {theme["border"]};
-                selection-background-color: {theme["accent"]};
-                selection-color: {theme["button_text"]};
-                color: {theme["text_primary"]}; 
-                outline: none; 
-            }}
-
-            QLineEdit {{
-                background-color: {theme["widget_background"]};
-                border: 1px solid {theme["border"]};
-                padding: 6px;
-                border-radius: 4px;
-            }}
-            QLineEdit:disabled {{
-                background-color: {QColor(theme["widget_background"]).darker(105).name()};
-                color: {theme["disabled_text"]};
-            }}
-            QCheckBox {{
-                spacing: 5px; 
-            }}
-            QCheckBox::indicator {{
-                width: 16px;
-                height: 16px;
-                border: 1px solid {theme["border"]};
-                border-radius: 3px;
-                background-color: {theme["widget_background"]};
-            }}
-            QCheckBox::indicator:checked {{
-                background-color: {theme["accent"]};
-                border-color: {theme["accent"]};
-            }}
-             QCheckBox::indicator:disabled {{
-                background-color: {QColor(theme["widget_background"]).darker(105).name()};
-                border-color: {QColor(theme["border"]).darker(105).name()};
-            }}
-            QScrollArea {{
-                border: none; 
-                 background-color: {theme["widget_background"]}; 
-            }}
-            #ChartScrollArea > QWidget {{ 
-                 background-color: {theme["widget_background"]};
-            }}
-             #ChartScrollArea > QWidget > QWidget {{ 
-                 background-color: {theme["widget_background"]};
-            }}
-            QScrollBar:vertical {{
-                border: none;
-                background: {theme["widget_background"]};
-                width: 10px;
-                margin: 0px 0px 0px 0px;
-            }}
-            QScrollBar::handle:vertical {{
-                background: {QColor(theme["border"]).lighter(120).name()};
-                min-height: 20px;
-                border-radius: 5px;
-            }}
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
-                border: none;
-                background: none;
-                height: 0px;
-                width: 0px;
-            }}
-             QScrollBar:horizontal {{
-                border: none;
-                background: {theme["widget_background"]};
-                height: 10px;
-                margin: 0px 0px 0px 0px;
-            }}
-            QScrollBar::handle:horizontal {{
-                background: {QColor(theme["border"]).lighter(120).name()};
-                min-width: 20px;
-                border-radius: 5px;
-            }}
-            QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {{
-                border: none;
-                background: none;
-                height: 0px;
-                width: 0px;
-            }}
-        """
-        
-        specific_stylesheet = f"""
-            #AppBar {{
-                background-color: {theme["header_background"]};
-            }}
-            #AppBarTitle {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {theme["text_primary"]};
-            }}
-            #AppBarButton {{ 
-                padding: 6px 10px; 
-                font-size: 13px;
-            }}
-            #ThemeToggleButton {{ 
-                padding: 6px 8px; 
-                font-size: 14px; 
-            }}
-            #ControlPanel {{
-                background-color: {theme["control_panel_background"]};
-                border-bottom: 1px solid {theme["border"]}; 
-            }}
-            #AppStatusBar {{
-                background-color: {theme["widget_background"]};
-                color: {theme["text_secondary"]};
-            }}
-            #AppStatusBar::item {{
-                border: none; 
-            }}
-        """
-        self.setStyleSheet(common_stylesheet + specific_stylesheet)
-        if hasattr(self, 'chart_widget') and self.chart_widget: 
-             self.chart_widget.update()
+        # 样式表已按主题预编译，这里只做一次 setStyleSheet (Stylesheets are precompiled per theme)
+        self.setStyleSheet(theme_assets(theme_name).stylesheet)
 
 
     def on_show_details_changed(self, state):
-        if self.chart_widget:
-            self.chart_widget.setShowSizeResolution(state == Qt.CheckState.Checked.value)
+        self.chart_updates.request(ChartUpdateScheduler.LAYOUT)
 
     def populate_metric_combo(self):
         current_metric = self.metric_combo.currentText()
@@ -924,73 +3445,139 @@ class MainWindow(QMainWindow):
         self.on_metric_selected(self.metric_combo.currentText()) # Trigger update for initial item
 
     def load_csv(self):
-        global CHART_CONFIG
         fn, _ = QFileDialog.getOpenFileName(self, "打开 CSV", "", "CSV Files (*.csv)")
         if not fn: return
-        
-        original_chart_config_keys = set(CHART_CONFIG.keys()); success = False
-        loaded_df = None 
-
-        for enc in ('utf-8', 'gbk', 'gb2312', 'utf-8-sig'):
-            try:
-                df_attempt = pd.read_csv(fn, encoding=enc, on_bad_lines='skip', dtype=str)
-                df_processed = df_attempt.rename(columns=lambda x: x.strip())
-                if '显示器型号' not in df_processed.columns:
-                    continue
-
-                current_chart_config_keys = set(CHART_CONFIG.keys()) 
-                for col_name in df_processed.columns:
-                    if col_name not in self.known_columns and col_name not in current_chart_config_keys:
-                        CHART_CONFIG[col_name] = {"csv_column": col_name, "unit": "", "lower_is_better": False,
-                                                  "bar_color": DEFAULT_NEW_METRIC_COLOR, "base_title": col_name}
-                
-                cols_to_clean = [cfg["csv_column"] for cfg in CHART_CONFIG.values()] + ["显示器尺寸", "刷新率"]
-                for col_name_to_clean in list(set(cols_to_clean)):
-                    if col_name_to_clean in df_processed.columns:
-                        df_processed[col_name_to_clean] = df_processed[col_name_to_clean].astype(str).str.replace(r'[^\d\.\-]', '', regex=True)
-                        df_processed[col_name_to_clean] = pd.to_numeric(df_processed[col_name_to_clean].replace('', pd.NA), errors='coerce')
-                
-                loaded_df = df_processed.copy() 
-                success = True; break 
-            except Exception as e: 
-                print(f"Error loading CSV with encoding {enc}: {e}")
-        
-        if success and loaded_df is not None:
-            self.data_frame = loaded_df.dropna(subset=['显示器型号'])
-            self.data_frame = self.data_frame[self.data_frame['显示器型号'].astype(str).str.strip() != '']
-            
-            if self.data_frame.empty: 
+        self.start_load(fn)
+
+    def start_load(self, fn):
+        # 在后台线程中分块加载；再次加载会取消上一次 (Load in the background; a new load cancels the previous one)
+        self._loading_path = fn
+        if not self._load_shown_partial: self._dataset_before_load = self.dataset # 连续加载时保留最初的数据集
+        self._load_shown_partial = False
+        self.load_progress_bar.setRange(0, 0); self.load_progress_bar.setVisible(True)
+        self.btn_cancel_load.setVisible(True)
+        self.statusBar().showMessage(f"正在加载 {fn} ...")
+        self.loader.start(fn, self.known_columns)
+
+    def cancel_load(self):
+        self.loader.cancel()
+        self.load_progress_bar.setVisible(False); self.btn_cancel_load.setVisible(False)
+        if self._load_shown_partial: # 图表显示的是新文件的一部分，恢复加载前的数据集和图表 (dataset_path 仍指向它)
+            self._load_shown_partial = False
+            previous, self._dataset_before_load = self._dataset_before_load, None
+            if previous is not None and not previous.empty:
+                self.show_dataset(previous, {}, True)
+            else:
+                self.dataset = previous
+                self.enable_controls(False)
+                self.chart_widget.setData(None, None)
+                self.populate_metric_combo()
+        self.enable_export_buttons(self.dataset is not None and not self.dataset.empty)
+        self.statusBar().showMessage("加载已取消。")
+
+    def on_load_progress(self, rows_read, estimated_rows):
+        self.load_progress_bar.setRange(0, estimated_rows)
+        self.load_progress_bar.setValue(rows_read)
+        self.statusBar().showMessage(f"正在加载... 已读取 {rows_read} 行")
+
+    def on_load_partial(self, dataset):
+        # 边加载边显示当前指标的天梯图 (Show the ladder while rows are still arriving)
+        if dataset.empty: return
+        first = not self._load_shown_partial
+        self._load_shown_partial = True
+        self.show_dataset(dataset, discover_metric_configs(dataset.columns, self.known_columns, dataset.sampleUnits()), first)
+        self.enable_export_buttons(False) # 加载完成前不允许导出
+
+    def on_load_finished(self, dataset, load_info, new_configs):
+        self.load_progress_bar.setVisible(False); self.btn_cancel_load.setVisible(False)
+        self.set_dataset_path(self._loading_path if dataset is not None else None)
+        if dataset is not None:
+            if dataset.empty: 
+                self.dataset = dataset
                 self.statusBar().showMessage(f"加载成功，但清理后数据为空或'显示器型号'无效。")
                 self.enable_controls(False)
                 self.chart_widget.setData(None, None)
-                CHART_CONFIG = {k:v for k,v in CHART_CONFIG.items() if k in original_chart_config_keys} 
                 self.populate_metric_combo() 
             else: 
-                self.statusBar().showMessage(f"加载 {len(self.data_frame)} 条有效记录 (使用编码 {enc if success else '未知'})")
-                self.enable_controls(True)
-                self.populate_metric_combo() 
-                self.on_scheme_change(self.scheme_combo.currentText(), force_update_new_metrics=True)
-                # self.chart_widget.setShowSizeResolution(self.show_details_checkbox.isChecked()) # Done in on_metric_selected via update_chart
-                # self.update_chart() # Done by populate_metric_combo -> on_metric_selected
+                self.show_dataset(dataset, new_configs, not self._load_shown_partial)
+                self.enable_export_buttons(True)
+                source = "读取缓存" if load_info.get("cache_hit") else f"使用编码 {load_info['encoding']}，编码检测 {load_info['detect_seconds'] * 1000:.1f} ms"
+                self.statusBar().showMessage(f"加载 {len(self.dataset)} 条有效记录 ({source}，"
+                                             f"加载 {load_info['load_seconds'] * 1000:.0f} ms，内存 {load_info['memory_bytes'] / 2**20:.1f} MiB)")
         else: 
-            if not success: self.statusBar().showMessage("加载失败，请检查文件编码或 CSV 格式。")
-            else: self.statusBar().showMessage("加载成功但未能正确处理数据。")
-            self.data_frame = None
+            self.statusBar().showMessage("加载失败，请检查文件编码或 CSV 格式。")
+            self.dataset = None
             self.enable_controls(False)
             self.chart_widget.setData(None, None)
-            CHART_CONFIG = {k:v for k,v in CHART_CONFIG.items() if k in original_chart_config_keys}
             self.populate_metric_combo()
         
+        self._load_shown_partial = False; self._dataset_before_load = None
+
         # Ensure these are set based on current state after loading or failing
-        self.chart_widget.setShowSizeResolution(self.show_details_checkbox.isChecked())
-        self.chart_widget.setValueLabelPosition(self.label_pos_checkbox.isChecked())
+        self.chart_updates.request(ChartUpdateScheduler.LABELS, ChartUpdateScheduler.LAYOUT)
+
+    def set_dataset_path(self, fn):
+        if self.file_watcher.files(): self.file_watcher.removePaths(self.file_watcher.files())
+        self.dataset_path = fn
+        if fn and self.watch_checkbox.isChecked(): self.file_watcher.addPath(fn)
+
+    def on_watch_changed(self, state):
+        self.set_dataset_path(self.dataset_path)
+
+    def on_watched_file_changed(self, path):
+        # 有的编辑器以替换文件的方式保存，监视会丢失，需要重新添加
+        if path not in self.file_watcher.files() and os.path.exists(path): self.file_watcher.addPath(path)
+        self._reload_timer.start()
+
+    def reload_watched_file(self):
+        """文件只在末尾追加时只解析新增行并做有序插入；其他修改回退为完整的后台重新加载。"""
+        if self.dataset is None or self.dataset.source is None or self.loader.isRunning() or not self.dataset_path: return
+        try:
+            result = read_appended_rows(self.dataset.source, int(self.dataset.frame.index.max()) + 1 if len(self.dataset) else 0)
+        except Exception as e:
+            print(f"Incremental reload failed: {e}"); result = None
+        if result is None:
+            self.statusBar().showMessage("文件已修改，正在重新加载...")
+            self.start_load(self.dataset_path); return
+
+        tail_frame, new_source = result
+        self.dataset.source = new_source
+        if tail_frame.empty: return
+        if list(tail_frame.columns) != list(self.dataset.columns):
+            self.start_load(self.dataset_path); return
+        tail = MonitorDataset(tail_frame, self.dataset.metric_columns)
+        tail.source = new_source
+        self.chart_updates.flush() # 有序插入以当前图表为基础 (Merging needs the chart to be current)
+        self.dataset = self.dataset.concat(tail)
+        if self.chart_widget.metric_key and self.chart_widget.config and self.rank_query.isAll() and self.dataset_filter.isEmpty() \
+                and not is_composite(self.chart_widget.config): # 排名窗口、筛选和综合评分依赖完整数据，重新计算
+            added = build_row_model(tail, self.chart_widget.config, tail.attributes)
+            if not self.chart_widget.mergeRows(added): self.chart_updates.request(ChartUpdateScheduler.DATA)
+        else:
+            self.chart_updates.request(ChartUpdateScheduler.DATA)
+        self.statusBar().showMessage(f"已追加 {len(tail)} 条记录，共 {len(self.dataset)} 条")
+
+    def show_dataset(self, dataset, new_configs, first):
+        # first 为 True 时重建指标列表并应用配色；否则只刷新当前图表
+        self.dataset = dataset
+        if first:
+            CONFIG_STORE.addMetrics(new_configs)
+            self.enable_controls(True)
+            self.populate_metric_combo() 
+            self.on_scheme_change(self.scheme_combo.currentText(), force_update_new_metrics=True)
+        else:
+            self.chart_updates.request(ChartUpdateScheduler.DATA)
 
 
     def enable_controls(self, enabled):
         self.sort_order_combo.setEnabled(enabled)
         self.unit_input.setEnabled(enabled)
+        self.range_mode_combo.setEnabled(enabled)
+        self.range_input.setEnabled(enabled and self.range_mode_combo.currentIndex() > 0)
+        self.btn_filter.setEnabled(enabled)
         self.show_details_checkbox.setEnabled(enabled)
         self.label_pos_checkbox.setEnabled(enabled) 
+        self.watch_checkbox.setEnabled(enabled)
         self.btn_save_current_png.setEnabled(enabled)
         self.btn_save_all_png.setEnabled(enabled)
         if not enabled:
@@ -1001,19 +3588,22 @@ class MainWindow(QMainWindow):
     def on_metric_selected(self, metric_key):
         # print(f"MainWindow.on_metric_selected: '{metric_key}'") # DEBUG
         is_metric_valid = bool(metric_key and metric_key in CHART_CONFIG)
-        self.sort_order_combo.setEnabled(is_metric_valid and self.data_frame is not None)
-        self.unit_input.setEnabled(is_metric_valid and self.data_frame is not None)
+        self.composite_panel.setVisible(False)
+        self.sort_order_combo.setEnabled(is_metric_valid and self.dataset is not None)
+        self.unit_input.setEnabled(is_metric_valid and self.dataset is not None)
 
         if not metric_key:
             self.unit_input.setText("")
-            self.update_chart(None) # Clear chart if metric becomes empty
+            self.chart_updates.request(ChartUpdateScheduler.DATA) # Clear chart if metric becomes empty
             return
 
         if not is_metric_valid:
-            self.update_chart(metric_key) # Attempt to update, will likely clear chart
+            self.chart_updates.request(ChartUpdateScheduler.DATA) # Attempt to update, will likely clear chart
             return
 
         config = CHART_CONFIG[metric_key]
+        self.composite_panel.setVisible(is_composite(config) and self.dataset is not None)
+        if is_composite(config) and self.dataset is not None: self.populate_composite_panel(metric_key)
         self.sort_order_combo.blockSignals(True)
         self.sort_order_combo.setCurrentIndex(1 if config.get("lower_is_better", False) else 0)
         self.sort_order_combo.blockSignals(False)
@@ -1022,30 +3612,87 @@ class MainWindow(QMainWindow):
         self.unit_input.setText(config.get("unit", ""))
         self.unit_input.blockSignals(False)
 
-        self.update_chart(metric_key) 
+        self.chart_updates.request(ChartUpdateScheduler.DATA)
 
     def on_sort_order_changed(self, index):
         metric_key_from_combo = self.metric_combo.currentText()
         # print(f"MainWindow.on_sort_order_changed for: '{metric_key_from_combo}'") # DEBUG
         if metric_key_from_combo and metric_key_from_combo in CHART_CONFIG:
-            new_lower_is_better = (index == 1)
-            if CHART_CONFIG[metric_key_from_combo].get("lower_is_better") != new_lower_is_better:
-                CHART_CONFIG[metric_key_from_combo]["lower_is_better"] = new_lower_is_better
-                self.update_chart(metric_key_from_combo)
+            CONFIG_STORE.updateMetric(metric_key_from_combo, lower_is_better=(index == 1)) # 图表由 on_config_changed 重建
 
 
     def on_unit_changed(self):
         metric_key = self.metric_combo.currentText()
         if metric_key and metric_key in CHART_CONFIG:
-            CHART_CONFIG[metric_key]["unit"] = self.unit_input.text()
-            self.update_chart(metric_key) 
+            CONFIG_STORE.updateMetric(metric_key, unit=self.unit_input.text()) # 只影响标签，on_config_changed 不重建数据和排序
+
+    def on_config_changed(self, old, new):
+        # CONFIG_STORE 的订阅回调：按变化的字段标记脏阶段，只有影响数值或排序的字段才重建行模型
+        metric_key = self.chart_widget.metric_key
+        if metric_key is None or metric_key not in new.metrics: return
+        before, after = old.metricConfig(metric_key), new.metricConfig(metric_key)
+        changed = {f for f in set(before or ()) | set(after) if before is None or before.get(f) != after.get(f)}
+        if changed == {"lower_is_better"}: stage = ChartUpdateScheduler.ORDERING
+        elif changed & set(CONFIG_DATA_FIELDS + ("resolved_components",)): stage = ChartUpdateScheduler.DATA
+        elif "bar_color" in changed or old.panel_colors != new.panel_colors: stage = ChartUpdateScheduler.COLOURS
+        else: stage = ChartUpdateScheduler.LABELS
+        self.chart_updates.request(stage)
+
+    def on_range_mode_changed(self, index):
+        self.range_input.setPlaceholderText(RankQuery.PLACEHOLDERS[index])
+        self.range_input.setEnabled(index > 0 and self.dataset is not None)
+        if index == 0 or self.range_input.text().strip(): self.on_range_changed()
+
+    def on_range_changed(self):
+        mode = RankQuery.MODES[self.range_mode_combo.currentIndex()]
+        try:
+            query = RankQuery.parse(mode, self.range_input.text())
+        except ValueError as e:
+            self.statusBar().showMessage(f"范围无效: {e}"); return
+        if query == self.rank_query: return
+        self.rank_query = query
+        self.chart_updates.request(ChartUpdateScheduler.DATA)
+        metric_key = self.chart_widget.metric_key
+        if query.mode == "around" and metric_key and self.dataset is not None:
+            found = find_model_rank(self.dataset, CHART_CONFIG[metric_key], query.model, self.dataset.attributes, self.current_mask())
+            if found is None: self.statusBar().showMessage(f"未找到型号: {query.model}")
+            else: self.statusBar().showMessage(f"{found[2]} 排名第 {found[0]} / {found[1]}")
+
+    def current_mask(self):
+        # 当前筛选条件在当前数据集上的行掩码；数据集被替换 (重新加载、追加) 时索引随之重建
+        if self.dataset is None or self.dataset.empty: return None
+        return self.dataset.filterIndex().mask(self.dataset_filter)
+
+    def edit_filter(self):
+        if self.dataset is None or self.dataset.empty: return
+        metric_columns = [(k, c["csv_column"]) for k, c in CHART_CONFIG.items() if c.get("csv_column") in self.dataset.metric_columns]
+        dialog = FilterDialog(self.dataset.filterIndex(), self.dataset_filter, metric_columns, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted: return
+        flt = dialog.datasetFilter()
+        if flt == self.dataset_filter: return
+        self.dataset_filter = flt
+        self.btn_filter.setText("筛选 ●" if not flt.isEmpty() else "筛选...")
+        self.btn_filter.setToolTip(flt.describe())
+        self.chart_updates.request(ChartUpdateScheduler.DATA)
+        if flt.isEmpty(): self.statusBar().showMessage("已清除筛选。")
+        else: self.statusBar().showMessage(f"筛选 ({flt.describe()}): {self.dataset.filterIndex().count(flt)} / {len(self.dataset)} 条")
+
+    def apply_chart_updates(self, stages):
+        # ChartUpdateScheduler 的回调：数据或排序变化时重建行模型 (同时涵盖其后的阶段)，否则只重跑脏的阶段
+        if stages & {ChartUpdateScheduler.DATA, ChartUpdateScheduler.ORDERING}:
+            self.update_chart(); return
+        if stages & {ChartUpdateScheduler.LABELS, ChartUpdateScheduler.COLOURS}:
+            self.chart_widget.applyConfig(CONFIG_STORE.snapshot())
+            self.chart_widget.setValueLabelPosition(self.label_pos_checkbox.isChecked())
+        if ChartUpdateScheduler.LAYOUT in stages:
+            self.chart_widget.setShowSizeResolution(self.show_details_checkbox.isChecked())
 
     def update_chart(self, metric_to_display=None): 
         # print(f"MainWindow.update_chart called for: {metric_to_display}") # DEBUG
-        if self.data_frame is not None and not self.data_frame.empty:
+        if self.dataset is not None and not self.dataset.empty:
             current_metric = metric_to_display if metric_to_display is not None else self.metric_combo.currentText()
             if current_metric in CHART_CONFIG:
-                self.chart_widget.setData(self.data_frame, current_metric)
+                self.chart_widget.setData(self.dataset, current_metric, self.dataset.attributes, self.rank_query, self.current_mask())
                 self.chart_widget.setValueLabelPosition(self.label_pos_checkbox.isChecked())
                 self.chart_widget.setShowSizeResolution(self.show_details_checkbox.isChecked()) # Ensure this is also updated
             else:
@@ -1054,98 +3701,276 @@ class MainWindow(QMainWindow):
             self.chart_widget.setData(None, None) 
 
     def save_png(self):
+        # 导出当前图表；格式按文件扩展名 (或所选的文件类型) 决定，默认取导出格式下拉框
+        self.chart_updates.flush() # 导出前让挂起的更新生效 (Apply pending updates before exporting)
         if not self.chart_widget.metric_key or self.chart_widget.data is None or not self.chart_widget.data:
             self.statusBar().showMessage("请先选择指标并加载有效数据。"); return
-        safe_metric_key = re.sub(r'[^\w\s-]', '', self.chart_widget.metric_key).strip().replace(' ', '_')
-        default_filename = f"{safe_metric_key or 'chart'}.png"
-        fn, _ = QFileDialog.getSaveFileName(self, "保存 PNG", default_filename, "PNG Files (*.png)")
-        if fn:
-            pix = self.chart_widget.getChartPixmap()
-            if pix.save(fn, "PNG"):
-                self.statusBar().showMessage(f"已保存 {fn}")
-            else: self.statusBar().showMessage("保存失败。")
+        backends = available_export_backends()
+        current = EXPORT_BACKENDS.get(self.export_format_combo.currentData(), EXPORT_BACKENDS["pdf"])
+        default_filename = f"{safe_filename(self.chart_widget.metric_key)}.{current.extension}"
+        fn, selected = QFileDialog.getSaveFileName(self, "导出当前图表", default_filename,
+                                                   ";;".join(b.fileFilter() for b in backends), current.fileFilter())
+        if not fn: return
+        ext = os.path.splitext(fn)[1].lower().lstrip(".")
+        backend = next((b for b in backends if b.extension == ext), None) or next((b for b in backends if b.fileFilter() == selected), current)
+        if not ext: fn += f".{backend.extension}"
+        options = self.current_export_options(backend.key)
+        try:
+            t0 = time.perf_counter()
+            self.chart_widget.exportFile(fn, options)
+            elapsed = time.perf_counter() - t0
+            self.statusBar().showMessage(f"已保存 {fn} ({options.describe()}，{os.path.getsize(fn) / 2**20:.2f} MiB，{elapsed * 1000:.0f} ms)")
+        except (OSError, ValueError) as e:
+            print(f"Error saving '{fn}': {e}")
+            self.statusBar().showMessage(f"保存失败: {e}")
 
     def save_all_png(self):
-        if self.data_frame is None or self.data_frame.empty:
+        # 按导出格式下拉框导出全部指标：每个指标一个文件，或 “PDF 合集” 的单个多页 PDF
+        self.chart_updates.flush()
+        if self.dataset is None or self.dataset.empty:
             self.statusBar().showMessage("请先加载数据。"); return
 
-        folder = QFileDialog.getExistingDirectory(self, "选择保存文件夹")
-        if not folder:
+        document = self.export_format_combo.currentData() == EXPORT_DOCUMENT
+        if document:
+            target, _ = QFileDialog.getSaveFileName(self, "导出 PDF 合集", "天梯图合集.pdf", EXPORT_BACKENDS["pdf"].fileFilter())
+        else:
+            target = QFileDialog.getExistingDirectory(self, "选择保存文件夹")
+        if not target:
             return
 
-        original_metric = self.metric_combo.currentText()
-        num_exported = 0
+        metric_keys = []
         for metric_key_to_export in CHART_CONFIG.keys(): # Iterate over all known config keys
             # Ensure this metric is valid and has data processable from the current dataframe
-            if metric_key_to_export not in CHART_CONFIG or CHART_CONFIG[metric_key_to_export].get("csv_column", "") not in self.data_frame.columns:
+            if not metric_available(CHART_CONFIG[metric_key_to_export], self.dataset.columns):
                 print(f"Skipping export for '{metric_key_to_export}': column not in DataFrame or config missing.")
                 continue
+            metric_keys.append(metric_key_to_export)
+
+        # 导出在线程池中离屏进行，可见图表和控件保持不变 (Export runs off-screen; the visible chart is untouched)
+        self.enable_export_buttons(False)
+        self.btn_load_csv.setEnabled(False)
+        self.export_progress = QProgressDialog("正在导出图表...", "取消", 0, len(metric_keys), self)
+        self.export_progress.setWindowTitle("导出全部")
+        self.export_progress.setMinimumDuration(0)
+        self.export_progress.setAutoClose(False); self.export_progress.setAutoReset(False)
+        self.export_progress.canceled.connect(self.exporter.cancel)
+        self.export_progress.show()
+        self._export_folder = target
+        template = self.chart_widget.exportRenderer()
+        if document:
+            self.exporter.startDocument(template, self.dataset, metric_keys, target, self.dataset.attributes, self.rank_query, self.current_mask(),
+                                        self.export_strip_metadata)
+        else:
+            self.exporter.start(template, self.dataset, metric_keys, target, self.dataset.attributes, self.rank_query, self.current_mask(),
+                                self.current_export_options())
+
+    def on_export_progress(self, done, total, metric_key):
+        if self.export_progress is not None:
+            self.export_progress.setValue(done)
+            self.export_progress.setLabelText(f"正在导出: {metric_key} ({done}/{total})")
+        self.statusBar().showMessage(f"正在导出: {metric_key} ({done}/{total})")
+
+    def on_export_finished(self, num_exported, failed, cancelled):
+        if self.export_progress is not None:
+            self.export_progress.close(); self.export_progress = None
+        for metric_key in failed: print(f"Failed to export '{metric_key}'")
+        self.btn_load_csv.setEnabled(True)
+        self.enable_export_buttons(self.dataset is not None and not self.dataset.empty and not self.loader.isRunning())
+        report = self.exporter.report()
+        summary = f"{report['format']}，{report['files']} 个文件，{report['bytes'] / 2**20:.2f} MiB，{report['seconds']:.1f} s"
+        if cancelled:
+            self.statusBar().showMessage(f"导出已取消，已导出 {num_exported} 个图表到 {self._export_folder} ({summary})")
+        elif failed:
+            self.statusBar().showMessage(f"已导出 {num_exported} 个图表到 {self._export_folder}，{len(failed)} 个失败 ({summary})")
+        else:
+            self.statusBar().showMessage(f"已成功导出 {num_exported} 个图表到 {self._export_folder} ({summary})")
 
-            # Temporarily set the application to this metric for rendering
-            self.metric_combo.blockSignals(True)
-            self.metric_combo.setCurrentText(metric_key_to_export)
-            # Manually update config for sort order and unit based on this metric for the chart_widget
-            config = CHART_CONFIG[metric_key_to_export]
-            self.sort_order_combo.setCurrentIndex(1 if config.get("lower_is_better", False) else 0)
-            self.unit_input.setText(config.get("unit", ""))
-            self.metric_combo.blockSignals(False)
-
-            self.chart_widget.setData(self.data_frame, metric_key_to_export) 
-            QApplication.processEvents() # Allow UI to update if needed for setData
-
-            if self.chart_widget.data and self.chart_widget.config: # Check if chart widget has data for this metric
-                safe_metric_key_filename = re.sub(r'[^\w\s-]', '', metric_key_to_export).strip().replace(' ', '_')
-                filename = f"{folder}/{safe_metric_key_filename or 'chart'}.png" # Removed num_exported from filename for clarity
-                pix = self.chart_widget.getChartPixmap()
-                if pix.save(filename, "PNG"):
-                    num_exported += 1
-                    self.statusBar().showMessage(f"正在导出: {metric_key_to_export} ({num_exported}/{len(CHART_CONFIG)})")
-                    QApplication.processEvents() 
-                else:
-                    print(f"Failed to save {filename}")
-            else:
-                print(f"Skipping PNG export for {metric_key_to_export} due to no displayable data in chart widget.")
-        
-        # Restore original metric in UI
-        self.metric_combo.blockSignals(True)
-        self.metric_combo.setCurrentText(original_metric)
-        if original_metric in CHART_CONFIG: # Restore sort and unit for the original metric
-            config = CHART_CONFIG[original_metric]
-            self.sort_order_combo.setCurrentIndex(1 if config.get("lower_is_better", False) else 0)
-            self.unit_input.setText(config.get("unit", ""))
-        self.metric_combo.blockSignals(False)
-        self.update_chart(original_metric) # Refresh chart to original state
+    def enable_export_buttons(self, enabled):
+        self.btn_save_current_png.setEnabled(enabled)
+        self.btn_save_all_png.setEnabled(enabled)
 
-        self.statusBar().showMessage(f"已成功导出 {num_exported} 个图表到 {folder}")
+    def closeEvent(self, event):
+        self.loader.cancel()
+        self.exporter.cancel()
+        self.loader.waitForDone()
+        self.exporter.waitForDone()
+        CONFIG_STORE.unsubscribe(self.on_config_changed)
+        if PROFILE_TRACE_PATH: PROFILER.dumpTrace(PROFILE_TRACE_PATH)
+        super().closeEvent(event)
+
+    def on_profiling_toggled(self, enabled):
+        PROFILER.setEnabled(enabled)
+        self.profile_label.setVisible(enabled)
+        if enabled:
+            self._profile_timer.start(); self.update_profile_label()
+        else:
+            self._profile_timer.stop()
+
+    def update_profile_label(self):
+        summary = PROFILER.summary()
+        tiles = self.chart_widget.tileCacheStats()
+        counters = summary["counters"]
+        cache_lookups = counters.get("dataset_cache_hit", 0) + counters.get("dataset_cache_miss", 0)
+        parts = [PROFILER.summaryText(), f"已绘制 {counters.get('rows_painted', 0)} 行",
+                 f"图块命中 {tiles['screen']['hit_rate']:.0%}"]
+        if cache_lookups: parts.append(f"数据缓存命中 {counters.get('dataset_cache_hit', 0)}/{cache_lookups}")
+        self.profile_label.setText(" · ".join(parts))
+
+    def dump_profile_trace(self):
+        fn, _ = QFileDialog.getSaveFileName(self, "导出跟踪文件", "monitorranker_trace.json", "Trace Files (*.json)")
+        if not fn: return
+        try:
+            n = PROFILER.dumpTrace(fn)
+        except OSError as e:
+            self.statusBar().showMessage(f"导出跟踪文件失败: {e}"); return
+        self.statusBar().showMessage(f"已写出 {n} 个事件到 {fn} (可用 chrome://tracing 或 Perfetto 打开)")
 
 
     def on_scheme_change(self, name, force_update_new_metrics=False):
-        global PANEL_COLORS, CHART_CONFIG
-        scheme = COLOR_SCHEMES.get(name, COLOR_SCHEMES["默认"])
-        
-        for k_metric, config_metric in CHART_CONFIG.items():
-            if "bar_colors" in scheme and k_metric in scheme["bar_colors"]:
-                config_metric["bar_color"] = scheme["bar_colors"][k_metric]
-            elif k_metric not in COLOR_SCHEMES["默认"]["bar_colors"]: 
-                if "bar_color" not in config_metric or force_update_new_metrics: 
-                     config_metric["bar_color"] = DEFAULT_NEW_METRIC_COLOR
-        
-        if "panel_colors" in scheme:
-            current_scheme_panel_colors = scheme["panel_colors"]
-            updated_panel_colors = copy.deepcopy(DEFAULT_PANEL_COLORS)
-            updated_panel_colors.update(current_scheme_panel_colors)
-            PANEL_COLORS = updated_panel_colors
-        else: 
-            PANEL_COLORS = copy.deepcopy(DEFAULT_PANEL_COLORS)
-
-        if self.chart_widget:
-            current_chart_metric = self.chart_widget.metric_key # Use chart's current metric
-            if current_chart_metric and current_chart_metric in CHART_CONFIG:
-                 self.chart_widget.config = copy.deepcopy(CHART_CONFIG[current_chart_metric]) # Update with deepcopy
-            self.chart_widget.update()
+        apply_color_scheme(name, force_update_new_metrics) # 当前图表由 on_config_changed 换用新快照重绘
+
+
+def run_headless(argv):
+    """命令行离屏导出，不构建 MainWindow (Headless CLI export on the offscreen Qt platform).
+
+    用法: python MonitorRanker.py --headless data.csv -o out/ [--metrics ...] [--scheme 默认] [--theme dark] [--dpr 1.8] [--width 1920]
+                                 [--format png svg pdf webp] [--quality 90] [--document 合集.pdf]
+                                 [--png-level 0-9] [--palette] [--strip-metadata]
+    """
+    import argparse
+    ap = argparse.ArgumentParser(prog="MonitorRanker.py --headless", description="离屏批量导出天梯图 (PNG、SVG、PDF、WebP)")
+    ap.add_argument("csv")
+    ap.add_argument("-o", "--output-dir", required=True)
+    ap.add_argument("--metrics", nargs="+", help="要导出的指标，缺省为 CSV 中存在的全部指标")
+    ap.add_argument("--scheme", default="默认", choices=list(COLOR_SCHEMES))
+    ap.add_argument("--theme", default="dark", choices=list(THEMES))
+    ap.add_argument("--dpr", type=float, default=ChartRenderer.EXPORT_DPR, help="位图格式的设备像素比")
+    ap.add_argument("--width", type=int, default=ChartRenderer.EXPORT_TARGET_WIDTH, help="排版的逻辑宽度 (界面中导出时为图表区的宽度)")
+    ap.add_argument("--format", nargs="+", default=["png"], choices=list(EXPORT_BACKENDS), help="导出格式，可多选；每种格式分别报告文件大小与耗时")
+    ap.add_argument("--quality", type=int, help="位图编码质量 0-100 (WebP 缺省为 100，即无损)")
+    ap.add_argument("--document", metavar="PDF", help="另外把全部指标写入一个多页 PDF (相对路径位于输出目录中)")
+    ap.add_argument("--png-level", type=int, choices=range(10), metavar="0-9", help="PNG 的 zlib 压缩级别，缺省为 6")
+    ap.add_argument("--palette", action="store_true", help="PNG 量化为最多 256 色的索引图像 (文件更小，编码约慢一倍)")
+    ap.add_argument("--strip-metadata", action="store_true", help="不写入标题、生成软件和 DPI 等元数据")
+    ap.add_argument("--label-inside", action="store_true", help="数值标签显示在条形内部")
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--no-cache", action="store_true", help="不读写数据集缓存")
+    scope = ap.add_mutually_exclusive_group()
+    scope.add_argument("--top", metavar="K", help="只导出前 K 名")
+    scope.add_argument("--bottom", metavar="K", help="只导出后 K 名")
+    scope.add_argument("--ranks", metavar="START-END", help="只导出名次区间，例如 40-60")
+    scope.add_argument("--around", metavar="MODEL", help="只导出某型号附近的名次")
+    ap.add_argument("--radius", type=int, default=RankQuery.DEFAULT_RADIUS, help="--around 的名次半径")
+    ap.add_argument("--panel", nargs="+", default=(), help="只保留这些面板类型，例如 IPS FastIPS")
+    ap.add_argument("--resolution", nargs="+", default=(), help="只保留这些分辨率，例如 4K 2.5K")
+    ap.add_argument("--size", metavar="RANGE", help="尺寸范围 (英寸)，例如 27-32")
+    ap.add_argument("--refresh", metavar="RANGE", help="刷新率范围 (Hz)，例如 144-")
+    ap.add_argument("--where", metavar="METRIC=RANGE", action="append", default=[], help="指标范围，可重复，例如 sRGB色准=-1.5")
+    ap.add_argument("--weights", metavar="METRIC=W", nargs="+", help="综合评分的组成指标与权重，例如 sRGB色准=2 P3色域覆盖率=1")
+    ap.add_argument("--normalization", choices=list(COMPOSITE_NORMALIZATIONS), help="综合评分的归一化方式")
+    ap.add_argument("--missing", choices=list(COMPOSITE_MISSING), help="综合评分的缺失值处理")
+    args = ap.parse_args(argv)
+    try:
+        query = RankQuery()
+        for mode in ("top", "bottom", "ranks"):
+            if getattr(args, mode): query = RankQuery.parse(mode, getattr(args, mode))
+        if args.around: query = RankQuery("around", model=args.around, radius=args.radius)
+        size, refresh = parse_range(args.size), parse_range(args.refresh)
+        metric_ranges = {}
+        for clause in args.where:
+            metric, sep, bounds = clause.partition("=")
+            if not sep or not parse_range(bounds): raise ValueError(f"--where 应为 指标=范围: {clause}")
+            metric_ranges[metric.strip()] = parse_range(bounds)
+        weights = {}
+        for clause in args.weights or ():
+            metric, sep, weight = clause.partition("=")
+            if not sep: raise ValueError(f"--weights 应为 指标=权重: {clause}")
+            weights[metric.strip()] = float(weight)
+        formats = [ExportOptions(f, args.dpr, args.quality, args.png_level, args.palette, args.strip_metadata) for f in dict.fromkeys(args.format)]
+    except ValueError as e:
+        ap.error(str(e))
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtGui import QGuiApplication
+    app = QGuiApplication([sys.argv[0]]) # 字体和 QImage 绘制只需要 QGuiApplication
+
+    cache = None if args.no_cache else DatasetCache()
+    dataset, load_info, new_configs = load_dataset(args.csv, cache=cache)
+    if dataset is None or dataset.empty:
+        print(f"Failed to load usable data from {args.csv}", file=sys.stderr); return 1
+    if cache is not None and not load_info["cache_hit"]:
+        try:
+            cache.store(args.csv, dataset, load_info)
+        except Exception as e:
+            print(f"Failed to write dataset cache: {e}", file=sys.stderr)
+    CONFIG_STORE.addMetrics(new_configs)
+    apply_color_scheme(args.scheme, force_update_new_metrics=True)
+    source = "cache" if load_info["cache_hit"] else f"encoding {load_info['encoding']}, detected in {load_info['detect_seconds'] * 1000:.1f} ms"
+    print(f"Loaded {len(dataset)} rows from {args.csv} ({source}, {load_info['load_seconds'] * 1000:.0f} ms)")
+
+    composite = {}
+    if weights:
+        unknown = [k for k in weights if k not in CHART_CONFIG or is_composite(CHART_CONFIG[k])]
+        if unknown:
+            print(f"Unknown metrics in --weights: {', '.join(unknown)}", file=sys.stderr); return 2
+        composite["components"] = weights
+    if args.normalization: composite["normalization"] = args.normalization
+    if args.missing: composite["missing"] = args.missing
+    if composite: CONFIG_STORE.updateMetric("综合评分", **composite)
+
+    metric_keys = args.metrics or list(CHART_CONFIG.keys())
+    unknown = [k for k in metric_keys if k not in CHART_CONFIG]
+    if unknown:
+        print(f"Unknown metrics: {', '.join(unknown)}", file=sys.stderr); return 2
+    metric_keys = [k for k in metric_keys if metric_available(CHART_CONFIG[k], dataset.columns)]
+    unknown = [k for k in metric_ranges if k not in CHART_CONFIG or is_composite(CHART_CONFIG[k])]
+    if unknown:
+        print(f"Unknown metrics in --where: {', '.join(unknown)}", file=sys.stderr); return 2
+    flt = DatasetFilter(args.panel, args.resolution, size, refresh,
+                        {CHART_CONFIG[k]["csv_column"]: b for k, b in metric_ranges.items()})
+    mask = dataset.filterIndex().mask(flt)
+    if mask is not None: print(f"Filter ({flt.describe()}) keeps {int(mask.sum())} of {len(dataset)} rows")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    template = ChartRenderer()
+    template.setTheme(args.theme)
+    template.value_label_inside = args.label_inside
+    template.export_dpr = args.dpr
+    template.export_width = args.width
+    exporter = BatchExporter(max_threads=args.threads)
+    result = {}
+    exporter.progress.connect(lambda done, total, key: print(f"[{done}/{total}] {key}"))
+    exporter.finished.connect(lambda n, failed, cancelled: (result.update(exported=n, failed=failed), app.quit()))
+    failed = []
+    def report(target):
+        r = exporter.report()
+        failed.extend(result.get("failed", []))
+        print(f"Exported {result.get('exported', 0)} charts to {target}: {r['format']}, {r['files']} files, "
+              f"{r['bytes'] / 2**20:.2f} MiB, {r['seconds']:.2f} s wall, {r['job_seconds']:.2f} s in jobs")
+    for options in formats:
+        if not options.backend().available():
+            print(f"{options.backend().label} export is not available in this Qt build", file=sys.stderr); failed.append(options.format); continue
+        result.clear()
+        if exporter.start(template.exportCopy(), dataset, metric_keys, args.output_dir, dataset.attributes, query, mask, options):
+            app.exec()
+        report(args.output_dir)
+    if args.document:
+        result.clear()
+        document = os.path.join(args.output_dir, args.document)
+        if exporter.startDocument(template.exportCopy(), dataset, metric_keys, document, dataset.attributes, query, mask, args.strip_metadata):
+            app.exec()
+        report(document)
+    if PROFILER.enabled:
+        for name, t in PROFILER.summary()["timings"].items():
+            print(f"  {name}: {t['count']} calls, avg {t['avg_ms']:.1f} ms, p95 {t['p95_ms']:.1f} ms")
+        if PROFILE_TRACE_PATH: print(f"Wrote {PROFILER.dumpTrace(PROFILE_TRACE_PATH)} trace events to {PROFILE_TRACE_PATH}")
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
+    if "--headless" in sys.argv[1:]:
+        sys.exit(run_headless([a for a in sys.argv[1:] if a != "--headless"]))
+
     app = QApplication(sys.argv)
     app.setApplicationName("MonitorRankingApp")
     app.setOrganizationName("MyCompany") 
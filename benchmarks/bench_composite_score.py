@@ -0,0 +1,52 @@
+"""综合评分的首次计算与调整权重后的重排耗时 (Composite score: first ranking vs. re-ranking after a weight change).
+
+用法: python benchmarks/bench_composite_score.py [--rows 10000 100000] [--repeat 5]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+from synthetic import make_raw_frame
+from MonitorRanker import (CHART_CONFIG, COMPOSITE_NORMALIZATIONS, MonitorDataset, build_row_model,
+                           composite_scores, resolve_metric_config)
+
+
+def best_of(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"{'rows':>8} {'normalization':>14} {'first (ms)':>11} {'re-rank (ms)':>13}  matches frame path")
+    for n in args.rows:
+        frame = make_raw_frame(n)
+        metric_columns = [c for c in frame.columns if c not in ("显示器型号", "面板类型", "显示器尺寸", "刷新率", "分辨率")]
+        for method in COMPOSITE_NORMALIZATIONS:
+            base = {**CHART_CONFIG["综合评分"], "normalization": method}
+            config = resolve_metric_config(base)
+            dataset = MonitorDataset(frame.copy(), metric_columns, lazy=False)
+            t0 = time.perf_counter(); build_row_model(dataset, config, dataset.attributes); t_first = time.perf_counter() - t0
+            weights = iter(np.random.default_rng(0).random((args.repeat, len(base["components"]))) * 10)
+
+            def rerank():
+                # 配置只读：和界面一样用新权重生成新配置再解析 (Configs are read-only; build a new one like the GUI does)
+                nonlocal config
+                config = resolve_metric_config({**base, "components": dict(zip(base["components"], map(float, next(weights))))})
+                build_row_model(dataset, config, dataset.attributes)
+            t_rerank = best_of(rerank, args.repeat)
+            same = np.allclose(composite_scores(dataset, config), composite_scores(dataset.frame.assign(
+                **{c: dataset[c] for c in metric_columns}), config), equal_nan=True)
+            print(f"{n:>8} {method:>14} {t_first * 1000:>11.2f} {t_rerank * 1000:>13.2f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""对比直接读取 CSV 与命中数据集缓存的加载耗时 (Cold CSV load vs. DatasetCache hit).
+
+用法: python benchmarks/bench_dataset_cache.py [--rows 100000] [--extra-columns 10] [--repeat 3]
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from synthetic import write_csv
+from MonitorRanker import CHART_CONFIG, DatasetCache, build_row_model, load_dataset
+
+
+def best_of(fn, repeat):
+    best, result = math.inf, None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); result = fn(); best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--extra-columns", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--metric", default="sRGB色准")
+    args = ap.parse_args()
+
+    config = CHART_CONFIG[args.metric]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_csv(os.path.join(tmp, "synthetic.csv"), args.rows, extra_columns=args.extra_columns)
+        cache = DatasetCache(os.path.join(tmp, "cache"))
+        t_cold, (dataset, info, _) = best_of(lambda: load_dataset(path), args.repeat)
+        dataset.materialize([args.metric]) # 和界面一样，写缓存前只解析了当前显示的指标
+        t0 = time.perf_counter(); cache.store(path, dataset, info); t_store = time.perf_counter() - t0
+        t_warm, (cached, warm_info, _) = best_of(lambda: load_dataset(path, cache=cache), args.repeat)
+        assert warm_info["cache_hit"]
+        identical = list(build_row_model(dataset, config, dataset.attributes)) == list(build_row_model(cached, config, cached.attributes))
+        print(f"rows={args.rows} file={os.path.getsize(path) / 2**20:.1f} MiB cache={cache.stats()['bytes'] / 2**20:.1f} MiB")
+        print(f"{'csv (s)':>9} {'store (s)':>10} {'cache hit (s)':>14} {'speedup':>9}  identical")
+        print(f"{t_cold:>9.4f} {t_store:>10.4f} {t_warm:>14.4f} {t_cold / t_warm:>8.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""各导出格式的文件大小与耗时 (File size and export time per export backend, offscreen).
+
+对每个行数，用同一个导出渲染器分别写出 PNG、SVG、PDF 和 WebP (当前 Qt 构建支持的格式)，
+位图格式按 --dpr 渲染；另外计时一次包含全部指标的多页 PDF 合集。
+
+用法: python benchmarks/bench_export_formats.py [--rows 100 1000 5000] [--dpr 1.8] [--quality 90] [--repeat 3]
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QGuiApplication
+
+from synthetic import make_raw_frame
+from MonitorRanker import (CHART_CONFIG, EXPORT_BACKENDS, KNOWN_COLUMNS, ChartRenderer, ExportOptions, MonitorDataset,
+                           available_export_backends, metric_available)
+
+
+def best_of(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def document_renderers(renderer, dataset, metric_keys):
+    for key in metric_keys:
+        renderer.setData(dataset, key, dataset.attributes)
+        if renderer.data: yield renderer
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    ap.add_argument("--dpr", type=float, default=ChartRenderer.EXPORT_DPR)
+    ap.add_argument("--quality", type=int, default=None, help="WebP 质量，缺省为无损")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--metric", default="sRGB色准")
+    args = ap.parse_args()
+
+    app = QGuiApplication([sys.argv[0]])
+    backends = available_export_backends()
+    print(f"dpr={args.dpr} quality={args.quality} formats={', '.join(b.label for b in backends)}")
+    print(f"{'rows':>6} {'format':>10} {'size (MiB)':>11} {'time (ms)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            frame = make_raw_frame(rows)
+            dataset = MonitorDataset(frame, [c for c in frame.columns if c not in KNOWN_COLUMNS], lazy=False)
+            renderer = ChartRenderer().exportCopy()
+            renderer.export_dpr = args.dpr
+            renderer.setData(dataset, args.metric, dataset.attributes)
+            for backend in backends:
+                options = ExportOptions(backend.key, args.dpr, args.quality)
+                path = os.path.join(tmp, f"chart.{backend.extension}")
+                try:
+                    t = best_of(lambda: backend.write(renderer, path, options), args.repeat)
+                except ValueError as e: # 例如超过 WebP 的尺寸上限
+                    print(f"{rows:>6} {backend.label:>10} {'skip':>11} {'':>10}  {e}"); continue
+                print(f"{rows:>6} {backend.label:>10} {os.path.getsize(path) / 2**20:>11.2f} {t * 1000:>10.1f}")
+
+            metric_keys = [k for k, c in CHART_CONFIG.items() if metric_available(c, dataset.columns)]
+            path = os.path.join(tmp, "document.pdf")
+            pdf = EXPORT_BACKENDS["pdf"]
+            t = best_of(lambda: pdf.writeDocument(document_renderers(renderer, dataset, metric_keys), path), args.repeat)
+            print(f"{rows:>6} {f'PDF x{len(metric_keys)}':>10} {os.path.getsize(path) / 2**20:>11.2f} {t * 1000:>10.1f}")
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""对比立即清洗与按需解析的加载耗时和内存 (Eager vs. lazy metric parsing in load_dataset).
+
+用法: python benchmarks/bench_lazy_loading.py [--rows 100000] [--extra-columns 40] [--repeat 3]
+"""
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from synthetic import write_csv
+from MonitorRanker import CHART_CONFIG, build_row_model, load_dataset
+
+
+def best_of(fn, repeat):
+    best, result = math.inf, None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); result = fn(); best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--extra-columns", type=int, default=40)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--metric", default="sRGB色准")
+    args = ap.parse_args()
+
+    config = CHART_CONFIG[args.metric]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_csv(os.path.join(tmp, "synthetic.csv"), args.rows, extra_columns=args.extra_columns)
+        print(f"rows={args.rows} metric columns={6 + args.extra_columns} file={os.path.getsize(path) / 2**20:.1f} MiB")
+        print(f"{'mode':>6} {'load (s)':>10} {'first chart (s)':>16} {'memory (MiB)':>13}")
+        for lazy in (False, True):
+            t_load, (dataset, info, _) = best_of(lambda: load_dataset(path, lazy=lazy), args.repeat)
+            t0 = time.perf_counter(); build_row_model(dataset, config, dataset.attributes); t_chart = time.perf_counter() - t0
+            print(f"{'lazy' if lazy else 'eager':>6} {t_load:>10.4f} {t_chart:>16.4f} {dataset.memoryBytes() / 2**20:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
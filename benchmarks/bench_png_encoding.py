@@ -0,0 +1,81 @@
+"""PNG 压缩级别与调色板量化的大小/耗时权衡 (PNG size/time tradeoff: zlib level × palette quantization).
+
+数据集为仓库自带的 test.csv 和一个大型合成数据集。每种设置都走 ChartRenderer.exportPng (逐段渲染并编码)；
+"render only" 行只渲染条带不编码，两者之差约为编码耗时。"QImage.save" 行为原先整图渲染后
+pix.save(fn, "PNG") 的路径，整图估计超过 --max-image-mib 时跳过。
+
+用法: python benchmarks/bench_png_encoding.py [--rows 20000] [--dpr 1.8] [--levels 1 6 9] [--repeat 3]
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QGuiApplication
+
+from synthetic import make_raw_frame
+from MonitorRanker import KNOWN_COLUMNS, ChartRenderer, MonitorDataset, load_dataset
+
+TEST_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test.csv")
+
+
+def best_of(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def render_only(renderer, dpr):
+    for _ in renderer.renderBands(dpr): pass
+
+
+def bench_dataset(name, dataset, args, tmp):
+    renderer = ChartRenderer().exportCopy()
+    renderer.setData(dataset, args.metric, dataset.attributes)
+    width_px, height_px = renderer.exportSize(args.dpr)
+    print(f"\n{name}: {len(dataset)} rows, {width_px}x{height_px} px")
+    print(f"{'setting':>22} {'size (MiB)':>11} {'time (ms)':>10} {'encode (ms)':>12}")
+    t_render = best_of(lambda: render_only(renderer, args.dpr), args.repeat)
+    print(f"{'render only':>22} {'':>11} {t_render * 1000:>10.1f} {'':>12}")
+
+    path = os.path.join(tmp, "chart.png")
+    for palette in (False, True):
+        for level in args.levels:
+            t = best_of(lambda: renderer.exportPng(path, args.dpr, level=level, palette=palette), args.repeat)
+            label = f"level {level}" + (" + palette" if palette else "")
+            print(f"{label:>22} {os.path.getsize(path) / 2**20:>11.3f} {t * 1000:>10.1f} {(t - t_render) * 1000:>12.1f}")
+    t = best_of(lambda: renderer.exportPng(path, args.dpr, palette=True, metadata=False), args.repeat)
+    print(f"{'palette, no metadata':>22} {os.path.getsize(path) / 2**20:>11.3f} {t * 1000:>10.1f} {(t - t_render) * 1000:>12.1f}")
+
+    if width_px * height_px * 4 > args.max_image_mib * 2**20:
+        print(f"{'QImage.save':>22} {'skip':>11}"); return
+    t = best_of(lambda: renderer.renderImage(args.dpr).save(path, "PNG"), args.repeat)
+    print(f"{'QImage.save':>22} {os.path.getsize(path) / 2**20:>11.3f} {t * 1000:>10.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=20000, help="合成数据集的行数")
+    ap.add_argument("--dpr", type=float, default=ChartRenderer.EXPORT_DPR)
+    ap.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--metric", default="sRGB色准")
+    ap.add_argument("--max-image-mib", type=float, default=1024)
+    args = ap.parse_args()
+
+    app = QGuiApplication([sys.argv[0]])
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset, _, _ = load_dataset(TEST_CSV)
+        bench_dataset("test.csv", dataset, args, tmp)
+        frame = make_raw_frame(args.rows)
+        bench_dataset("synthetic", MonitorDataset(frame, [c for c in frame.columns if c not in KNOWN_COLUMNS], lazy=False), args, tmp)
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
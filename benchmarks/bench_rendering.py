@@ -0,0 +1,156 @@
+"""ChartWidget 绘制与导出路径的基准测试，结果写入 JSON 便于跨提交比较 (Paint/export benchmarks on the offscreen Qt platform).
+
+对每种合成数据集 (行数 × 是否带脚注 × 是否显示尺寸和分辨率) 计时:
+  setData、整屏重绘 (图块缓存冷/热)、滚动一步大小的局部重绘，以及不同 DPR 下的一次 getChartPixmap 导出
+  和一次流式 exportPng 导出 (写入临时文件)。
+整图导出估计超过 --max-export-mib 时记为 null 并注明跳过；流式导出只占用一段的内存，不跳过。
+
+用法: python benchmarks/bench_rendering.py [--rows 100 1000 10000 50000] [--dprs 1.0 1.8 2.0] [--repeat 3]
+                                          [-o bench_rendering.json] [--compare 之前的结果.json]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QPoint, QRect, QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtGui import QImage, QRegion
+from PyQt6.QtWidgets import QApplication
+
+from synthetic import make_raw_frame
+from MonitorRanker import KNOWN_COLUMNS, ChartRenderer, ChartWidget, MonitorDataset
+
+VIEWPORT = (1400, 800)  # 与主窗口默认大小下的图表可视区域相当
+SCROLL_STEP = 120  # 一次滚轮步进的像素高度
+
+
+def best_of(fn, repeat, setup=None):
+    best = math.inf
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def paint_region(widget, image, rect):
+    # widget.render 以 rect 为 event.rect() 调用 paintEvent，与滚动时的局部重绘路径相同
+    widget.render(image, QPoint(0, 0), QRegion(rect))
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def bench_case(rows, footnotes, show_details, dprs, repeat, max_export_bytes, metric):
+    frame = make_raw_frame(rows, footnotes=footnotes)
+    dataset = MonitorDataset(frame, [c for c in frame.columns if c not in KNOWN_COLUMNS], lazy=False)
+    widget = ChartWidget()
+    widget.resize(*VIEWPORT)
+    widget.setShowSizeResolution(show_details)
+
+    t_set = best_of(lambda: widget.setData(dataset, metric, dataset.attributes), repeat)
+    widget.resize(VIEWPORT[0], max(widget.minimumHeight(), VIEWPORT[1]))
+    image = QImage(VIEWPORT[0], VIEWPORT[1], QImage.Format.Format_ARGB32_Premultiplied)
+    middle = max(0, widget.height() // 2 - VIEWPORT[1] // 2) # 从中段取可视区域，避开标题
+    screen = QRect(0, middle, *VIEWPORT)
+    strip = QRect(0, middle + VIEWPORT[1] - SCROLL_STEP, VIEWPORT[0], SCROLL_STEP)
+
+    t_cold = best_of(lambda: paint_region(widget, image, screen), repeat, setup=widget.invalidateTiles)
+    paint_region(widget, image, screen)
+    t_warm = best_of(lambda: paint_region(widget, image, screen), repeat)
+    t_scroll = best_of(lambda: paint_region(widget, image, strip), repeat, setup=widget.invalidateTiles)
+
+    exports = {}
+    for dpr in dprs:
+        widget.renderer.export_dpr = dpr
+        r = widget.exportRenderer()
+        est = r.contentHeight() * dpr * r.EXPORT_TARGET_WIDTH * dpr * 4
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "chart.png")
+            t_stream = best_of(lambda: widget.exportPng(path), repeat, setup=widget.invalidateTiles)
+            png_mib = os.path.getsize(path) / 2**20
+        entry = {"estimated_mib": est / 2**20, "stream_ms": t_stream * 1000, "png_mib": png_mib,
+                 "band_mib": r.exportSize(dpr)[0] * r.EXPORT_BAND_HEIGHT * 4 / 2**20}
+        if est > max_export_bytes:
+            entry.update(ms=None, skipped=f"estimated {est / 2**20:.0f} MiB")
+        else:
+            entry["ms"] = best_of(widget.getChartPixmap, repeat, setup=widget.invalidateTiles) * 1000
+        exports[str(dpr)] = entry
+    widget.deleteLater()
+    return {
+        "rows": rows, "footnotes": footnotes, "show_size_resolution": show_details,
+        "setData_ms": t_set * 1000, "full_paint_cold_ms": t_cold * 1000, "full_paint_warm_ms": t_warm * 1000,
+        "scroll_paint_ms": t_scroll * 1000, "export": exports,
+    }
+
+
+def case_key(r):
+    return (r["rows"], r["footnotes"], r["show_size_resolution"])
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {case_key(r): r for r in json.load(f)["results"]}
+    fields = ("setData_ms", "full_paint_cold_ms", "full_paint_warm_ms", "scroll_paint_ms")
+    print(f"\ncompared with {baseline_path} (ratio < 1 is faster):")
+    for r in results:
+        old = baseline.get(case_key(r))
+        if old is None: continue
+        ratios = [f"{f[:-3]}={r[f] / old[f]:.2f}" for f in fields if old.get(f)]
+        for dpr, e in r["export"].items():
+            prev = old.get("export", {}).get(dpr, {})
+            if e["ms"] and prev.get("ms"): ratios.append(f"export@{dpr}={e['ms'] / prev['ms']:.2f}")
+            if prev.get("stream_ms"): ratios.append(f"stream@{dpr}={e['stream_ms'] / prev['stream_ms']:.2f}")
+        print(f"  {case_key(r)}: " + " ".join(ratios))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    ap.add_argument("--dprs", type=float, nargs="+", default=[1.0, ChartRenderer.EXPORT_DPR, 2.0])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--metric", default="sRGB色准")
+    ap.add_argument("--max-export-mib", type=float, default=1024)
+    ap.add_argument("-o", "--output", default="bench_rendering.json")
+    ap.add_argument("--compare", metavar="BASELINE_JSON")
+    args = ap.parse_args()
+
+    app = QApplication([sys.argv[0]])
+    results = []
+    print(f"{'rows':>6} {'notes':>5} {'details':>7} {'setData':>8} {'cold':>8} {'warm':>8} {'scroll':>8}  export/stream (ms) by dpr")
+    for rows in args.rows:
+        for footnotes in (False, True):
+            for show_details in (False, True):
+                r = bench_case(rows, footnotes, show_details, args.dprs, args.repeat, args.max_export_mib * 2**20, args.metric)
+                results.append(r)
+                exports = " ".join(f"{d}:" + ("skip" if e["ms"] is None else f"{e['ms']:.0f}") + f"/{e['stream_ms']:.0f}"
+                                   for d, e in r["export"].items())
+                print(f"{rows:>6} {str(footnotes):>5} {str(show_details):>7} {r['setData_ms']:>8.2f} {r['full_paint_cold_ms']:>8.2f} "
+                      f"{r['full_paint_warm_ms']:>8.2f} {r['scroll_paint_ms']:>8.2f}  {exports}")
+
+    report = {
+        "meta": {"revision": git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "qt": QT_VERSION_STR, "pyqt": PYQT_VERSION_STR, "platform": platform.platform(),
+                 "viewport": VIEWPORT, "scroll_step": SCROLL_STEP, "repeat": args.repeat, "metric": args.metric},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nwrote {args.output}")
+    if args.compare: compare(results, args.compare)
+    app.quit()
+
+
+if __name__ == "__main__":
+    main()
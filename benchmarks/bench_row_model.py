@@ -0,0 +1,77 @@
+"""对比旧的 iterrows 循环与向量化 build_row_model (Legacy iterrows loop vs. vectorized row model).
+
+用法: python benchmarks/bench_row_model.py [--sizes 1000 10000 100000] [--repeat 3]
+"""
+import argparse
+import math
+import time
+
+import pandas as pd
+
+from synthetic import make_clean_frame
+from MonitorRanker import CHART_CONFIG, RESOLUTION_ALIASES, RESOLUTION_NUMERIC_MAP, AttributeTable, build_row_model
+
+
+def legacy_row_model(df, config):
+    # 原 ChartWidget.setData 中的循环 (verbatim copy of the previous implementation)
+    col = config["csv_column"]
+    items = []
+    for idx, r_series in df.iterrows():
+        try:
+            val_from_df = r_series.get(col)
+            if pd.isna(val_from_df): continue
+            v = float(val_from_df)
+            if math.isnan(v): continue
+        except Exception:
+            continue
+        size_n = ref_n = res_val_numeric = None; res_text_display = "N/A"
+        try: size_n = float(str(r_series.get("显示器尺寸", "")).replace('"', ''))
+        except: pass
+        try:
+            ref_str_item = str(r_series.get("刷新率", ""))
+            ref_n = float(ref_str_item.replace("Hz", "").replace("hz", ""))
+        except: pass
+        try:
+            raw_res_str = str(r_series.get("分辨率", ""))
+            res_text_display = RESOLUTION_ALIASES.get(raw_res_str, raw_res_str if raw_res_str else "N/A")
+            if res_text_display in RESOLUTION_NUMERIC_MAP: res_val_numeric = RESOLUTION_NUMERIC_MAP[res_text_display]
+            elif res_text_display == "N/A" and raw_res_str: res_text_display = raw_res_str
+        except: pass
+        items.append({"name": r_series.get("显示器型号", "N/A"), "panel": r_series.get("面板类型", "未知"), "value": v,
+                      "size_numeric": size_n, "size_text": f"{size_n:.1f}\"" if size_n else "N/A\"",
+                      "refresh_numeric": ref_n, "refresh_text": f"{ref_n:.0f}Hz" if ref_n else "N/A Hz",
+                      "resolution_text": res_text_display, "resolution_numeric_value": res_val_numeric})
+    asc = config.get("lower_is_better", False)
+    return sorted(items, key=lambda x: x["value"], reverse=not asc)
+
+
+def best_of(fn, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--metric", default="sRGB色准")
+    args = ap.parse_args()
+
+    config = CHART_CONFIG[args.metric]
+    print(f"{'rows':>8} {'iterrows (s)':>14} {'vectorized (s)':>16} {'+attr table (s)':>16} {'speedup':>9}  identical")
+    for n in args.sizes:
+        df = make_clean_frame(n)
+        legacy = legacy_row_model(df, config)
+        model = build_row_model(df, config)
+        identical = [{k: row[k] for k in old} for row, old in zip(model, legacy)] == legacy and len(model) == len(legacy)
+        t_old = best_of(lambda: legacy_row_model(df, config), 1 if n >= 50000 else args.repeat)
+        t_new = best_of(lambda: build_row_model(df, config), args.repeat)
+        attributes = AttributeTable.from_frame(df)  # load_csv 时构建一次
+        t_join = best_of(lambda: build_row_model(df, config, attributes), args.repeat)
+        print(f"{n:>8} {t_old:>14.4f} {t_new:>16.4f} {t_join:>16.4f} {t_old / t_join:>8.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
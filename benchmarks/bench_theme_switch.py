@@ -0,0 +1,76 @@
+"""主题切换延迟：原先的逐次生成样式表路径 vs. 预编译主题资源 (Theme toggle latency, legacy vs. precompiled).
+
+每次切换包括随后的事件处理 (样式重新应用和重绘)，在离屏平台上运行。
+
+用法: python benchmarks/bench_theme_switch.py [--rows 5000] [--toggles 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+from synthetic import make_raw_frame
+from MonitorRanker import KNOWN_COLUMNS, THEMES, MainWindow, MonitorDataset, build_stylesheet, discover_metric_configs
+
+
+def legacy_switch(window, theme_name):
+    # 原 switch_theme 的步骤：每次重新生成样式表，窗口与状态栏分别 setStyleSheet，图表布局和行图块全部失效
+    window.current_theme_name = theme_name
+    theme = THEMES[theme_name]
+    window.setStyleSheet(build_stylesheet(theme))
+    window.chart_widget.renderer.setThemeColors(theme["text_primary"], theme["text_secondary"],
+                                                theme["chart_empty_text"], theme["chart_bar_background"])
+    window.chart_widget.invalidateLayout()
+    window.chart_widget.invalidateTiles()
+    window.chart_widget.update()
+    window.update_theme_toggle_button_icon()
+    window.statusBar().setStyleSheet(f"""
+        QStatusBar {{ background-color: {theme["widget_background"]}; color: {theme["text_secondary"]}; }}
+        QStatusBar::item {{ border: none; }}
+    """)
+
+
+def time_toggles(app, window, switch, toggles):
+    times = []
+    for i in range(toggles):
+        name = "light" if window.current_theme_name == "dark" else "dark"
+        t0 = time.perf_counter()
+        switch(window, name)
+        app.processEvents()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--toggles", type=int, default=20)
+    args = ap.parse_args()
+
+    app = QApplication([sys.argv[0]])
+    window = MainWindow()
+    frame = make_raw_frame(args.rows)
+    dataset = MonitorDataset(frame, [c for c in frame.columns if c not in KNOWN_COLUMNS])
+    window.show_dataset(dataset, discover_metric_configs(dataset.columns), first=True)
+    window.show()
+    app.processEvents()
+
+    results = {}
+    for label, switch in (("legacy", legacy_switch), ("precompiled", MainWindow.switch_theme)):
+        window.statusBar().setStyleSheet("") # 去掉 legacy 路径留下的状态栏样式表
+        time_toggles(app, window, switch, 2) # 预热 (Warm-up)
+        results[label] = time_toggles(app, window, switch, args.toggles)
+    print(f"rows={args.rows} toggles={args.toggles}")
+    print(f"{'path':>12} {'median (ms)':>12} {'best (ms)':>10} {'worst (ms)':>11}")
+    for label, times in results.items():
+        print(f"{label:>12} {statistics.median(times):>12.2f} {min(times):>10.2f} {max(times):>11.2f}")
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
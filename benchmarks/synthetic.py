@@ -0,0 +1,63 @@
+"""基准测试用的合成数据集 (Synthetic monitor datasets for the benchmark scripts)."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BRANDS = ["KTC", "SANC", "HKC", "创维", "雷鸟", "AOC", "ROG", "泰坦军团", "蚂蚁电竞", "联合创新"]
+PANELS = ["FastIPS", "HVA", "IPS", "QD-OLED", "TN", "VA", "WOLED", "NanoIPS", "未知"]
+RESOLUTIONS = ["1920*1080", "2560*1440", "3840*2160", "3440*1440", "2560*1080", "5120*2880"]
+SIZES = [23.8, 24.5, 27.0, 31.5, 34.0, 27.0, 25.0]
+REFRESH = [60, 75, 144, 165, 170, 180, 200, 240, 280, 360, 480]
+FOOTNOTES = ["（1080p模式）", "(HDR模式)", "（超频）"]
+
+METRIC_SPECS = {  # 列名: (均值, 标准差, 单位, 小数位)
+    "sRGB色准": (1.0, 0.4, "", 2),
+    "sRGB色域容积": (120.0, 15.0, "%", 1),
+    "P3色域覆盖率": (90.0, 6.0, "%", 1),
+    "MPRT运动图像响应时间": (5.0, 1.2, "", 2),
+    "可视角色差": (0.8, 0.3, "", 2),
+    "可视角亮度衰减": (40.0, 10.0, "%", 0),
+}
+
+
+def make_raw_frame(n_rows, seed=0, footnotes=True, missing_rate=0.05, extra_columns=0):
+    """生成与 CSV 读入后 (dtype=str) 形态一致的 DataFrame."""
+    rng = np.random.default_rng(seed)
+    names = [f"{BRANDS[i % len(BRANDS)]} M{i:06d}" for i in range(n_rows)]
+    if footnotes:
+        for i in rng.choice(n_rows, size=n_rows // 7, replace=False):
+            names[i] += FOOTNOTES[i % len(FOOTNOTES)]
+    data = {
+        "显示器型号": names,
+        "面板类型": rng.choice(PANELS, n_rows),
+        "显示器尺寸": rng.choice(SIZES, n_rows).astype(str),
+        "分辨率": rng.choice(RESOLUTIONS, n_rows),
+        "刷新率": rng.choice(REFRESH, n_rows).astype(str),
+    }
+    for col, (mu, sd, unit, nd) in METRIC_SPECS.items():
+        vals = np.round(np.abs(rng.normal(mu, sd, n_rows)), nd)
+        txt = np.char.add(vals.astype(str), unit).astype(object)
+        txt[rng.random(n_rows) < missing_rate] = None
+        data[col] = txt
+    for j in range(extra_columns):
+        vals = np.round(rng.random(n_rows) * 100, 2).astype(str).astype(object)
+        vals[rng.random(n_rows) < missing_rate] = None
+        data[f"附加指标{j + 1}"] = vals
+    return pd.DataFrame(data)
+
+
+def make_clean_frame(n_rows, seed=0, footnotes=True, missing_rate=0.05, extra_columns=0):
+    """生成已完成数值清洗 (与 load_csv 结果一致) 的 DataFrame."""
+    df = make_raw_frame(n_rows, seed, footnotes, missing_rate, extra_columns)
+    for col in list(METRIC_SPECS) + ["显示器尺寸", "刷新率"] + [c for c in df.columns if c.startswith("附加指标")]:
+        df[col] = pd.to_numeric(df[col].astype(str).str.replace(r"[^\d\.\-]", "", regex=True).replace("", pd.NA), errors="coerce")
+    return df
+
+
+def write_csv(path, n_rows, encoding="gbk", **kwargs):
+    make_raw_frame(n_rows, **kwargs).to_csv(path, index=False, encoding=encoding)
+    return path
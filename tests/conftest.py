@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+_CACHE_DIR = tempfile.TemporaryDirectory(prefix="monitorranker-tests-")
+os.environ["MONITORRANKER_CACHE_DIR"] = _CACHE_DIR.name # 测试不读写用户的数据集缓存
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TEST_CSV = os.path.join(ROOT, "test.csv")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([sys.argv[0]])
+    yield app
+
+
+@pytest.fixture(scope="session")
+def test_dataset(qapp):
+    from MonitorRanker import load_dataset
+    dataset, _, _ = load_dataset(TEST_CSV)
+    return dataset
@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+
+from MonitorRanker import (ChartUpdateScheduler, MonitorDataset, _ascending_rows, _metric_values, _reverse_keeping_ties,
+                           build_row_model)
+
+HEADER = "显示器型号,面板类型,显示器尺寸,分辨率,刷新率,sRGB色准\n"
+
+
+def _rows(start, values):
+    return "".join(f"M{start + i},IPS,27,2560*1440,165,{v}\n" for i, v in enumerate(values))
+
+
+def _dataset(values):
+    import pandas as pd
+    frame = pd.DataFrame({"显示器型号": [f"M{i}" for i in range(len(values))], "sRGB色准": [str(v) for v in values]})
+    return MonitorDataset(frame, ["sRGB色准"])
+
+
+def test_append_merges_cached_sort_orders():
+    head = _dataset([1.5, 0.8, "", 1.5, 0.3, 0.8])
+    for lower_is_better in (True, False): head.sortedRows("sRGB色准", lower_is_better)
+    tail = _dataset([0.8, 2.0, 1.5, "", 0.1])
+    tail.frame.index += len(head)
+    merged = head.concat(tail)
+    assert set(merged._orders) == {("sRGB色准", True), ("sRGB色准", False)}
+
+    values = _metric_values(merged["sRGB色准"])
+    expected = {True: _ascending_rows(values)}
+    expected[False] = _reverse_keeping_ties(*expected[True])
+    for lower_is_better in (True, False):
+        rows, sorted_values = merged.sortedRows("sRGB色准", lower_is_better)
+        np.testing.assert_array_equal(rows, expected[lower_is_better][0])
+        np.testing.assert_array_equal(sorted_values, expected[lower_is_better][1])
+
+
+def _load(app, win, path):
+    win.start_load(path)
+    while win.loader.isRunning() or win.dataset is None:
+        app.processEvents(); time.sleep(0.01)
+    app.processEvents()
+    win.metric_combo.setCurrentText("sRGB色准")
+    win.chart_updates.flush()
+
+
+def _expected_rows(win):
+    config = win.chart_widget.config
+    return list(build_row_model(win.dataset, config, win.dataset.attributes))
+
+
+def test_watched_append_merges_into_ladder(qapp, tmp_path):
+    from MonitorRanker import MainWindow
+    path = tmp_path / "data.csv"
+    path.write_text(HEADER + _rows(0, [1.2, 0.4, 0.9]), encoding="utf-8")
+    win = MainWindow()
+    _load(qapp, win, str(path))
+    assert len(win.chart_widget.renderer.data) == 3
+
+    with open(path, "a", encoding="utf-8") as f: f.write(_rows(3, [0.7, 1.5]))
+    win.reload_watched_file()
+    assert ChartUpdateScheduler.DATA not in win.chart_updates.pending()
+    assert list(win.chart_widget.renderer.data) == _expected_rows(win)
+
+
+def test_watched_append_to_empty_ladder_rebuilds_chart(qapp, tmp_path):
+    from MonitorRanker import MainWindow
+    path = tmp_path / "data.csv"
+    path.write_text(HEADER + _rows(0, ["", ""]), encoding="utf-8")
+    win = MainWindow()
+    _load(qapp, win, str(path))
+    assert len(win.chart_widget.renderer.data) == 0
+
+    with open(path, "a", encoding="utf-8") as f: f.write(_rows(2, [0.7, 1.5]))
+    win.reload_watched_file()
+    assert ChartUpdateScheduler.DATA in win.chart_updates.pending()
+    win.chart_updates.flush()
+    assert len(win.chart_widget.renderer.data) == 2
+    assert list(win.chart_widget.renderer.data) == _expected_rows(win)
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from synthetic import write_csv
+from MonitorRanker import DatasetCache, MonitorDataset, load_dataset
+
+
+def _is_mapped(series):
+    arr = series.to_numpy()
+    while arr is not None and not isinstance(arr, np.memmap): arr = arr.base
+    return arr is not None
+
+
+def test_cache_hit_keeps_parsed_columns_memory_mapped(tmp_path):
+    path = write_csv(str(tmp_path / "data.csv"), 2000)
+    dataset, info, _ = load_dataset(path)
+    dataset.materialize(["sRGB色准"])
+    cache = DatasetCache(str(tmp_path / "cache"))
+    cache.store(path, dataset, info)
+    assert dataset.isMaterialized("sRGB色准") and sum(map(dataset.isMaterialized, dataset.metric_columns)) == 1
+
+    cached, warm_info, _ = load_dataset(path, cache=cache)
+    assert warm_info["cache_hit"]
+    assert _is_mapped(cached["sRGB色准"]) and _is_mapped(cached.frame["sRGB色准"])
+    pd.testing.assert_series_equal(cached["sRGB色准"], dataset["sRGB色准"], check_names=False)
+    assert list(cached.columns) == list(dataset.columns)
+
+
+def test_store_leaves_unparsed_metric_columns_lazy(tmp_path, monkeypatch):
+    path = write_csv(str(tmp_path / "data.csv"), 2000)
+    dataset, info, _ = load_dataset(path)
+    parsed = []
+    getitem = MonitorDataset.__getitem__
+    monkeypatch.setattr(MonitorDataset, "__getitem__", lambda self, col: (parsed.append(col), getitem(self, col))[1])
+    cache = DatasetCache(str(tmp_path / "cache"))
+    cache.store(path, dataset, info)
+    assert not any(map(dataset.isMaterialized, dataset.metric_columns))
+    assert not set(parsed) & set(dataset.metric_columns)
+    monkeypatch.undo()
+
+    cached, _, _ = load_dataset(path, cache=cache)
+    assert not any(map(cached.isMaterialized, cached.metric_columns))
+    for col in cached.metric_columns:
+        pd.testing.assert_series_equal(cached[col], dataset[col], check_names=False)
+    assert cached.units == dataset.units
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from PyQt6.QtGui import QImage
+
+from conftest import ROOT, TEST_CSV
+from MonitorRanker import ChartRenderer, RowTileCache
+
+
+def export_renderer(dataset, metric_key):
+    renderer = ChartRenderer().exportCopy()
+    renderer.setData(dataset, metric_key, dataset.attributes)
+    return renderer
+
+
+def image_bytes(img):
+    return img.constBits().asstring(img.sizeInBytes())
+
+
+@pytest.mark.parametrize("metric_key", ["sRGB色准", "MPRT运动图像响应时间"])
+@pytest.mark.parametrize("dpr", [1.0, 1.25, ChartRenderer.EXPORT_DPR])
+def test_tiled_paint_matches_direct_paint(test_dataset, metric_key, dpr):
+    renderer = export_renderer(test_dataset, metric_key)
+    direct = renderer.renderImage(dpr)
+    tiles = RowTileCache(512 * 1024 * 1024)
+    tiled = renderer.renderImage(dpr, tiles=tiles)
+    assert tiles.stats()["tiles"] == len(renderer.data)
+    assert tiled.size() == direct.size()
+    assert image_bytes(tiled) == image_bytes(direct)
+    assert image_bytes(renderer.renderImage(dpr, tiles=tiles)) == image_bytes(direct) # 命中缓存时同样一致
+
+
+def test_tiled_bands_match_direct_paint(test_dataset):
+    renderer = export_renderer(test_dataset, "sRGB色准")
+    direct = renderer.renderImage()
+    tiles = RowTileCache(512 * 1024 * 1024)
+    for band, top in renderer.renderBands(tiles=tiles, band_height=333):
+        expected = direct.copy(0, top, band.width(), band.height())
+        assert image_bytes(band) == image_bytes(expected)
+
+
+
+# 对照：重构前的版本，图表由 ChartWidget.getChartPixmap 在控件上绘制后按内容宽度裁剪 (The widget-based export path)
+BASELINE_REV = "d70bb22"
+WINDOW_EXPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "window_export.py")
+
+
+def window_export(module_path, metric_key, output, size=(1400, 900)):
+    result = subprocess.run([sys.executable, WINDOW_EXPORT, module_path, TEST_CSV, metric_key, output, *map(str, size)],
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    return int(result.stdout.split()[-1]), QImage(output).convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+
+
+@pytest.fixture(scope="module")
+def baseline_module(tmp_path_factory):
+    try:
+        source = subprocess.run(["git", "show", f"{BASELINE_REV}:MonitorRanker.py"], cwd=ROOT,
+                                capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip(f"baseline revision {BASELINE_REV} is not available")
+    path = tmp_path_factory.mktemp("baseline") / "MonitorRanker.py"
+    path.write_bytes(source)
+    return str(path)
+
+
+@pytest.mark.parametrize("metric_key", ["sRGB色准", "MPRT运动图像响应时间"])
+@pytest.mark.parametrize("size", [(1400, 900), (1800, 1000)])
+def test_export_matches_baseline_widget_export(qapp, baseline_module, tmp_path, metric_key, size):
+    # 导出按图表区当前宽度排版、按内容宽度裁剪，与原先的控件导出逐像素一致 (Same size and pixels as the old export)
+    old_width, expected = window_export(baseline_module, metric_key, str(tmp_path / "baseline.png"), size)
+    new_width, actual = window_export(os.path.join(ROOT, "MonitorRanker.py"), metric_key, str(tmp_path / "current.png"), size)
+    assert new_width == old_width
+    assert (actual.width(), actual.height()) == (expected.width(), expected.height())
+    assert image_bytes(actual) == image_bytes(expected)
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from synthetic import write_csv
+from MonitorRanker import KNOWN_COLUMNS, DatasetLoader, MonitorDataset, _LoadJob, load_dataset
+
+
+class _Signal:
+    def __init__(self): self.calls = []
+    def emit(self, *args): self.calls.append(args)
+
+
+class _StubLoader:
+    # 只记录 _LoadJob 发出的信号 (Records what a _LoadJob emits)
+    PARTIAL_INTERVAL_SECONDS = 0.0
+    PARTIAL_GROWTH = DatasetLoader.PARTIAL_GROWTH
+
+    def __init__(self):
+        self._progress = _Signal(); self._partial = _Signal()
+
+
+def test_partial_datasets_append_only_new_chunks(tmp_path, monkeypatch):
+    path = write_csv(str(tmp_path / "data.csv"), 5000)
+    loader = _StubLoader()
+    job = _LoadJob(loader, 1, path, list(KNOWN_COLUMNS), None)
+    appended = []
+    concat = MonitorDataset.concat
+    monkeypatch.setattr(MonitorDataset, "concat", lambda self, tail: (appended.append(len(tail)), concat(self, tail))[1])
+    dataset, _, _ = load_dataset(path, on_chunk=job._on_chunk, chunksize=100)
+    monkeypatch.undo()
+
+    partials = [d for _, d in loader._partial.calls]
+    sizes = [len(d) for d in partials]
+    assert len(loader._progress.calls) == 50
+    # 行数按 PARTIAL_GROWTH 几何增长，而不是每块一次 (Geometric, not one rebuild per chunk)
+    assert all(b >= a * DatasetLoader.PARTIAL_GROWTH for a, b in zip(sizes, sizes[1:]))
+    assert len(partials) < 15
+    # 每次只清洗新读入的行 (Each tick cleans only the rows read since the previous one)
+    assert sum(appended) + sizes[0] == sizes[-1]
+
+    last = partials[-1]
+    head = dataset.frame.iloc[:len(last)]
+    pd.testing.assert_index_equal(last.frame.index, head.index)
+    for col in ("显示器尺寸", "刷新率", "sRGB色准", "P3色域覆盖率"):
+        np.testing.assert_array_equal(np.asarray(last[col], dtype=np.float64), np.asarray(dataset[col][:len(last)], dtype=np.float64))
+    for field in ("main_name", "panel", "refresh_text"):
+        assert list(last.attributes.column(field)) == list(dataset.attributes.column(field)[:len(last)])
+
+
+def _wait_loaded(app, win):
+    while win.loader.isRunning() or win.dataset is None:
+        app.processEvents(); time.sleep(0.01)
+    app.processEvents()
+    win.chart_updates.flush()
+
+
+def _start_with_partial(win, path):
+    # 开始加载并显示新文件的部分数据，不等待后台任务 (Start a load and show a partial of the new file)
+    win.start_load(path)
+    partial, _, _ = load_dataset(path, chunksize=50)
+    win.on_load_partial(MonitorDataset(partial.frame.iloc[:50], partial.metric_columns))
+    win.chart_updates.flush()
+
+
+def test_cancel_restores_previous_dataset(qapp, tmp_path):
+    from MonitorRanker import MainWindow
+    first, second = write_csv(str(tmp_path / "first.csv"), 300), write_csv(str(tmp_path / "second.csv"), 3000, seed=1)
+    win = MainWindow()
+    win.start_load(first); _wait_loaded(qapp, win)
+    previous, rows = win.dataset, list(win.chart_widget.renderer.data)
+
+    _start_with_partial(win, second)
+    assert win.dataset is not previous and not win.btn_save_current_png.isEnabled()
+    win.cancel_load(); win.chart_updates.flush()
+    assert win.dataset is previous and win.dataset_path == first
+    assert list(win.chart_widget.renderer.data) == rows
+    assert win.btn_save_current_png.isEnabled()
+    win.loader.waitForDone()
+
+
+def test_cancel_first_load_clears_partial(qapp, tmp_path):
+    from MonitorRanker import MainWindow
+    path = write_csv(str(tmp_path / "data.csv"), 3000)
+    win = MainWindow()
+    _start_with_partial(win, path)
+    assert win.dataset is not None
+    win.cancel_load(); win.chart_updates.flush()
+    assert win.dataset is None and win.dataset_path is None
+    assert len(win.chart_widget.renderer.data) == 0
+    assert not win.btn_save_current_png.isEnabled()
+    win.loader.waitForDone()
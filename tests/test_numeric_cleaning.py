@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from MonitorRanker import MonitorDataset, clean_numeric_column, discover_metric_configs
+
+
+def legacy_clean(series):
+    # 原 load_csv 中的清洗 (The original per-cell regex cleaning)
+    return pd.to_numeric(series.astype(str).str.replace(r'[^\d\.\-]', '', regex=True).replace('', pd.NA), errors='coerce')
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("1,234", 1234.0),
+    ("2,500", 2500.0),
+    ("27-32", np.nan),
+    ("95.5%", 95.5),
+    ("5 ms", 5.0),
+    ("1.5 ΔE", 1.5),
+    ("27英寸", 27.0),
+    ("-.5", -0.5),
+    ("+3", 3.0),
+    ("1e5", 15.0), # 旧清洗删掉字母 (The legacy cleaning drops letters)
+    ("abc", np.nan),
+    ("", np.nan),
+    (None, np.nan),
+])
+def test_values_match_legacy_cleaning(raw, expected):
+    series = pd.Series([raw, "1"], dtype=object)
+    values, _ = clean_numeric_column(series)
+    np.testing.assert_array_equal(values.to_numpy(), [expected, 1.0])
+    np.testing.assert_array_equal(values.to_numpy(), legacy_clean(series).to_numpy(dtype=np.float64))
+
+
+def test_mixed_column_matches_legacy_cleaning():
+    rng = np.random.default_rng(0)
+    cells = ["1,234", "2,500", "27-32", "95.5%", "96 %", "5ms", "0.8ΔE", "27英寸", "144Hz", "N/A", "--", "1.2.3",
+             "-", ".", "1e-3", "１２", "٣", "12\0", None, np.nan, "3.14159265358979323846", "-0", "  42  "]
+    series = pd.Series(rng.choice(np.array(cells, dtype=object), 5000), dtype=object)
+    values, _ = clean_numeric_column(series)
+    np.testing.assert_array_equal(values.to_numpy(), legacy_clean(series).to_numpy(dtype=np.float64))
+
+
+@pytest.mark.parametrize("cells, unit", [
+    (["95.5%", "96%", "97.1 %"], "%"),
+    (["5ms", "4.2 ms", "6 MS"], "ms"),
+    (["1.2ΔE", "0.8 ΔE"], " ΔE"),
+    (["144Hz", "165hz"], "Hz"),
+    (["27英寸", '24.5"'], '"'),
+    (["1,234", "2,500", "3,100"], ""),
+    (["27-32", "24-27"], ""),
+    (["1.5", "2"], ""),
+])
+def test_only_known_suffixes_are_units(cells, unit):
+    _, detected = clean_numeric_column(pd.Series(cells, dtype=object))
+    assert detected == unit
+
+
+def test_discovered_metrics_get_no_fake_units():
+    frame = pd.DataFrame({"显示器型号": ["A", "B", "C"], "功耗": ["1,234", "2,500", "980"],
+                          "亮度范围": ["27-32", "30-35", "28"], "对比度": ["95%", "96%", "97%"]})
+    dataset = MonitorDataset(frame, ["功耗", "亮度范围", "对比度"])
+    units = dataset.sampleUnits()
+    assert units == {"功耗": "", "亮度范围": "", "对比度": "%"}
+    configs = discover_metric_configs(dataset.columns, ["显示器型号"], units)
+    assert [configs[c]["unit"] for c in ("功耗", "亮度范围", "对比度")] == ["", "", "%"]
+    np.testing.assert_array_equal(dataset["功耗"].to_numpy(), [1234.0, 2500.0, 980.0])
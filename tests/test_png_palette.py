@@ -0,0 +1,65 @@
+import io
+
+import numpy as np
+import pytest
+from PyQt6.QtGui import QImage
+
+from MonitorRanker import ChartRenderer, IndexedPngStreamWriter
+
+
+def encode(rgba, band_height=7):
+    f = io.BytesIO()
+    writer = IndexedPngStreamWriter(f, rgba.shape[1], rgba.shape[0])
+    for top in range(0, rgba.shape[0], band_height): writer.writeRows(rgba[top:top + band_height])
+    writer.close()
+    return f.getvalue(), writer
+
+
+def decode(data):
+    img = QImage.fromData(data, "PNG").convertToFormat(QImage.Format.Format_RGBA8888)
+    rows = np.frombuffer(img.constBits().asstring(img.sizeInBytes()), np.uint8).reshape(img.height(), img.bytesPerLine())
+    return rows[:, :img.width() * 4].reshape(img.height(), img.width(), 4)
+
+
+def flat_fills(n_fills, width=40, rows_per_fill=6):
+    # 相邻平涂色只差 1 级，全部落在同一个 4 位颜色桶中
+    colors = np.array([[200 + i % 8, 120 - i // 8, 120, 255] for i in range(n_fills)], dtype=np.uint8)
+    return np.repeat(colors, rows_per_fill, axis=0)[:, None, :].repeat(width, axis=1).copy(), colors
+
+
+def test_few_colors_round_trip_exactly(qapp):
+    image, _ = flat_fills(30)
+    image[::5, ::3] = [255, 255, 255, 128] # 半透明的边缘像素，与平涂色同桶或不同桶
+    image[2::5, 1::4] = [201, 121, 119, 255]
+    data, writer = encode(image)
+    assert not writer.quantized
+    assert writer.colors_used == len(np.unique(image.reshape(-1, 4), axis=0))
+    np.testing.assert_array_equal(decode(data), image)
+
+
+def test_many_colors_keep_flat_fills(qapp):
+    image, colors = flat_fills(40)
+    rng = np.random.default_rng(0)
+    edges = rng.integers(0, 256, size=(image.shape[0], 2, 4), dtype=np.uint8) # 数百种零散颜色
+    edges[..., 3] = 255
+    image[:, :2] = edges
+    data, writer = encode(image)
+    assert writer.quantized and writer.colors_used == IndexedPngStreamWriter.MAX_COLORS
+    np.testing.assert_array_equal(decode(data)[:, 2:], image[:, 2:])
+
+
+def test_chart_export_keeps_flat_fills(test_dataset, tmp_path):
+    renderer = ChartRenderer().exportCopy()
+    renderer.setData(test_dataset, "sRGB色准", test_dataset.attributes)
+    rgba_path, palette_path = tmp_path / "rgba.png", tmp_path / "palette.png"
+    renderer.exportPng(str(rgba_path), dpr=1.0)
+    renderer.exportPng(str(palette_path), dpr=1.0, palette=True)
+    expected, actual = decode(rgba_path.read_bytes()), decode(palette_path.read_bytes())
+    premultiplied = lambda a: a[..., :3] * (a[..., 3:] / 255.0)
+    error = np.abs(premultiplied(actual) - premultiplied(expected)).max(axis=2)
+    assert (error > 0).mean() < 0.02
+    assert (error > 16).mean() < 0.001
+    packed = expected.view(">u4")[..., 0]
+    colors, counts = np.unique(packed, return_counts=True)
+    fills = np.isin(packed, colors[counts > 0.001 * packed.size]) # 平涂色不变
+    np.testing.assert_array_equal(actual[fills], expected[fills])
@@ -0,0 +1,14 @@
+import MonitorRanker
+from MonitorRanker import THEMES, ChartRenderer, theme_assets
+
+
+def test_chart_theme_does_not_build_stylesheet(qapp, monkeypatch):
+    built = []
+    build_stylesheet = MonitorRanker.build_stylesheet
+    monkeypatch.setattr(MonitorRanker, "build_stylesheet", lambda theme: (built.append(theme), build_stylesheet(theme))[1])
+    monkeypatch.setattr(MonitorRanker, "_THEME_ASSETS", {})
+    renderer = ChartRenderer()
+    for name in THEMES: renderer.setTheme(name)
+    assert built == []
+    assert theme_assets("dark").stylesheet == build_stylesheet(THEMES["dark"])
+    assert len(built) == 1
@@ -0,0 +1,42 @@
+"""在新进程中用 MainWindow 的图表区导出一张图 (Export one chart through a shown MainWindow, in a fresh process).
+
+用法: python tests/window_export.py MODULE.py data.csv METRIC out.png [WIDTH HEIGHT]
+
+MODULE.py 可以是任意版本的 MonitorRanker.py：旧版本用 getChartPixmap，新版本用 getChartImage。
+单独的进程避免两个版本在同一进程中共享 Qt 的字形缓存。
+"""
+import importlib.util
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QFileDialog
+
+
+def main(module_path, csv_path, metric_key, output, width=1400, height=900):
+    app = QApplication([sys.argv[0]])
+    spec = importlib.util.spec_from_file_location("MonitorRanker_under_test", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    QFileDialog.getOpenFileName = staticmethod(lambda *a, **k: (csv_path, ""))
+
+    win = module.MainWindow()
+    win.resize(int(width), int(height)); win.show(); app.processEvents()
+    win.load_csv()
+    while getattr(win, "loader", None) is not None and (win.loader.isRunning() or win.dataset is None):
+        app.processEvents(); time.sleep(0.01)
+    app.processEvents()
+    win.metric_combo.setCurrentText(metric_key)
+    if hasattr(win, "chart_updates"): win.chart_updates.flush()
+    app.processEvents()
+    chart = win.chart_widget
+    image = chart.getChartImage() if hasattr(chart, "getChartImage") else chart.getChartPixmap().toImage()
+    if not image.save(output, "PNG"): return 1
+    print(chart.width())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))